@@ -0,0 +1,133 @@
+"""Batch endpoints versus one request per todo.
+
+Creates, updates and deletes the same number of todos once through the
+single-todo endpoints and once through ``/todos/batch``.
+
+    python -m benchmarks.bench_bulk --todos 10000
+"""
+
+import asyncio
+import time
+
+from benchmarks.common import (
+    argument_parser,
+    asgi_client,
+    auth_headers,
+    create_user,
+    report,
+    setup_database,
+)
+from tests.test_todos import TodoFactory
+
+
+def payloads(count: int) -> list[dict]:
+    return [
+        {
+            'title': todo.title,
+            'description': todo.description,
+            'state': todo.state.value,
+        }
+        for todo in TodoFactory.build_batch(count)
+    ]
+
+
+async def timed(client, method: str, url: str, **kwargs):
+    start = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    elapsed = time.perf_counter() - start
+    response.raise_for_status()
+    return response, elapsed
+
+
+def result(mode: str, operation: str, todos: int, elapsed: float):
+    return {
+        'mode': mode,
+        'operation': operation,
+        'todos': todos,
+        'seconds': elapsed,
+        'todos_per_second': todos / elapsed,
+    }
+
+
+async def run_single(client, headers, todos: list[dict]):
+    results, ids, elapsed = [], [], 0.0
+
+    for todo in todos:
+        response, seconds = await timed(
+            client, 'POST', '/todos/', json=todo, headers=headers
+        )
+        ids.append(response.json()['id'])
+        elapsed += seconds
+    results.append(result('single', 'create', len(todos), elapsed))
+
+    elapsed = 0.0
+    for todo_id in ids:
+        _, seconds = await timed(
+            client,
+            'PATCH',
+            f'/todos/{todo_id}',
+            json={'state': 'done'},
+            headers=headers,
+        )
+        elapsed += seconds
+    results.append(result('single', 'update', len(ids), elapsed))
+
+    elapsed = 0.0
+    for todo_id in ids:
+        _, seconds = await timed(
+            client, 'DELETE', f'/todos/{todo_id}', headers=headers
+        )
+        elapsed += seconds
+    results.append(result('single', 'delete', len(ids), elapsed))
+
+    return results
+
+
+async def run_batch(client, headers, todos: list[dict]):
+    response, elapsed = await timed(
+        client, 'POST', '/todos/batch', json=todos, headers=headers
+    )
+    ids = [todo['id'] for todo in response.json()['todos']]
+    results = [result('batch', 'create', len(todos), elapsed)]
+
+    _, elapsed = await timed(
+        client,
+        'PATCH',
+        '/todos/batch',
+        json=[{'id': todo_id, 'state': 'done'} for todo_id in ids],
+        headers=headers,
+    )
+    results.append(result('batch', 'update', len(ids), elapsed))
+
+    _, elapsed = await timed(
+        client,
+        'DELETE',
+        '/todos/batch',
+        json={'ids': ids},
+        headers=headers,
+    )
+    results.append(result('batch', 'delete', len(ids), elapsed))
+
+    return results
+
+
+async def main(args):
+    engine = await setup_database(args.database_url)
+    user = await create_user(engine)
+    headers = auth_headers(user)
+    todos = payloads(args.todos)
+
+    async with asgi_client() as client:
+        results = [
+            *await run_single(client, headers, todos),
+            *await run_batch(client, headers, todos),
+        ]
+
+    await engine.dispose()
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument('--todos', type=int, default=10_000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,138 @@
+"""Delta sync through /todos/changes versus downloading every todo.
+
+Seeds users with growing numbers of todos, takes a sync cursor, then
+updates and deletes a growing number of them. Measures catching up from
+the cursor, which should follow the number of changes, against paging
+through the whole list, which follows the number of todos.
+
+    python -m benchmarks.bench_changes --todos 10000 100000
+"""
+
+import asyncio
+import time
+
+from sqlalchemy import delete, select, update
+
+from benchmarks.common import (
+    argument_parser,
+    asgi_client,
+    auth_headers,
+    create_user,
+    report,
+    seed_todos,
+    setup_database,
+    summarize,
+)
+from fast_zero.models import Todo
+
+
+async def sync(client, headers, since: str | None, limit: int):
+    changes, params = 0, {'limit': limit}
+    if since:
+        params['since'] = since
+    while True:
+        response = await client.get(
+            '/todos/changes', headers=headers, params=params
+        )
+        response.raise_for_status()
+        page = response.json()
+        changes += len(page['todos']) + len(page['deleted'])
+        params['since'] = page['next_cursor']
+        if not page['has_more']:
+            return changes, page['next_cursor']
+
+
+async def download(client, headers, limit: int):
+    rows, url = 0, f'/todos/?limit={limit}'
+    while url:
+        response = await client.get(url, headers=headers)
+        response.raise_for_status()
+        page = response.json()
+        rows += len(page['todos'])
+        cursor = page['next_cursor']
+        url = f'/todos/?limit={limit}&cursor={cursor}' if cursor else None
+    return rows
+
+
+async def change(engine, user_id: int, count: int):
+    # Three updates for every delete, spread over the whole list.
+    async with engine.begin() as conn:
+        ids = (
+            await conn.scalars(
+                select(Todo.id)
+                .where(Todo.user_id == user_id)
+                .order_by(Todo.id)
+            )
+        ).all()
+        picked = ids[:: max(len(ids) // count, 1)][:count] if count else []
+        await conn.execute(
+            update(Todo)
+            .where(Todo.id.in_(picked[count // 4 :]))
+            .values(title='changed')
+        )
+        await conn.execute(
+            delete(Todo).where(Todo.id.in_(picked[: count // 4]))
+        )
+
+
+async def timed(requests: int, call):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        result = await call()
+        samples.append(time.perf_counter() - start)
+    return result, samples
+
+
+async def main(args):
+    engine = await setup_database(args.database_url)
+    results = []
+
+    async with asgi_client() as client:
+        for total in args.todos:
+            user = await create_user(engine)
+            await seed_todos(engine, user.id, total)
+            headers = auth_headers(user)
+
+            rows, samples = await timed(
+                args.requests, lambda: download(client, headers, args.limit)
+            )
+            results.append({
+                'mode': 'full_list',
+                'todos': total,
+                'changes': rows,
+                **summarize(samples),
+            })
+
+            _, cursor = await sync(client, headers, None, 1000)
+            for count in args.changes:
+                await change(engine, user.id, count)
+                (changes, cursor_after), samples = await timed(
+                    args.requests,
+                    lambda: sync(client, headers, cursor, args.limit),
+                )
+                if changes != count:
+                    raise SystemExit(f'synced {changes} of {count} changes')
+                results.append({
+                    'mode': 'changes',
+                    'todos': total,
+                    'changes': changes,
+                    **summarize(samples),
+                })
+                cursor = cursor_after
+
+    await engine.dispose()
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument(
+        '--todos', type=int, nargs='+', default=[10_000, 100_000]
+    )
+    parser.add_argument(
+        '--changes', type=int, nargs='+', default=[0, 10, 100, 1000]
+    )
+    parser.add_argument('--limit', type=int, default=100)
+    parser.set_defaults(requests=10)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,83 @@
+"""Polling /todos and /users with and without If-None-Match.
+
+Fetches a page of todos and a page of users once to learn their ETags,
+then measures plain GETs against revalidating ones that come back 304
+while nothing changes, and the bytes each poll puts on the wire.
+
+    python -m benchmarks.bench_conditional --todos 100000
+"""
+
+import asyncio
+import time
+
+from benchmarks.common import (
+    argument_parser,
+    asgi_client,
+    auth_headers,
+    create_user,
+    report,
+    seed_todos,
+    setup_database,
+    summarize,
+)
+
+
+async def poll(client, url: str, headers, requests: int):
+    # measure() treats the expected 304s as failures.
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        samples.append(time.perf_counter() - start)
+        if response.is_error:
+            response.raise_for_status()
+    return samples
+
+
+async def main(args):
+    engine = await setup_database(args.database_url)
+    user = await create_user(engine)
+    for _ in range(args.users):
+        await create_user(engine)
+    await seed_todos(engine, user.id, args.todos)
+    headers = auth_headers(user)
+    results = []
+
+    async with asgi_client() as client:
+        for url in (
+            f'/todos/?limit={args.limit}',
+            f'/users/?limit={args.limit}',
+        ):
+            response = await client.get(url, headers=headers)
+            response.raise_for_status()
+            conditional = {
+                **headers,
+                'If-None-Match': response.headers['ETag'],
+            }
+
+            for mode, request_headers in (
+                ('plain', headers),
+                ('if_none_match', conditional),
+            ):
+                last = await client.get(url, headers=request_headers)
+                samples = await poll(
+                    client, url, request_headers, args.requests
+                )
+                results.append({
+                    'url': url,
+                    'mode': mode,
+                    'status': last.status_code,
+                    'bytes': len(last.content),
+                    **summarize(samples),
+                })
+
+    await engine.dispose()
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument('--todos', type=int, default=100_000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--limit', type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
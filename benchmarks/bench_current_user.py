@@ -0,0 +1,88 @@
+"""Latency and memory of authenticated requests by todo volume.
+
+Authenticated routes used to eager-load every todo the caller owns.
+This measures p50/p99 and RSS on routes that only need the principal,
+for users owning 10, 1k and 100k todos.
+
+    python -m benchmarks.bench_current_user --json current_user.json
+"""
+
+import asyncio
+import time
+
+from benchmarks.common import (
+    argument_parser,
+    asgi_client,
+    auth_headers,
+    create_user,
+    measure,
+    report,
+    rss_mb,
+    seed_todos,
+    setup_database,
+    summarize,
+)
+
+ROUTES = [
+    ('GET', '/todos/?limit=1'),
+    ('POST', '/auth/refresh_token'),
+]
+
+
+async def refresh_chain(client, user, requests: int):
+    # A refresh revokes the token it replaces, so each one uses the token
+    # the previous one returned.
+    samples = []
+    headers = auth_headers(user)
+
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.post('/auth/refresh_token', headers=headers)
+        samples.append(time.perf_counter() - start)
+        response.raise_for_status()
+        token = response.json()['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+
+    return samples
+
+
+async def main(args):
+    engine = await setup_database(args.database_url)
+    results = []
+
+    async with asgi_client() as client:
+        for todo_count in args.todos:
+            user = await create_user(engine)
+            await seed_todos(engine, user.id, todo_count)
+            headers = auth_headers(user)
+
+            for method, url in ROUTES:
+                rss_before = rss_mb()
+                if url == '/auth/refresh_token':
+                    samples = await refresh_chain(client, user, args.requests)
+                else:
+                    samples = await measure(
+                        client, method, url, args.requests, headers=headers
+                    )
+                results.append({
+                    'route': f'{method} {url}',
+                    'todos': todo_count,
+                    **summarize(samples),
+                    'rss_mb': rss_mb(),
+                    'rss_delta_mb': rss_mb() - rss_before,
+                })
+
+    await engine.dispose()
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument(
+        '--todos',
+        type=int,
+        nargs='+',
+        default=[10, 1_000, 100_000],
+        help='todo counts owned by the benchmarked users',
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,90 @@
+"""Deleting a user with many todos: one DELETE versus the ORM cascade.
+
+Seeds users with growing numbers of todos and measures
+``DELETE /users/{id}``, which leaves the todos to the database's
+ON DELETE CASCADE, against the old unit of work: load the user and its
+todos, then delete every todo by primary key before the user.
+
+    python -m benchmarks.bench_delete_user --todos 1000 10000 100000
+"""
+
+import asyncio
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from benchmarks.common import (
+    argument_parser,
+    asgi_client,
+    auth_headers,
+    count_statements,
+    create_user,
+    report,
+    seed_todos,
+    setup_database,
+    summarize,
+)
+from fast_zero.models import User
+
+
+async def endpoint(client, engine, user):
+    response = await client.delete(
+        f'/users/{user.id}', headers=auth_headers(user)
+    )
+    response.raise_for_status()
+
+
+async def orm_unit_of_work(client, engine, user):
+    async with AsyncSession(engine) as session:
+        loaded = await session.scalar(
+            select(User)
+            .where(User.id == user.id)
+            .options(selectinload(User.todos))
+        )
+        for todo in loaded.todos:
+            await session.delete(todo)
+        await session.delete(loaded)
+        await session.commit()
+
+
+MODES = {'endpoint': endpoint, 'orm_unit_of_work': orm_unit_of_work}
+
+
+async def main(args):
+    engine = await setup_database(args.database_url)
+    results = []
+
+    async with asgi_client() as client:
+        for count in args.todos:
+            for mode, delete_user in MODES.items():
+                samples, statements = [], 0
+                for _ in range(args.requests):
+                    user = await create_user(engine)
+                    await seed_todos(engine, user.id, count)
+
+                    with count_statements(engine) as counter:
+                        start = time.perf_counter()
+                        await delete_user(client, engine, user)
+                        samples.append(time.perf_counter() - start)
+                    statements = counter['statements']
+
+                results.append({
+                    'mode': mode,
+                    'todos': count,
+                    'statements': statements,
+                    **summarize(samples),
+                })
+
+    await engine.dispose()
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument(
+        '--todos', type=int, nargs='+', default=[1000, 10_000, 100_000]
+    )
+    parser.set_defaults(requests=3)
+    asyncio.run(main(parser.parse_args()))
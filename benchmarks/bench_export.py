@@ -0,0 +1,94 @@
+"""Streaming /todos/export versus paging through /todos.
+
+Downloads every todo of one user once through the NDJSON and CSV
+exports and once 100 at a time by cursor, the way the analytics job
+used to. Reports the elapsed time, rows per second and how much the
+process RSS grew while the rows were on their way.
+
+    python -m benchmarks.bench_export --todos 1000000
+"""
+
+import asyncio
+import time
+
+from benchmarks.common import (
+    argument_parser,
+    auth_headers,
+    create_user,
+    report,
+    rss_mb,
+    seed_todos,
+    setup_database,
+    uvicorn_client,
+)
+
+
+async def export(client, headers, export_format: str):
+    rows, peak = 0, rss_mb()
+    async with client.stream(
+        'GET',
+        f'/todos/export?format={export_format}',
+        headers=headers,
+        timeout=None,
+    ) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            rows += chunk.count(b'\n')
+            peak = max(peak, rss_mb())
+
+    # The CSV header is a line too.
+    return rows - (export_format == 'csv'), peak
+
+
+async def paginate(client, headers, page_size: int):
+    rows, peak = 0, rss_mb()
+    url = f'/todos/?limit={page_size}'
+    while url:
+        response = await client.get(url, headers=headers, timeout=None)
+        response.raise_for_status()
+        page = response.json()
+        rows += len(page['todos'])
+        peak = max(peak, rss_mb())
+        cursor = page['next_cursor']
+        url = f'/todos/?limit={page_size}&cursor={cursor}' if cursor else None
+
+    return rows, peak
+
+
+async def main(args):
+    engine = await setup_database(args.database_url)
+    user = await create_user(engine)
+    await seed_todos(engine, user.id, args.todos)
+    headers = auth_headers(user)
+    results = []
+
+    async with uvicorn_client() as client:
+        for mode, download in (
+            ('ndjson', lambda: export(client, headers, 'ndjson')),
+            ('csv', lambda: export(client, headers, 'csv')),
+            ('pages', lambda: paginate(client, headers, args.page_size)),
+        ):
+            before = rss_mb()
+            start = time.perf_counter()
+            rows, peak = await download()
+            elapsed = time.perf_counter() - start
+
+            if rows != args.todos:
+                raise SystemExit(f'{mode} returned {rows} of {args.todos}')
+            results.append({
+                'mode': mode,
+                'rows': rows,
+                'seconds': elapsed,
+                'rows_per_s': rows / elapsed,
+                'rss_growth_mb': peak - before,
+            })
+
+    await engine.dispose()
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument('--todos', type=int, default=1_000_000)
+    parser.add_argument('--page-size', type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,159 @@
+"""Streaming /todos/import versus one POST /todos per row.
+
+Uploads generated todos as a streamed NDJSON and CSV body to a real
+server, and a much smaller sample one request at a time, the only way
+to load todos before. Reports rows per second and how much the process
+RSS grew during the upload.
+
+    python -m benchmarks.bench_import --todos 1000000
+"""
+
+import asyncio
+import csv
+import io
+import json
+import time
+
+from benchmarks.common import (
+    argument_parser,
+    auth_headers,
+    create_user,
+    report,
+    rss_mb,
+    setup_database,
+    uvicorn_client,
+)
+from tests.test_todos import TodoFactory
+
+TEMPLATES = TodoFactory.build_batch(100)
+
+
+def ndjson_body(count: int, chunk: int):
+    lines = [
+        json.dumps({
+            'title': todo.title,
+            'description': todo.description,
+            'state': todo.state.value,
+        }).encode()
+        + b'\n'
+        for todo in TEMPLATES
+    ]
+    for start in range(0, count, chunk):
+        yield b''.join(
+            lines[number % len(lines)]
+            for number in range(start, min(start + chunk, count))
+        )
+
+
+def csv_body(count: int, chunk: int):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['title', 'description', 'state'])
+    header = buffer.getvalue().encode()
+    lines = []
+    for todo in TEMPLATES:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([todo.title, todo.description, todo.state.value])
+        lines.append(buffer.getvalue().encode())
+
+    yield header
+    for start in range(0, count, chunk):
+        yield b''.join(
+            lines[number % len(lines)]
+            for number in range(start, min(start + chunk, count))
+        )
+
+
+async def upload(client, headers, media_type: str, body):
+    async def stream():
+        for chunk in body:
+            yield chunk
+
+    response = await client.post(
+        '/todos/import',
+        headers={**headers, 'Content-Type': media_type},
+        content=stream(),
+        timeout=None,
+    )
+    response.raise_for_status()
+    return response.json()['accepted']
+
+
+async def one_by_one(client, headers, count: int):
+    for number in range(count):
+        todo = TEMPLATES[number % len(TEMPLATES)]
+        response = await client.post(
+            '/todos/',
+            headers=headers,
+            json={
+                'title': todo.title,
+                'description': todo.description,
+                'state': todo.state.value,
+            },
+        )
+        response.raise_for_status()
+    return count
+
+
+async def main(args):
+    engine = await setup_database(args.database_url)
+    user = await create_user(engine)
+    headers = auth_headers(user)
+    chunk = 1000
+    results = []
+
+    async with uvicorn_client() as client:
+        for mode, expected, load in (
+            (
+                'ndjson',
+                args.todos,
+                lambda: upload(
+                    client,
+                    headers,
+                    'application/x-ndjson',
+                    ndjson_body(args.todos, chunk),
+                ),
+            ),
+            (
+                'csv',
+                args.todos,
+                lambda: upload(
+                    client, headers, 'text/csv', csv_body(args.todos, chunk)
+                ),
+            ),
+            (
+                'post_per_row',
+                args.sample,
+                lambda: one_by_one(client, headers, args.sample),
+            ),
+        ):
+            before = rss_mb()
+            start = time.perf_counter()
+            rows = await load()
+            elapsed = time.perf_counter() - start
+
+            if rows != expected:
+                raise SystemExit(f'{mode} accepted {rows} of {expected}')
+            results.append({
+                'mode': mode,
+                'rows': rows,
+                'seconds': elapsed,
+                'rows_per_s': rows / elapsed,
+                'rss_growth_mb': rss_mb() - before,
+            })
+
+    await engine.dispose()
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument('--todos', type=int, default=1_000_000)
+    parser.add_argument(
+        '--sample',
+        type=int,
+        default=2000,
+        help='rows posted one at a time',
+    )
+    asyncio.run(main(parser.parse_args()))
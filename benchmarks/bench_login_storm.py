@@ -0,0 +1,154 @@
+"""/todos latency while /auth/token is being hammered.
+
+Measures GET /todos/ alone, then again while concurrent clients keep
+logging in to one account, first with the rate limits off and then on.
+With Argon2 off the event loop the first two should stay close. With
+the limits on, the storm is mostly rejected before Argon2 runs, so the
+hashing workers stay idle. The storm's clients share the event loop
+with the app, so answering its far more numerous rejections slows the
+measured requests too. How much one attempt costs, let in or rejected,
+is measured on its own.
+
+    python -m benchmarks.bench_login_storm --logins 8
+"""
+
+import asyncio
+import time
+from http import HTTPStatus
+
+from benchmarks.common import (
+    argument_parser,
+    asgi_client,
+    auth_headers,
+    create_user,
+    measure,
+    report,
+    seed_todos,
+    setup_database,
+    summarize,
+)
+from fast_zero.security import (
+    account_rate_limit,
+    get_password_hash,
+    ip_rate_limit,
+    password_hash_executor,
+)
+
+PASSWORD = 'benchmark-password'
+LIMITS = (ip_rate_limit, account_rate_limit)
+
+
+async def hammer_login(client, user, stop: asyncio.Event):
+    logins = rejected = 0
+    while not stop.is_set():
+        response = await client.post(
+            '/auth/token',
+            data={'username': user.email, 'password': PASSWORD},
+        )
+        if response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            rejected += 1
+            # A rejection never waits on I/O, so without this the storm
+            # would never let the measured requests run in-process.
+            await asyncio.sleep(0)
+            continue
+        response.raise_for_status()
+        logins += 1
+    return logins, rejected
+
+
+async def storm(client, user, args, headers):
+    stop = asyncio.Event()
+    tasks = [
+        asyncio.create_task(hammer_login(client, user, stop))
+        for _ in range(args.logins)
+    ]
+    await asyncio.sleep(0.1)
+    loaded = await measure(
+        client, 'GET', '/todos/', args.requests, headers=headers
+    )
+    stop.set()
+    counts = await asyncio.gather(*tasks)
+
+    return {
+        **summarize(loaded),
+        'logins': sum(logins for logins, _ in counts),
+        'rejected': sum(rejected for _, rejected in counts),
+        **password_hash_executor.stats(),
+    }
+
+
+async def attempts(
+    client, user, requests: int, expected: HTTPStatus | None = None
+):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.post(
+            '/auth/token',
+            data={'username': user.email, 'password': PASSWORD},
+        )
+        samples.append(time.perf_counter() - start)
+        assert expected in {None, response.status_code}, response.text
+    return samples
+
+
+async def main(args):
+    engine = await setup_database(args.database_url)
+    user = await create_user(engine, password=get_password_hash(PASSWORD))
+    await seed_todos(engine, user.id, 100)
+    headers = auth_headers(user)
+
+    results = []
+    async with asgi_client() as client:
+        idle = await measure(
+            client, 'GET', '/todos/', args.requests, headers=headers
+        )
+        results.append({'scenario': 'idle', **summarize(idle)})
+
+        # Limited first: the executor's peak queue only ever grows.
+        results.append({
+            'scenario': f'{args.logins} concurrent logins, limited',
+            **await storm(client, user, args, headers),
+        })
+
+        rates = [limit.per_minute for limit in LIMITS]
+        for limit in LIMITS:
+            limit.per_minute = 0
+        results.append({
+            'scenario': f'{args.logins} concurrent logins, unlimited',
+            **await storm(client, user, args, headers),
+        })
+        results.append({
+            'scenario': 'login',
+            **summarize(await attempts(client, user, 50, HTTPStatus.OK)),
+        })
+
+        for limit, rate in zip(LIMITS, rates):
+            limit.per_minute = rate
+        # The account's bucket refilled meanwhile; empty it again.
+        await attempts(client, user, account_rate_limit.burst)
+        results.append({
+            'scenario': 'rejected login',
+            **summarize(
+                await attempts(
+                    client,
+                    user,
+                    args.requests,
+                    HTTPStatus.TOO_MANY_REQUESTS,
+                )
+            ),
+        })
+
+    await engine.dispose()
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument(
+        '--logins',
+        type=int,
+        default=8,
+        help='concurrent clients calling /auth/token',
+    )
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,47 @@
+"""Cost of a single metrics observation.
+
+Times Histogram.observe, Counter.inc and Gauge.inc/dec with the label
+shapes the app uses. Each should stay under a microsecond.
+
+    python -m benchmarks.bench_metrics --requests 1000000
+"""
+
+import timeit
+
+from benchmarks.common import argument_parser, report
+from fast_zero.metrics import Registry
+
+
+def main(args):
+    registry = Registry()
+    latency = registry.histogram(
+        'latency', 'Latency.', ('method', 'route', 'status')
+    )
+    failures = registry.counter('failures', 'Failures.', ('reason',))
+    in_flight = registry.gauge('in_flight', 'In flight.')
+
+    operations = {
+        'histogram.observe': lambda: latency.observe(
+            0.012, 'GET', '/todos/', '200'
+        ),
+        'counter.inc': lambda: failures.inc('invalid'),
+        'gauge.inc+dec': lambda: (in_flight.inc(), in_flight.dec()),
+        'baseline (empty call)': lambda: None,
+    }
+
+    results = []
+    for name, operation in operations.items():
+        seconds = timeit.timeit(operation, number=args.requests)
+        results.append({
+            'operation': name,
+            'calls': args.requests,
+            'ns_per_call': seconds / args.requests * 1e9,
+        })
+
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.set_defaults(requests=1_000_000)
+    main(parser.parse_args())
@@ -0,0 +1,83 @@
+"""Offset versus cursor pagination on deep pages of /todos.
+
+Fetches page 1 and page 10,000 of one user's todos, once through
+``offset`` and once through the opaque ``cursor``.
+
+    python -m benchmarks.bench_pagination --page-size 10 --pages 1 10000
+"""
+
+import asyncio
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.common import (
+    argument_parser,
+    asgi_client,
+    auth_headers,
+    create_user,
+    measure,
+    report,
+    seed_todos,
+    setup_database,
+    summarize,
+)
+from fast_zero.models import Todo
+from fast_zero.pagination import encode_cursor
+
+
+async def cursor_before(engine, user_id: int, position: int):
+    if position == 0:
+        return None
+
+    async with AsyncSession(engine) as session:
+        row = (
+            await session.execute(
+                select(Todo.created_at, Todo.id)
+                .where(Todo.user_id == user_id)
+                .order_by(Todo.created_at, Todo.id)
+                .offset(position - 1)
+                .limit(1)
+            )
+        ).one()
+
+    return encode_cursor(row.created_at, row.id)
+
+
+async def main(args):
+    engine = await setup_database(args.database_url)
+    user = await create_user(engine)
+    await seed_todos(engine, user.id, args.page_size * max(args.pages))
+    headers = auth_headers(user)
+    results = []
+
+    async with asgi_client() as client:
+        for page in args.pages:
+            position = (page - 1) * args.page_size
+            cursor = await cursor_before(engine, user.id, position)
+            urls = {
+                'offset': f'/todos/?limit={args.page_size}&offset={position}',
+                'cursor': f'/todos/?limit={args.page_size}'
+                + (f'&cursor={cursor}' if cursor else ''),
+            }
+
+            for mode, url in urls.items():
+                samples = await measure(
+                    client, 'GET', url, args.requests, headers=headers
+                )
+                results.append({
+                    'mode': mode,
+                    'page': page,
+                    **summarize(samples),
+                })
+
+    await engine.dispose()
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument('--page-size', type=int, default=10)
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10_000])
+    parser.set_defaults(requests=100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,126 @@
+"""Authorizing a request from the user id and version in its token.
+
+Times ``GET /todos/?limit=1`` with the principal cache warm, as most
+requests find it, and with it emptied before every request, so each one
+looks up the token version. Then times the lookups themselves: the
+token version by primary key, against the search by email that
+resolving the principal used to take.
+
+    python -m benchmarks.bench_principal --users 100000
+"""
+
+import asyncio
+import time
+
+from sqlalchemy import insert, select
+
+from benchmarks.common import (
+    SEED_PASSWORD_HASH,
+    argument_parser,
+    asgi_client,
+    auth_headers,
+    create_user,
+    measure,
+    report,
+    seed_todos,
+    setup_database,
+    summarize,
+)
+from fast_zero.models import User
+from fast_zero.security import principal_cache
+
+
+async def seed_users(engine, count: int, chunk: int = 10_000):
+    async with engine.begin() as conn:
+        for start in range(0, count, chunk):
+            await conn.execute(
+                insert(User),
+                [
+                    {
+                        'username': f'seeded{number}',
+                        'email': f'seeded{number}@example.com',
+                        'password': SEED_PASSWORD_HASH,
+                    }
+                    for number in range(start, min(start + chunk, count))
+                ],
+            )
+
+
+async def uncached(client, url: str, requests: int, headers):
+    samples = []
+    for _ in range(requests):
+        principal_cache.clear()
+        start = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        samples.append(time.perf_counter() - start)
+        response.raise_for_status()
+    return samples
+
+
+async def lookups(engine, query, requests: int):
+    samples = []
+    async with engine.connect() as conn:
+        for _ in range(requests):
+            start = time.perf_counter()
+            (await conn.execute(query)).one()
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main(args):
+    engine = await setup_database(args.database_url)
+    await seed_users(engine, args.users)
+    results = []
+
+    async with asgi_client() as client:
+        user = await create_user(engine)
+        await seed_todos(engine, user.id, args.todos)
+        headers = auth_headers(user)
+        url = '/todos/?limit=1'
+
+        await measure(client, 'GET', url, 10, headers=headers)
+        for mode, samples in (
+            (
+                'cached',
+                await measure(
+                    client, 'GET', url, args.requests, headers=headers
+                ),
+            ),
+            (
+                'uncached',
+                await uncached(client, url, args.requests, headers),
+            ),
+            (
+                'token_version_by_id',
+                await lookups(
+                    engine,
+                    select(User.token_version).where(User.id == user.id),
+                    args.requests,
+                ),
+            ),
+            (
+                'principal_by_email',
+                await lookups(
+                    engine,
+                    select(User.id, User.email).where(
+                        User.email == user.email
+                    ),
+                    args.requests,
+                ),
+            ),
+        ):
+            results.append({
+                'mode': mode,
+                'users': args.users + 1,
+                **summarize(samples),
+            })
+
+    await engine.dispose()
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--todos', type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
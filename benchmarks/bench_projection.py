@@ -0,0 +1,103 @@
+"""Entity hydration versus column projection on large pages of todos.
+
+Loads one page of a user's todos the way list_todos used to, as mapped
+``Todo`` instances tracked by the session, and the way it does now, as
+rows holding only the ``TodoPublic`` columns. Reports throughput and
+the memory blocks a loaded page keeps alive.
+
+    python -m benchmarks.bench_projection --page-sizes 100 1000 10000
+"""
+
+import asyncio
+import time
+import tracemalloc
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.common import (
+    argument_parser,
+    create_user,
+    report,
+    seed_todos,
+    setup_database,
+    summarize,
+)
+from fast_zero.models import Todo
+from fast_zero.responses import columns
+from fast_zero.schemas import TodoPublic
+
+
+async def load_entities(engine, query):
+    async with AsyncSession(engine) as session:
+        return (await session.scalars(query)).all()
+
+
+async def load_rows(engine, query):
+    async with AsyncSession(engine) as session:
+        return [row._asdict() for row in await session.execute(query)]
+
+
+async def allocations(load, engine, query) -> tuple[int, float]:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        page = await load(engine, query)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del page
+    blocks = sum(
+        stat.count_diff for stat in after.compare_to(before, 'filename')
+    )
+    return blocks, peak / 2**10
+
+
+async def main(args):
+    engine = await setup_database(args.database_url)
+    user = await create_user(engine)
+    await seed_todos(engine, user.id, max(args.page_sizes))
+    results = []
+
+    for page_size in args.page_sizes:
+        for mode, load, statement in (
+            ('entities', load_entities, select(Todo)),
+            ('columns', load_rows, select(*columns(Todo, TodoPublic))),
+        ):
+            query = (
+                statement
+                .where(Todo.user_id == user.id)
+                .order_by(Todo.created_at, Todo.id)
+                .limit(page_size)
+            )
+
+            samples = []
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                await load(engine, query)
+                samples.append(time.perf_counter() - start)
+
+            blocks, peak_kb = await allocations(load, engine, query)
+            summary = summarize(samples)
+            results.append({
+                'mode': mode,
+                'page_size': page_size,
+                'rows_per_s': page_size / (summary['mean_ms'] / 1000),
+                'live_blocks': blocks,
+                'peak_kb': peak_kb,
+                **summary,
+            })
+
+    await engine.dispose()
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument(
+        '--page-sizes', type=int, nargs='+', default=[100, 1000, 10_000]
+    )
+    parser.set_defaults(requests=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,133 @@
+"""Revocation checks: the in-memory list versus a query per request.
+
+Revokes a million token ids and measures one lookup, for revoked and
+for valid tokens, against the compacted RevocationList, a plain set of
+jti strings and a primary key query on revoked_tokens. Also reports the
+memory each in-memory form takes, and how long the first full load and
+a compaction take.
+
+    python -m benchmarks.bench_revocation --revoked 1000000
+"""
+
+import asyncio
+import time
+import tracemalloc
+from uuid import uuid4
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.common import argument_parser, report, setup_database
+from fast_zero.models import RevokedToken
+from fast_zero.revocation import (
+    RevocationList,
+    from_timestamp,
+    load_revocations,
+)
+
+
+async def traced(build):
+    tracemalloc.start()
+    try:
+        result = await build()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, size / 2**20
+
+
+async def revocation_list(revoked, expires_at: float):
+    revocations = RevocationList()
+    for jti in revoked:
+        revocations.add(jti, expires_at)
+    await revocations.compact(time.time())
+    return revocations
+
+
+async def jti_set(revoked):
+    # Copies of the strings, as rows loaded from the table would be.
+    return {jti.encode().decode() for jti in revoked}
+
+
+def lookups(container, jtis):
+    start = time.perf_counter()
+    for jti in jtis:
+        jti in container  # noqa: B015
+    return (time.perf_counter() - start) / len(jtis)
+
+
+async def queries(engine, jtis):
+    async with AsyncSession(engine) as session:
+        start = time.perf_counter()
+        for jti in jtis:
+            await session.scalar(
+                select(RevokedToken.jti).where(RevokedToken.jti == jti)
+            )
+        return (time.perf_counter() - start) / len(jtis)
+
+
+async def main(args):
+    engine = await setup_database(args.database_url)
+    expires_at = time.time() + 3600
+    revoked = [uuid4().hex for _ in range(args.revoked)]
+    valid = [uuid4().hex for _ in range(args.lookups)]
+    sample = revoked[:: max(len(revoked) // args.lookups, 1)][: args.lookups]
+
+    async with engine.begin() as conn:
+        for start in range(0, len(revoked), 10_000):
+            await conn.execute(
+                insert(RevokedToken),
+                [
+                    {'jti': jti, 'expires_at': from_timestamp(expires_at)}
+                    for jti in revoked[start : start + 10_000]
+                ],
+            )
+
+    revocations = RevocationList()
+    start = time.perf_counter()
+    async with AsyncSession(engine) as session:
+        await load_revocations(session, revocations)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await revocations.compact(time.time())
+    compact_seconds = time.perf_counter() - start
+
+    _, list_mb = await traced(lambda: revocation_list(revoked, expires_at))
+    plain_set, set_mb = await traced(lambda: jti_set(revoked))
+
+    results = []
+    for mode, container, size_mb in (
+        ('revocation_list', revocations, list_mb),
+        ('set_of_jti', plain_set, set_mb),
+    ):
+        results.append({
+            'mode': mode,
+            'revoked': len(revoked),
+            'hit_ns': lookups(container, sample) * 1e9,
+            'miss_ns': lookups(container, valid) * 1e9,
+            'memory_mb': size_mb,
+        })
+    results.append({
+        'mode': 'query',
+        'revoked': len(revoked),
+        'hit_ns': await queries(engine, sample) * 1e9,
+        'miss_ns': await queries(engine, valid) * 1e9,
+        'memory_mb': 0.0,
+    })
+    results.append({
+        'mode': 'full_load_and_compact',
+        'revoked': len(revoked),
+        'load_s': load_seconds,
+        'compact_s': compact_seconds,
+    })
+
+    await engine.dispose()
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument('--revoked', type=int, default=1_000_000)
+    parser.add_argument('--lookups', type=int, default=10_000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,366 @@
+"""Concurrent load on every route of the auth, todos and users routers.
+
+Seeds ``--users`` users owning ``--todos`` todos each, then drives each
+route with ``--concurrency`` clients, in-process through ASGI and over
+HTTP through a real uvicorn server. Reports RPS, p50/p95/p99 and the
+number of SQL statements per request. Write the results with ``--json``
+and diff them between commits.
+
+    python -m benchmarks.bench_routes --json routes.json
+    python -m benchmarks.bench_routes --postgres --transport uvicorn
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from itertools import count
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from testcontainers.postgres import PostgresContainer
+
+from benchmarks.common import (
+    SEED_PASSWORD_HASH,
+    argument_parser,
+    asgi_client,
+    auth_headers,
+    count_statements,
+    create_user,
+    report,
+    seed_todos,
+    setup_database,
+    summarize,
+    uvicorn_client,
+)
+from fast_zero.models import Todo
+from fast_zero.security import (
+    account_rate_limit,
+    get_password_hash,
+    ip_rate_limit,
+)
+from tests.conftest import UserFactory
+from tests.test_todos import TodoFactory
+
+PASSWORD = 'benchmark-password'
+
+TRANSPORTS = {'asgi': asgi_client, 'uvicorn': uvicorn_client}
+LIMITS = (ip_rate_limit, account_rate_limit)
+
+
+@contextmanager
+def database_url(args):
+    if not args.postgres:
+        yield args.database_url
+        return
+
+    with PostgresContainer('postgres:16', driver='psycopg') as postgres:
+        yield postgres.get_connection_url()
+
+
+@contextmanager
+def rate_limits_off():
+    # Every request comes from one address and every login from one
+    # account, which the limits would soon answer with 429s. How they
+    # hold up is for bench_login_storm to measure.
+    rates = [limit.per_minute for limit in LIMITS]
+    for limit in LIMITS:
+        limit.per_minute = 0
+
+    try:
+        yield
+    finally:
+        for limit, rate in zip(LIMITS, rates):
+            limit.per_minute = rate
+
+
+async def seed_users(engine, count: int):
+    users = UserFactory.build_batch(count, password=SEED_PASSWORD_HASH)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add_all(users)
+        await session.commit()
+
+    return users
+
+
+async def fresh_todo_ids(engine, user, count: int) -> list[int]:
+    await seed_todos(engine, user.id, count)
+
+    async with AsyncSession(engine) as session:
+        ids = await session.scalars(
+            select(Todo.id)
+            .where(Todo.user_id == user.id)
+            .order_by(Todo.id.desc())
+            .limit(count)
+        )
+        return ids.all()
+
+
+def todo_payloads(count: int) -> list[dict]:
+    return [
+        {
+            'title': todo.title,
+            'description': todo.description,
+            'state': todo.state.value,
+        }
+        for todo in TodoFactory.build_batch(count)
+    ]
+
+
+class Scenarios:
+    """Builds, for each route, a function from request index to request.
+
+    Seeding happens before the route is timed, so routes that consume
+    rows (deletes, unique usernames) get fresh ones for every request.
+    """
+
+    def __init__(self, engine, args, users, login_user):
+        self.engine = engine
+        self.args = args
+        self.users = users
+        self.headers = [auth_headers(user) for user in users]
+        self.login_user = login_user
+        self.unique = count()
+
+    def owner(self, index: int):
+        position = index % len(self.users)
+        return self.users[position], self.headers[position]
+
+    async def login(self, requests: int):
+        data = {'username': self.login_user.email, 'password': PASSWORD}
+        return lambda i: ('POST', '/auth/token', {'data': data})
+
+    async def refresh_token(self, requests: int):
+        # A refresh revokes the token it replaces, so each request mints
+        # its own rather than spending the shared headers.
+        return lambda i: (
+            'POST',
+            '/auth/refresh_token',
+            {'headers': auth_headers(self.owner(i)[0])},
+        )
+
+    async def create_todo(self, requests: int):
+        payloads = todo_payloads(requests)
+        return lambda i: (
+            'POST',
+            '/todos/',
+            {'json': payloads[i], 'headers': self.owner(i)[1]},
+        )
+
+    async def list_todos(self, requests: int):
+        return lambda i: (
+            'GET',
+            '/todos/?limit=20',
+            {'headers': self.owner(i)[1]},
+        )
+
+    async def patch_todo(self, requests: int):
+        user, headers = self.owner(0)
+        ids = await fresh_todo_ids(self.engine, user, requests)
+        return lambda i: (
+            'PATCH',
+            f'/todos/{ids[i]}',
+            {'json': {'state': 'done'}, 'headers': headers},
+        )
+
+    async def delete_todo(self, requests: int):
+        user, headers = self.owner(0)
+        ids = await fresh_todo_ids(self.engine, user, requests)
+        return lambda i: (
+            'DELETE',
+            f'/todos/{ids[i]}',
+            {'headers': headers},
+        )
+
+    async def create_todos(self, requests: int):
+        payloads = todo_payloads(self.args.batch_size)
+        return lambda i: (
+            'POST',
+            '/todos/batch',
+            {'json': payloads, 'headers': self.owner(i)[1]},
+        )
+
+    async def patch_todos(self, requests: int):
+        user, headers = self.owner(0)
+        ids = await fresh_todo_ids(self.engine, user, self.args.batch_size)
+        changes = [{'id': todo_id, 'state': 'doing'} for todo_id in ids]
+        return lambda i: (
+            'PATCH',
+            '/todos/batch',
+            {'json': changes, 'headers': headers},
+        )
+
+    async def delete_todos(self, requests: int):
+        user, headers = self.owner(0)
+        size = self.args.batch_size
+        ids = await fresh_todo_ids(self.engine, user, requests * size)
+        return lambda i: (
+            'DELETE',
+            '/todos/batch',
+            {
+                'json': {'ids': ids[i * size : (i + 1) * size]},
+                'headers': headers,
+            },
+        )
+
+    async def create_user(self, requests: int):
+        def request(i):
+            username = f'bench{next(self.unique)}'
+            return (
+                'POST',
+                '/users/',
+                {
+                    'json': {
+                        'username': username,
+                        'email': f'{username}@example.com',
+                        'password': PASSWORD,
+                    }
+                },
+            )
+
+        return request
+
+    @staticmethod
+    async def list_users(requests: int):
+        return lambda i: ('GET', '/users/?limit=20', {})
+
+    async def get_user(self, requests: int):
+        return lambda i: ('GET', f'/users/{self.owner(i)[0].id}', {})
+
+    async def update_user(self, requests: int):
+        # Each update sets a new password, which bumps the token version
+        # and so ends the tokens of its user: one fresh user per request
+        # keeps the shared headers, and the next request, valid.
+        users = await seed_users(self.engine, requests)
+
+        def request(i):
+            return (
+                'PUT',
+                f'/users/{users[i].id}',
+                {
+                    'json': {
+                        'username': users[i].username,
+                        'email': users[i].email,
+                        'password': PASSWORD,
+                    },
+                    'headers': auth_headers(users[i]),
+                },
+            )
+
+        return request
+
+    async def delete_user(self, requests: int):
+        users = await seed_users(self.engine, requests)
+        return lambda i: (
+            'DELETE',
+            f'/users/{users[i].id}',
+            {'headers': auth_headers(users[i])},
+        )
+
+    def routes(self):
+        # Destructive routes run last so the others see the seeded data.
+        return {
+            'POST /auth/token': self.login,
+            'POST /auth/refresh_token': self.refresh_token,
+            'POST /todos/': self.create_todo,
+            'GET /todos/': self.list_todos,
+            'PATCH /todos/{todo_id}': self.patch_todo,
+            'POST /todos/batch': self.create_todos,
+            'PATCH /todos/batch': self.patch_todos,
+            'POST /users/': self.create_user,
+            'GET /users/': self.list_users,
+            'GET /users/{user_id}': self.get_user,
+            'PUT /users/{user_id}': self.update_user,
+            'DELETE /todos/{todo_id}': self.delete_todo,
+            'DELETE /todos/batch': self.delete_todos,
+            'DELETE /users/{user_id}': self.delete_user,
+        }
+
+
+async def drive(client, requests: int, concurrency: int, make_request):
+    samples = []
+    indexes = iter(range(requests))
+
+    async def worker():
+        for index in indexes:
+            method, url, kwargs = make_request(index)
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            samples.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+
+    return samples, time.perf_counter() - start
+
+
+async def run_transport(url: str, transport: str, args):
+    engine = await setup_database(url)
+    users = await seed_users(engine, args.users)
+    for user in users:
+        await seed_todos(engine, user.id, args.todos)
+    login_user = await create_user(
+        engine, password=get_password_hash(PASSWORD)
+    )
+    scenarios = Scenarios(engine, args, users, login_user)
+    results = []
+
+    async with TRANSPORTS[transport]() as client:
+        for route, setup in scenarios.routes().items():
+            make_request = await setup(args.requests)
+
+            with count_statements(engine) as counter:
+                samples, elapsed = await drive(
+                    client, args.requests, args.concurrency, make_request
+                )
+
+            results.append({
+                'transport': transport,
+                'route': route,
+                'concurrency': args.concurrency,
+                **summarize(samples),
+                'rps': len(samples) / elapsed,
+                'statements_per_request': counter['statements'] / len(samples),
+            })
+
+    await engine.dispose()
+    return results
+
+
+async def main(args):
+    results = []
+
+    with database_url(args) as url, rate_limits_off():
+        for transport in args.transport:
+            results.extend(await run_transport(url, transport, args))
+
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument(
+        '--todos', type=int, default=100, help='todos seeded per user'
+    )
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=100,
+        help='todos per request on the /todos/batch routes',
+    )
+    parser.add_argument(
+        '--transport',
+        nargs='+',
+        choices=sorted(TRANSPORTS),
+        default=sorted(TRANSPORTS),
+    )
+    parser.add_argument(
+        '--postgres',
+        action='store_true',
+        help='run against a throwaway testcontainers PostgreSQL',
+    )
+    parser.set_defaults(requests=200)
+    asyncio.run(main(parser.parse_args()))
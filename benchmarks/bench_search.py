@@ -0,0 +1,61 @@
+"""Indexed ``search`` versus the ``title``/``description`` LIKE filters.
+
+Seeds one user with a million todos (configurable) and compares the
+substring filters with the full-text search mode.
+
+    python -m benchmarks.bench_search --todos 1000000
+"""
+
+import asyncio
+
+from benchmarks.common import (
+    argument_parser,
+    asgi_client,
+    auth_headers,
+    create_user,
+    measure,
+    report,
+    seed_todos,
+    setup_database,
+    summarize,
+)
+
+# Common words stop a LIKE scan early; a missing word makes it read every
+# row the user owns.
+QUERIES = {
+    'title LIKE, common word': '/todos/?title=report&limit=20',
+    'title LIKE, missing word': '/todos/?title=zyzzyva&limit=20',
+    'description LIKE, missing word': '/todos/?description=zyzzyva&limit=20',
+    'search, common word': '/todos/?search=report&limit=20',
+    'search, missing word': '/todos/?search=zyzzyva&limit=20',
+    'search, two words': '/todos/?search=report%20budget&limit=20',
+}
+
+
+async def main(args):
+    engine = await setup_database(args.database_url)
+    user = await create_user(engine)
+    await seed_todos(engine, user.id, args.todos)
+    headers = auth_headers(user)
+    results = []
+
+    async with asgi_client() as client:
+        for mode, url in QUERIES.items():
+            samples = await measure(
+                client, 'GET', url, args.requests, headers=headers
+            )
+            results.append({
+                'mode': mode,
+                'todos': args.todos,
+                **summarize(samples),
+            })
+
+    await engine.dispose()
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument('--todos', type=int, default=1_000_000)
+    parser.set_defaults(requests=50)
+    asyncio.run(main(parser.parse_args()))
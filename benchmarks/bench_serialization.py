@@ -0,0 +1,75 @@
+"""List serialization alone: FastAPI's default path versus rows_response.
+
+Serializes pages of todos the way list_todos used to (ORM dataclasses
+through asdict, response_model validation and JSONResponse) and the
+way it does now (row dicts through a TypedDict TypeAdapter). Both must
+produce the same bytes.
+
+    python -m benchmarks.bench_serialization --page-size 1000
+"""
+
+import time
+from dataclasses import asdict
+from datetime import datetime
+
+from fastapi.responses import JSONResponse
+
+from benchmarks.common import argument_parser, report, summarize
+from fast_zero.responses import rows_response
+from fast_zero.schemas import TodoList, TodoPublic
+from tests.test_todos import TodoFactory
+
+
+def build_todos(count: int):
+    todos = TodoFactory.build_batch(count)
+    for id, todo in enumerate(todos, start=1):
+        todo.id = id
+        todo.created_at = todo.updated_at = datetime(
+            2024, 1, 1, 12, 0, id % 60
+        )
+    return todos
+
+
+def default_path(todos) -> bytes:
+    page = TodoList.model_validate({'todos': [asdict(todo) for todo in todos]})
+    return JSONResponse(page.model_dump(mode='json')).body
+
+
+def fast_path(rows) -> bytes:
+    return rows_response(TodoList, {'todos': rows, 'next_cursor': None}).body
+
+
+def timed(function, argument, runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function(argument)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main(args):
+    todos = build_todos(args.page_size)
+    rows = [
+        {field: getattr(todo, field) for field in TodoPublic.model_fields}
+        for todo in todos
+    ]
+
+    if default_path(todos) != fast_path(rows):
+        raise SystemExit('serializers disagree')
+
+    results = [
+        {'path': name, 'page_size': args.page_size, **summarize(samples)}
+        for name, samples in (
+            ('default', timed(default_path, todos, args.requests)),
+            ('rows_response', timed(fast_path, rows, args.requests)),
+        )
+    ]
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument('--page-size', type=int, default=1000)
+    parser.set_defaults(requests=200)
+    main(parser.parse_args())
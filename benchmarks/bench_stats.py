@@ -0,0 +1,79 @@
+"""Dashboard counts: /todos/stats versus one /todos request per state.
+
+Seeds users with growing numbers of todos and measures the dashboard's
+old approach, a ``/todos/?state=...`` page per state counted on the
+client, against a single ``/todos/stats`` request.
+
+    python -m benchmarks.bench_stats --todos 1000 100000
+"""
+
+import asyncio
+import time
+
+from benchmarks.common import (
+    argument_parser,
+    asgi_client,
+    auth_headers,
+    create_user,
+    measure,
+    report,
+    seed_todos,
+    setup_database,
+    summarize,
+)
+from fast_zero.models import TodoState
+
+
+async def per_state(client, headers, requests: int):
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        for state in TodoState:
+            response = await client.get(
+                f'/todos/?state={state.value}&limit=1000', headers=headers
+            )
+            response.raise_for_status()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main(args):
+    engine = await setup_database(args.database_url)
+    results = []
+
+    async with asgi_client() as client:
+        for count in args.todos:
+            user = await create_user(engine)
+            await seed_todos(engine, user.id, count)
+            headers = auth_headers(user)
+
+            for mode, samples in (
+                ('per_state', await per_state(client, headers, args.requests)),
+                (
+                    'stats',
+                    await measure(
+                        client,
+                        'GET',
+                        '/todos/stats',
+                        args.requests,
+                        headers=headers,
+                    ),
+                ),
+            ):
+                results.append({
+                    'mode': mode,
+                    'todos': count,
+                    **summarize(samples),
+                })
+
+    await engine.dispose()
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument(
+        '--todos', type=int, nargs='+', default=[1000, 100_000]
+    )
+    parser.set_defaults(requests=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,151 @@
+"""Soft deletes, listing around the trash and the batched purge.
+
+Times the UPDATE behind ``DELETE /todos/{id}``, which now moves the
+todo to the trash, against the hard DELETE it replaced, and lists todos
+before and after half of them went to the trash. Finally purges the
+trash with growing batch sizes: the time per batch is how long each
+purge transaction holds its locks.
+
+    python -m benchmarks.bench_trash --todos 100000
+"""
+
+import asyncio
+import time
+from datetime import timedelta
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from benchmarks.common import (
+    argument_parser,
+    asgi_client,
+    auth_headers,
+    create_user,
+    measure,
+    report,
+    seed_todos,
+    setup_database,
+    summarize,
+)
+from fast_zero.models import LIVE_TODO, Todo, TodoState
+from fast_zero.purge import purge_trash
+
+
+async def todo_ids(engine, user_id: int, count: int):
+    async with engine.connect() as conn:
+        return (
+            await conn.scalars(
+                select(Todo.id)
+                .where(Todo.user_id == user_id, LIVE_TODO)
+                .order_by(Todo.id)
+                .limit(count)
+            )
+        ).all()
+
+
+async def one_by_one(engine, ids, statement):
+    samples = []
+    for todo_id in ids:
+        start = time.perf_counter()
+        async with engine.begin() as conn:
+            await conn.execute(statement.where(Todo.id == todo_id))
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def trash_half(engine, user_id: int):
+    async with engine.begin() as conn:
+        await conn.execute(
+            update(Todo)
+            .where(Todo.user_id == user_id, Todo.id % 2 == 0)
+            .values(state=TodoState.trash)
+        )
+
+
+async def purge(engine, batch_size: int):
+    samples, purged = [], 0
+    async with AsyncSession(engine) as session:
+        while True:
+            start = time.perf_counter()
+            rows = await purge_trash(session, timedelta(0), batch_size)
+            samples.append(time.perf_counter() - start)
+            purged += rows
+            if rows < batch_size:
+                return purged, samples
+
+
+async def main(args):
+    engine = await setup_database(args.database_url)
+    results = []
+
+    async with asgi_client() as client:
+        user = await create_user(engine)
+        await seed_todos(engine, user.id, args.todos)
+        headers = auth_headers(user)
+
+        ids = await todo_ids(engine, user.id, 2 * args.requests)
+        trash = update(Todo).where(LIVE_TODO).values(state=TodoState.trash)
+        for mode, samples in (
+            (
+                'trash_todo',
+                await one_by_one(engine, ids[: args.requests], trash),
+            ),
+            (
+                'delete_todo',
+                await one_by_one(engine, ids[args.requests :], delete(Todo)),
+            ),
+            (
+                'list',
+                await measure(
+                    client,
+                    'GET',
+                    '/todos/?limit=100',
+                    args.requests,
+                    headers=headers,
+                ),
+            ),
+        ):
+            results.append({
+                'mode': mode,
+                'batch_size': None,
+                'rows': len(samples),
+                **summarize(samples),
+            })
+
+        await trash_half(engine, user.id)
+        samples = await measure(
+            client, 'GET', '/todos/?limit=100', args.requests, headers=headers
+        )
+        results.append({
+            'mode': 'list_half_trash',
+            'batch_size': None,
+            'rows': len(samples),
+            **summarize(samples),
+        })
+
+        for batch_size in args.batch_sizes:
+            await trash_half(engine, user.id)
+            start = time.perf_counter()
+            purged, samples = await purge(engine, batch_size)
+            elapsed = time.perf_counter() - start
+            results.append({
+                'mode': 'purge',
+                'batch_size': batch_size,
+                'rows': purged,
+                'rows_per_s': purged / elapsed,
+                **summarize(samples),
+            })
+            await seed_todos(engine, user.id, purged)
+
+    await engine.dispose()
+    report(results, args.json_path)
+
+
+if __name__ == '__main__':
+    parser = argument_parser(__doc__.splitlines()[0])
+    parser.add_argument('--todos', type=int, default=100_000)
+    parser.add_argument(
+        '--batch-sizes', type=int, nargs='+', default=[100, 1000, 10_000]
+    )
+    parser.set_defaults(requests=200)
+    asyncio.run(main(parser.parse_args()))
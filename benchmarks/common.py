@@ -0,0 +1,218 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run offline against a throwaway SQLite database by default.
+Pass ``--database-url`` to run them against PostgreSQL instead.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+_WORKDIR = tempfile.mkdtemp(prefix='fast_zero_bench_')
+DEFAULT_DATABASE_URL = f'sqlite+aiosqlite:///{_WORKDIR}/bench.db'
+
+os.environ.setdefault('DATABASE_URL', DEFAULT_DATABASE_URL)
+os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key-not-for-production')
+os.environ.setdefault('ALGORITHM', 'HS256')
+os.environ.setdefault('ACCESS_TOKEN_EXPIRE_MINUTES', '30')
+
+import uvicorn  # noqa: E402
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+from sqlalchemy.ext.asyncio import (  # noqa: E402
+    AsyncSession,
+    create_async_engine,
+)
+
+from fast_zero.app import app  # noqa: E402
+from fast_zero.database import (  # noqa: E402
+    enable_sqlite_foreign_keys,
+    get_replica_session,
+    get_session,
+)
+from fast_zero.models import Todo, table_registry  # noqa: E402
+from fast_zero.security import (  # noqa: E402
+    access_token_for,
+    get_password_hash,
+)
+from tests.conftest import UserFactory  # noqa: E402
+from tests.test_todos import TodoFactory  # noqa: E402
+
+# Hashing a password per seeded user would dominate the setup time, so
+# they all share one. It is a real hash: PUT /users/{id} verifies it.
+SEED_PASSWORD_HASH = get_password_hash('seed-password')
+
+
+def argument_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        '--database-url',
+        default=DEFAULT_DATABASE_URL,
+        help='SQLAlchemy async URL (default: temporary SQLite file)',
+    )
+    parser.add_argument(
+        '--requests',
+        type=int,
+        default=500,
+        help='requests measured per scenario',
+    )
+    parser.add_argument(
+        '--json', dest='json_path', help='write the results to this file'
+    )
+    return parser
+
+
+async def setup_database(url: str):
+    engine = create_async_engine(url)
+    if engine.dialect.name == 'sqlite':
+        enable_sqlite_foreign_keys(engine)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.drop_all)
+        await conn.run_sync(table_registry.metadata.create_all)
+
+    async def get_session_override():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_replica_session] = get_session_override
+
+    return engine
+
+
+async def create_user(engine, **kwargs):
+    kwargs.setdefault('password', SEED_PASSWORD_HASH)
+    user = UserFactory(**kwargs)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add(user)
+        await session.commit()
+
+    return user
+
+
+async def seed_todos(engine, user_id: int, count: int, chunk: int = 5000):
+    # One multi-row INSERT per chunk: the todo count triggers then run once
+    # per chunk rather than once per row, as they would for executemany.
+    async with AsyncSession(engine) as session:
+        for start in range(0, count, chunk):
+            rows = [
+                {
+                    'title': todo.title,
+                    'description': todo.description,
+                    'state': todo.state,
+                    'user_id': user_id,
+                }
+                for todo in TodoFactory.build_batch(min(chunk, count - start))
+            ]
+            await session.execute(insert(Todo).values(rows))
+        await session.commit()
+
+
+def auth_headers(user) -> dict[str, str]:
+    token = access_token_for(user)
+    return {'Authorization': f'Bearer {token}'}
+
+
+@asynccontextmanager
+async def asgi_client():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(
+        transport=transport, base_url='http://bench'
+    ) as client:
+        yield client
+
+
+@asynccontextmanager
+async def uvicorn_client():
+    # A real server on an ephemeral port, in this process so the engine
+    # events used for statement counting still see its queries.
+    config = uvicorn.Config(
+        app, host='127.0.0.1', port=0, log_level='warning', lifespan='off'
+    )
+    server = uvicorn.Server(config)
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+
+    try:
+        async with AsyncClient(base_url=f'http://127.0.0.1:{port}') as client:
+            yield client
+    finally:
+        server.should_exit = True
+        await task
+
+
+@contextmanager
+def count_statements(engine):
+    counter = {'statements': 0}
+
+    def before_cursor_execute(*args):
+        counter['statements'] += 1
+
+    event.listen(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+    try:
+        yield counter
+    finally:
+        event.remove(
+            engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+        )
+
+
+async def measure(client, method: str, url: str, requests: int, **kwargs):
+    samples = []
+
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        samples.append(time.perf_counter() - start)
+        response.raise_for_status()
+
+    return samples
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {
+        'requests': len(samples),
+        'mean_ms': statistics.fmean(samples) * 1000,
+        'p50_ms': cuts[49] * 1000,
+        'p95_ms': cuts[94] * 1000,
+        'p99_ms': cuts[98] * 1000,
+    }
+
+
+def rss_mb() -> float:
+    try:
+        with open('/proc/self/statm', encoding='utf-8') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        # ru_maxrss is the peak, in KiB on Linux and bytes on macOS.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+def report(results: list[dict], json_path: str | None = None):
+    for result in results:
+        print(
+            ' '.join(
+                f'{key}={value:.2f}'
+                if isinstance(value, float)
+                else f'{key}={value}'
+                for key, value in result.items()
+            )
+        )
+
+    if json_path:
+        with open(json_path, 'w', encoding='utf-8') as output:
+            json.dump(results, output, indent=2)
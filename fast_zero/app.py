@@ -1,11 +1,88 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+from datetime import timedelta
 from http import HTTPStatus
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
+from fast_zero.database import async_engine
+from fast_zero.instrumentation import QueryStatsMiddleware
+from fast_zero.metrics import (
+    MetricsMiddleware,
+    registry,
+    retire_dead_workers,
+)
+from fast_zero.purge import purge_trash_forever
+from fast_zero.revocation import refresh_revocations_forever
 from fast_zero.routers import auth, todos, users
 from fast_zero.schemas import Message
+from fast_zero.security import revoked_tokens
+from fast_zero.settings import Settings
 
-app = FastAPI()
+settings = Settings()
+logger = logging.getLogger(__name__)
+
+
+async def flush_metrics(directory: str, interval: float):
+    while True:
+        try:
+            registry.write(directory)
+            retire_dead_workers(directory)
+        except Exception:
+            logger.exception('Metrics flush failed')
+        await asyncio.sleep(interval)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    if settings.METRICS_DIR:
+        tasks.append(
+            asyncio.create_task(
+                flush_metrics(
+                    settings.METRICS_DIR, settings.METRICS_FLUSH_SECONDS
+                )
+            )
+        )
+    if settings.TRASH_PURGE_BATCH_SIZE:
+        tasks.append(
+            asyncio.create_task(
+                purge_trash_forever(
+                    async_engine,
+                    timedelta(days=settings.TRASH_RETENTION_DAYS),
+                    timedelta(days=settings.DELETION_LOG_RETENTION_DAYS),
+                    settings.TRASH_PURGE_BATCH_SIZE,
+                    settings.TRASH_PURGE_INTERVAL_SECONDS,
+                )
+            )
+        )
+
+    if settings.REVOCATION_REFRESH_SECONDS:
+        tasks.append(
+            asyncio.create_task(
+                refresh_revocations_forever(
+                    async_engine,
+                    revoked_tokens,
+                    settings.REVOCATION_REFRESH_SECONDS,
+                    settings.REVOCATION_COMPACT_SECONDS,
+                )
+            )
+        )
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        with suppress(asyncio.CancelledError):
+            await task
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(todos.router)
@@ -15,3 +92,11 @@ app.include_router(users.router)
 @app.get('/', status_code=HTTPStatus.OK, response_model=Message)
 async def read_root():
     return {'message': 'Olá, Mundo!'}
+
+
+@app.get('/metrics', response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(
+        registry.render(settings.METRICS_DIR),
+        media_type='text/plain; version=0.0.4',
+    )
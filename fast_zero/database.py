@@ -1,10 +1,188 @@
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
+from fast_zero.instrumentation import instrument_engine
+from fast_zero.metrics import registry
 from fast_zero.settings import Settings
 
-async_engine = create_async_engine(Settings().DATABASE_URL)
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkouts = 0
+        self.queued = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.peak_checked_out = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            'checkouts': self.checkouts,
+            'queued': self.queued,
+            'waiting': self.waiting,
+            'peak_waiting': self.peak_waiting,
+            'peak_checked_out': self.peak_checked_out,
+            'timeouts': self.timeouts,
+            'total_wait_seconds': self.total_wait_seconds,
+            'max_wait_seconds': self.max_wait_seconds,
+        }
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        metrics = self.metrics
+        # Only checkouts that find every connection in use have to queue.
+        queued = -1 < self._max_overflow <= self.checkedout() - self.size()
+        if queued:
+            metrics.queued += 1
+            metrics.waiting += 1
+            metrics.peak_waiting = max(metrics.peak_waiting, metrics.waiting)
+        start = perf_counter()
+
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            metrics.timeouts += 1
+            raise
+        finally:
+            waited = perf_counter() - start
+            if queued:
+                metrics.waiting -= 1
+            metrics.total_wait_seconds += waited
+            metrics.max_wait_seconds = max(metrics.max_wait_seconds, waited)
+
+        metrics.checkouts += 1
+        metrics.peak_checked_out = max(
+            metrics.peak_checked_out, self.checkedout()
+        )
+
+        return record
+
+
+def engine_options(database_url: str, settings: Settings) -> dict:
+    url = make_url(database_url)
+    options = {
+        'pool_pre_ping': settings.DATABASE_POOL_PRE_PING,
+        'pool_recycle': settings.DATABASE_POOL_RECYCLE_SECONDS,
+    }
+
+    # In-memory SQLite keeps a single shared connection, so there is no
+    # pool to size.
+    in_memory = url.database in {None, '', ':memory:'}
+    if url.get_backend_name() == 'sqlite' and in_memory:
+        return options
+
+    options.update(
+        poolclass=MeteredPool,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT_SECONDS,
+    )
+
+    if url.get_driver_name() == 'psycopg':
+        connect_args = {
+            'prepare_threshold': settings.DATABASE_PREPARE_THRESHOLD
+        }
+        if timeout := settings.DATABASE_STATEMENT_TIMEOUT_MS:
+            connect_args['options'] = f'-c statement_timeout={timeout}'
+
+        options['connect_args'] = connect_args
+
+    return options
+
+
+def enable_sqlite_foreign_keys(engine):
+    # SQLite ignores foreign keys, ON DELETE CASCADE included, unless each
+    # connection turns them on.
+    @event.listens_for(engine.sync_engine, 'connect')
+    def foreign_keys_on(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys = ON')
+        cursor.close()
+
+
+def build_engine(database_url: str, settings: Settings):
+    engine = create_async_engine(
+        database_url, **engine_options(database_url, settings)
+    )
+    if engine.dialect.name == 'sqlite':
+        enable_sqlite_foreign_keys(engine)
+    return engine
+
+
+settings = Settings()
+
+async_engine = build_engine(settings.DATABASE_URL, settings)
+replica_engine = (
+    build_engine(settings.DATABASE_REPLICA_URL, settings)
+    if settings.DATABASE_REPLICA_URL
+    else async_engine
+)
+instrument_engine(async_engine)
+instrument_engine(replica_engine)
+
+POOL_CONNECTIONS = registry.gauge(
+    'db_pool_connections',
+    'Pool connections by state.',
+    ('engine', 'state'),
+)
+POOL_CHECKOUTS = registry.counter(
+    'db_pool_checkouts_total', 'Pool checkouts.', ('engine',)
+)
+POOL_QUEUED_CHECKOUTS = registry.counter(
+    'db_pool_queued_checkouts_total',
+    'Pool checkouts that found every connection in use.',
+    ('engine',),
+)
+POOL_WAIT_SECONDS = registry.counter(
+    'db_pool_wait_seconds_total',
+    'Time spent waiting for a pool connection.',
+    ('engine',),
+)
+POOL_TIMEOUTS = registry.counter(
+    'db_pool_timeouts_total',
+    'Checkouts that gave up waiting for a connection.',
+    ('engine',),
+)
+
+
+@registry.add_collector
+def collect_pool_metrics():
+    engines = {'primary': async_engine}
+    if replica_engine is not async_engine:
+        engines['replica'] = replica_engine
+
+    for name, engine in engines.items():
+        pool = engine.sync_engine.pool
+        if not isinstance(pool, MeteredPool):
+            continue
+
+        metrics = pool.metrics
+        POOL_CONNECTIONS.set(pool.checkedout(), name, 'in_use')
+        POOL_CONNECTIONS.set(pool.checkedin(), name, 'idle')
+        POOL_CONNECTIONS.set(metrics.waiting, name, 'waiting')
+        POOL_CHECKOUTS.set(metrics.checkouts, name)
+        POOL_QUEUED_CHECKOUTS.set(metrics.queued, name)
+        POOL_WAIT_SECONDS.set(metrics.total_wait_seconds, name)
+        POOL_TIMEOUTS.set(metrics.timeouts, name)
 
 
 async def get_session():  # pragma: no cover.
     async with AsyncSession(async_engine, expire_on_commit=False) as session:
         yield session
+
+
+async def get_replica_session():  # pragma: no cover.
+    async with AsyncSession(replica_engine, expire_on_commit=False) as session:
+        yield session
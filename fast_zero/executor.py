@@ -0,0 +1,50 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+
+class BoundedExecutor:
+    def __init__(self, max_workers: int, name: str):
+        self.max_workers = max_workers
+        self.queued = 0
+        self.running = 0
+        self.peak_queued = 0
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=name
+        )
+
+    async def run(self, func, *args):
+        with self._lock:
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+
+        future = self._executor.submit(self._call, func, args)
+        future.add_done_callback(self._forget_cancelled)
+
+        return await asyncio.wrap_future(future)
+
+    def _call(self, func, args):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def _forget_cancelled(self, future):
+        # Cancelled while still queued, so _call never ran for it.
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'max_workers': self.max_workers,
+            'running': self.running,
+            'queued': self.queued,
+            'peak_queued': self.peak_queued,
+        }
@@ -0,0 +1,139 @@
+import csv
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.models import Todo
+
+LINE_TOO_LONG = 'Line too long'
+
+COPY_TODOS = 'COPY todos (title, description, state, user_id) FROM STDIN'
+
+
+async def iter_lines(chunks, max_line_bytes: int):
+    """Splits a streamed body into numbered lines.
+
+    Only the line being assembled is buffered, so memory does not grow
+    with the body. Lines longer than ``max_line_bytes`` are discarded
+    as they arrive and come out as ``None``.
+    """
+    number = 0
+    pending = bytearray()
+    skipping = False
+
+    async for chunk in chunks:
+        start = 0
+        while (end := chunk.find(b'\n', start)) != -1:
+            number += 1
+            if not skipping:
+                pending += chunk[start:end]
+            too_long = skipping or len(pending) > max_line_bytes
+            yield number, None if too_long else bytes(pending)
+            pending.clear()
+            skipping = False
+            start = end + 1
+
+        if not skipping:
+            pending += chunk[start:]
+            if len(pending) > max_line_bytes:
+                pending.clear()
+                skipping = True
+
+    if skipping or pending:
+        yield number + 1, None if skipping else bytes(pending)
+
+
+def _errors(error: ValidationError) -> list[dict]:
+    return error.errors(
+        include_url=False, include_context=False, include_input=False
+    )
+
+
+async def ndjson_items(lines, schema: type[BaseModel]):
+    """Validates one JSON document per line, yielding ``(line, item,
+    error)`` with exactly one of ``item`` and ``error`` set."""
+    async for number, line in lines:
+        if line is None:
+            yield number, None, LINE_TOO_LONG
+        elif line.strip():
+            try:
+                item = schema.model_validate_json(line)
+            except ValidationError as error:
+                yield number, None, _errors(error)
+            else:
+                yield number, item, None
+
+
+async def _csv_records(lines, max_record_bytes: int):
+    # A quoted field may span lines. RFC 4180 escapes quotes by doubling
+    # them, so a record is complete once it holds an even number of them.
+    parts, first, size, quotes = [], 0, 0, 0
+
+    async for number, line in lines:
+        if not parts:
+            first = number
+        if line is None or size + len(line) > max_record_bytes:
+            parts, size, quotes = [], 0, 0
+            yield first, None
+            continue
+
+        parts.append(line.removesuffix(b'\r'))
+        size += len(line)
+        quotes += line.count(b'"')
+        if quotes % 2 == 0:
+            yield first, b'\n'.join(parts)
+            parts, size, quotes = [], 0, 0
+
+    if parts:
+        yield first, b'\n'.join(parts)
+
+
+async def csv_items(lines, schema: type[BaseModel], max_record_bytes: int):
+    """Validates the records of a CSV body whose first record names the
+    columns, yielding ``(line, item, error)`` like ``ndjson_items``."""
+    header = None
+
+    async for number, record in _csv_records(lines, max_record_bytes):
+        if record is None:
+            yield number, None, LINE_TOO_LONG
+            continue
+        if not record.strip():
+            continue
+
+        try:
+            (values,) = csv.reader([record.decode()])
+        except (UnicodeDecodeError, csv.Error) as error:
+            yield number, None, str(error)
+            continue
+
+        if header is None:
+            header = values
+            continue
+
+        try:
+            item = schema.model_validate(dict(zip(header, values)))
+        except ValidationError as error:
+            yield number, None, _errors(error)
+        else:
+            yield number, item, None
+
+
+async def insert_todos(session: AsyncSession, rows: list[dict]):
+    """Inserts a chunk of todos with COPY on PostgreSQL and a single
+    executemany INSERT elsewhere."""
+    if session.bind.dialect.name != 'postgresql':
+        await session.execute(insert(Todo), rows)
+        return
+
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    async with raw.driver_connection.cursor() as cursor:
+        async with cursor.copy(COPY_TODOS) as copy:
+            for row in rows:
+                await copy.write_row((
+                    row['title'],
+                    row['description'],
+                    row['state'].name,
+                    row['user_id'],
+                ))
@@ -0,0 +1,146 @@
+import logging
+from collections import defaultdict
+from contextvars import ContextVar
+from time import perf_counter
+
+from sqlalchemy import event
+
+from fast_zero.settings import Settings
+
+settings = Settings()
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    __slots__ = (
+        'seconds',
+        'slowest_seconds',
+        'slowest_statement',
+        'statements',
+    )
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement = None
+
+    def add(self, statement: str, seconds: float):
+        self.statements += 1
+        self.seconds += seconds
+        if seconds > self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+
+current_queries: ContextVar[QueryStats | None] = ContextVar(
+    'current_queries', default=None
+)
+
+
+class RouteStats:
+    def __init__(self):
+        self._routes = defaultdict(
+            lambda: {
+                'requests': 0,
+                'statements': 0,
+                'max_statements': 0,
+                'db_seconds': 0.0,
+                'slowest_seconds': 0.0,
+                'slowest_statement': None,
+            }
+        )
+
+    def record(self, route: str, queries: QueryStats):
+        stats = self._routes[route]
+        stats['requests'] += 1
+        stats['statements'] += queries.statements
+        stats['max_statements'] = max(
+            stats['max_statements'], queries.statements
+        )
+        stats['db_seconds'] += queries.seconds
+        if queries.slowest_seconds > stats['slowest_seconds']:
+            stats['slowest_seconds'] = queries.slowest_seconds
+            stats['slowest_statement'] = queries.slowest_statement
+
+    def __getitem__(self, route: str) -> dict:
+        return self._routes[route]
+
+    def clear(self):
+        self._routes.clear()
+
+    def stats(self) -> dict[str, dict]:
+        return {route: dict(stats) for route, stats in self._routes.items()}
+
+
+route_stats = RouteStats()
+
+
+def _before_cursor_execute(conn, cursor, statement, *args):
+    conn.info.setdefault('query_start', []).append(perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, *args):
+    seconds = perf_counter() - conn.info['query_start'].pop()
+
+    queries = current_queries.get()
+    if queries is not None:
+        queries.add(statement, seconds)
+
+    if seconds * 1000 >= settings.SLOW_QUERY_MS:
+        logger.warning('Slow query (%.1f ms): %s', seconds * 1000, statement)
+
+
+def instrument_engine(engine):
+    sync_engine = engine.sync_engine
+    if event.contains(
+        sync_engine, 'before_cursor_execute', _before_cursor_execute
+    ):
+        return
+
+    event.listen(sync_engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(sync_engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def server_timing(queries: QueryStats) -> str:
+    return (
+        f'db;dur={queries.seconds * 1000:.2f};'
+        f'desc="{queries.statements} queries", '
+        f'db-slowest;dur={queries.slowest_seconds * 1000:.2f}'
+    )
+
+
+class QueryStatsMiddleware:
+    """Attributes the SQL run while handling a request to its route.
+
+    The totals go out in a Server-Timing header and are aggregated per
+    route in ``route_stats``.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        queries = QueryStats()
+        token = current_queries.set(queries)
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                message['headers'] = [
+                    *message.get('headers', []),
+                    (b'server-timing', server_timing(queries).encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_queries.reset(token)
+            route = scope.get('route')
+            if route is not None:
+                route_stats.record(f'{scope["method"]} {route.path}', queries)
@@ -0,0 +1,344 @@
+import fcntl
+import json
+import logging
+import os
+from bisect import bisect_left
+from pathlib import Path
+from time import perf_counter
+
+logger = logging.getLogger(__name__)
+
+# Counters and histograms of exited workers, added up.
+RETIRED = 'retired'
+
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+# Observations happen on the event loop thread only, so the collectors
+# skip locking to keep each one well under a microsecond.
+class Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._series = {}
+
+    def snapshot(self) -> dict:
+        series = [
+            [list(labels), self._copy(value)]
+            for labels, value in self._series.items()
+        ]
+        return {
+            'type': self.kind,
+            'help': self.documentation,
+            'labels': list(self.labels),
+            'series': series,
+        }
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+    def clear(self):
+        self._series.clear()
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount: float = 1):
+        self._series[labels] = self._series.get(labels, 0) + amount
+
+    def set(self, value: float, *labels):
+        # For collectors that mirror a total kept somewhere else.
+        self._series[labels] = value
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, *labels, amount: float = 1):
+        self._series[labels] = self._series.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self._series[labels] = self._series.get(labels, 0) - amount
+
+    def set(self, value: float, *labels):
+        self._series[labels] = value
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=None):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets or DEFAULT_BUCKETS)
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [
+                [0] * (len(self.buckets) + 1),
+                0.0,
+            ]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def snapshot(self) -> dict:
+        return {**super().snapshot(), 'buckets': list(self.buckets)}
+
+    @staticmethod
+    def _copy(value):
+        return [list(value[0]), value[1]]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict[str, Metric] = {}
+        self.collectors = []
+
+    def _register(self, metric: Metric) -> Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels=()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels=()) -> Gauge:
+        return self._register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self, name: str, documentation: str, labels=(), buckets=None
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def add_collector(self, collector):
+        """Registers a callable that refreshes gauges right before a
+        snapshot, for values that are cheaper to read than to track."""
+        self.collectors.append(collector)
+        return collector
+
+    def snapshot(self) -> dict:
+        for collector in self.collectors:
+            collector()
+        return {
+            name: metric.snapshot() for name, metric in self.metrics.items()
+        }
+
+    def write(self, directory: str):
+        _write_snapshot(
+            Path(directory) / f'{os.getpid()}.json', self.snapshot()
+        )
+
+    def render(self, directory: str | None = None) -> str:
+        if directory is None:
+            return render(self.snapshot())
+
+        try:
+            self.write(directory)
+        except OSError:
+            # Better this worker's own numbers than no scrape at all.
+            logger.exception('Could not write metrics to %s', directory)
+            return render(self.snapshot())
+        return render(merge(read_snapshots(directory)))
+
+
+def _write_snapshot(path: Path, snapshot: dict):
+    temporary = path.with_suffix('.tmp')
+    temporary.write_text(json.dumps(snapshot), encoding='utf-8')
+    os.replace(temporary, path)
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def read_snapshots(directory: str):
+    for path in Path(directory).glob('*.json'):
+        # Files are replaced atomically, but a worker may remove its own
+        # between the glob and the read.
+        try:
+            snapshot = json.loads(path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            continue
+        yield snapshot, path.stem != RETIRED and pid_alive(int(path.stem))
+
+
+def retire_dead_workers(directory: str):
+    """Folds the files of exited workers into the retired totals and
+    removes them, so the directory, and every merge, only grows with the
+    workers alive."""
+    directory = Path(directory)
+
+    # Two workers retiring the same files would count them twice.
+    with open(directory / '.lock', 'a', encoding='utf-8') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        dead = [
+            path
+            for path in directory.glob('*.json')
+            if path.stem != RETIRED and not pid_alive(int(path.stem))
+        ]
+        if not dead:
+            return
+
+        retired = directory / f'{RETIRED}.json'
+        snapshots = [
+            json.loads(path.read_text(encoding='utf-8'))
+            for path in (retired, *dead)
+            if path.exists()
+        ]
+        # Merged as dead workers, so their gauges are left out.
+        _write_snapshot(
+            retired, merge((snapshot, False) for snapshot in snapshots)
+        )
+        for path in dead:
+            path.unlink()
+
+
+def merge(snapshots) -> dict:
+    """Adds up the snapshots written by every worker process.
+
+    Counters and histograms keep the totals of workers that exited, as
+    they only ever grow. Gauges describe the present, so only live
+    workers count.
+    """
+    merged = {}
+
+    for snapshot, alive in snapshots:
+        for name, metric in snapshot.items():
+            if metric['type'] == 'gauge' and not alive:
+                continue
+
+            target = merged.setdefault(name, {**metric, 'series': []})
+            series = {
+                tuple(labels): value for labels, value in target['series']
+            }
+            for labels, value in metric['series']:
+                current = series.get(tuple(labels))
+                if current is None:
+                    series[tuple(labels)] = value
+                elif metric['type'] == 'histogram':
+                    series[tuple(labels)] = [
+                        [a + b for a, b in zip(current[0], value[0])],
+                        current[1] + value[1],
+                    ]
+                else:
+                    series[tuple(labels)] = current + value
+            target['series'] = [
+                [list(labels), value] for labels, value in series.items()
+            ]
+
+    return merged
+
+
+def _escape(value) -> str:
+    return (
+        str(value)
+        .replace('\\', r'\\')
+        .replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def _labels(names, values, extra: str = '') -> str:
+    pairs = [
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def render(snapshot: dict) -> str:
+    lines = []
+
+    for name, metric in sorted(snapshot.items()):
+        lines.extend((
+            f'# HELP {name} {metric["help"]}',
+            f'# TYPE {name} {metric["type"]}',
+        ))
+        names = metric['labels']
+
+        for values, value in sorted(metric['series']):
+            if metric['type'] != 'histogram':
+                lines.append(f'{name}{_labels(names, values)} {value}')
+                continue
+
+            counts, total = value
+            cumulative = 0
+            bounds = [*map(str, metric['buckets']), '+Inf']
+            for bound, bucket in zip(bounds, counts):
+                cumulative += bucket
+                le = _labels(names, values, f'le="{bound}"')
+                lines.append(f'{name}_bucket{le} {cumulative}')
+            lines.extend((
+                f'{name}_sum{_labels(names, values)} {total}',
+                f'{name}_count{_labels(names, values)} {cumulative}',
+            ))
+
+    return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency by route template.',
+    ('method', 'route', 'status'),
+)
+REQUESTS_IN_FLIGHT = registry.gauge(
+    'http_requests_in_flight', 'HTTP requests being handled.'
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = [500]
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get('route')
+            REQUEST_LATENCY.observe(
+                elapsed,
+                scope['method'],
+                route.path if route is not None else 'unmatched',
+                str(status[0]),
+            )
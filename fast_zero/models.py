@@ -1,7 +1,9 @@
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import DDL, DateTime, ForeignKey, Index, event, func, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.dialects.postgresql import to_tsvector
 from sqlalchemy.orm import (
     Mapped,
     mapped_as_dataclass,
@@ -10,7 +12,15 @@ from sqlalchemy.orm import (
     relationship,
 )
 
-table_registry = registry()
+# SQLite's CURRENT_TIMESTAMP has no fractional seconds, so bound values
+# must not carry them either or (created_at, id) comparisons break ties.
+table_registry = registry(
+    type_annotation_map={
+        datetime: DateTime().with_variant(
+            sqlite.DATETIME(truncate_microseconds=True), 'sqlite'
+        )
+    }
+)
 
 
 class TodoState(str, Enum):
@@ -21,16 +31,28 @@ class TodoState(str, Enum):
     trash = 'trash'
 
 
+# Deleting a todo only moves it to the trash, which the purge empties
+# later. Both conditions are literal SQL, not bound parameters, so the
+# planners can match them against the partial indexes on todos.
+LIVE_TODO = text("state <> 'trash'")
+TRASHED_TODO = text("state = 'trash'")
+
+
 @mapped_as_dataclass(table_registry)
 class User:
     __tablename__ = 'users'
+    __table_args__ = (Index('ix_users_created_at_id', 'created_at', 'id'),)
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     username: Mapped[str] = mapped_column(unique=True)
     password: Mapped[str] = mapped_column()
     email: Mapped[str] = mapped_column(unique=True)
+    # The database deletes a user's todos itself, in one statement.
     todos: Mapped[list['Todo']] = relationship(
-        init=False, cascade='all, delete-orphan', lazy='selectin'
+        init=False,
+        cascade='all, delete-orphan',
+        lazy='raise',
+        passive_deletes=True,
     )
     created_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now()
@@ -40,17 +62,40 @@ class User:
         server_default=func.now(),
         onupdate=func.now(),
     )
+    # Carried by every access token; bumping it rejects the tokens issued
+    # before, without a lookup of the user on each request.
+    token_version: Mapped[int] = mapped_column(init=False, server_default='0')
 
 
 @mapped_as_dataclass(table_registry)
 class Todo:
     __tablename__ = 'todos'
+    __table_args__ = (
+        Index('ix_todos_user_id_state', 'user_id', 'state'),
+        Index(
+            'ix_todos_live_user_id_created_at_id',
+            'user_id',
+            'created_at',
+            'id',
+            postgresql_where=LIVE_TODO,
+            sqlite_where=LIVE_TODO,
+        ),
+        Index(
+            'ix_todos_trash_updated_at',
+            'updated_at',
+            postgresql_where=TRASHED_TODO,
+            sqlite_where=TRASHED_TODO,
+        ),
+        Index('ix_todos_user_id_version_id', 'user_id', 'version', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     title: Mapped[str]
     description: Mapped[str]
     state: Mapped[TodoState]
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
     created_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now()
     )
@@ -59,3 +104,403 @@ class Todo:
         server_default=func.now(),
         onupdate=func.now(),
     )
+    # The owner's todo version when the todo was last written, stamped by
+    # the triggers below. /todos/changes pages through todos by it.
+    version: Mapped[int] = mapped_column(init=False, server_default='0')
+
+
+# Full-text search over title and description. PostgreSQL matches the
+# expression below against a GIN index; SQLite keeps an FTS5 table in
+# sync through triggers. Both use plain lowercase word tokens.
+SEARCH_CONFIG = text("'simple'::regconfig")
+
+todo_search_vector = to_tsvector(
+    SEARCH_CONFIG,
+    Todo.__table__.c.title + text("' '") + Todo.__table__.c.description,
+)
+
+Index('ix_todos_search', todo_search_vector, postgresql_using='gin').ddl_if(
+    dialect='postgresql'
+)
+
+TODOS_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE todos_fts USING fts5(
+        title, description, content='todos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 0'
+    )
+    """,
+    """
+    CREATE TRIGGER todos_fts_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_fts_delete AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_fts_update AFTER UPDATE OF title, description
+    ON todos BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+for statement in TODOS_FTS_DDL:
+    event.listen(
+        Todo.__table__,
+        'after_create',
+        DDL(statement).execute_if(dialect='sqlite'),
+    )
+
+event.listen(
+    Todo.__table__,
+    'before_drop',
+    DDL('DROP TABLE IF EXISTS todos_fts').execute_if(dialect='sqlite'),
+)
+
+
+# Per-user todo counts kept up to date by triggers, so reading them costs
+# the same however many todos a user has. They run on every write path:
+# single and batch endpoints, COPY imports and cascading deletes alike.
+@mapped_as_dataclass(table_registry)
+class TodoStateCount:
+    __tablename__ = 'todo_state_counts'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    state: Mapped[TodoState] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(default=0)
+
+
+# Activity per day: todos created, and todos moved to done, on that day.
+# Like any event count they are not taken back when todos go away.
+@mapped_as_dataclass(table_registry)
+class TodoDailyCount:
+    __tablename__ = 'todo_daily_counts'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(primary_key=True)
+    created: Mapped[int] = mapped_column(default=0)
+    done: Mapped[int] = mapped_column(default=0)
+
+
+# PostgreSQL aggregates each statement's transition tables, so a batch,
+# an import or a cascade adjusts every counter once. Rows are upserted in
+# key order so concurrent writers lock counters in the same order.
+TODO_COUNTS_POSTGRESQL_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION todo_counts_insert() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO todo_state_counts AS counts (user_id, state, count)
+        SELECT user_id, state, count(*) FROM new_todos
+        GROUP BY user_id, state ORDER BY user_id, state
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = counts.count + excluded.count;
+
+        INSERT INTO todo_daily_counts AS daily (user_id, day, created, done)
+        SELECT user_id, created_at::date, count(*),
+               count(*) FILTER (WHERE state = 'done')
+        FROM new_todos
+        GROUP BY user_id, created_at::date ORDER BY user_id, created_at::date
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            created = daily.created + excluded.created,
+            done = daily.done + excluded.done;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION todo_counts_update() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO todo_state_counts AS counts (user_id, state, count)
+        SELECT user_id, state, sum(delta) FROM (
+            SELECT user_id, state, 1 AS delta FROM new_todos
+            UNION ALL
+            SELECT user_id, state, -1 FROM old_todos
+        ) AS changes
+        GROUP BY user_id, state HAVING sum(delta) <> 0
+        ORDER BY user_id, state
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = counts.count + excluded.count;
+
+        INSERT INTO todo_daily_counts AS daily (user_id, day, created, done)
+        SELECT new_todos.user_id, new_todos.updated_at::date, 0, count(*)
+        FROM new_todos JOIN old_todos USING (id)
+        WHERE new_todos.state = 'done' AND old_todos.state <> 'done'
+        GROUP BY new_todos.user_id, new_todos.updated_at::date
+        ORDER BY new_todos.user_id, new_todos.updated_at::date
+        ON CONFLICT (user_id, day)
+        DO UPDATE SET done = daily.done + excluded.done;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION todo_counts_delete() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE todo_state_counts AS counts
+        SET count = counts.count - removed.count
+        FROM (
+            SELECT user_id, state, count(*) AS count FROM old_todos
+            GROUP BY user_id, state ORDER BY user_id, state
+        ) AS removed
+        WHERE counts.user_id = removed.user_id
+        AND counts.state = removed.state;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER todo_counts_insert AFTER INSERT ON todos
+    REFERENCING NEW TABLE AS new_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_counts_insert()
+    """,
+    """
+    CREATE TRIGGER todo_counts_update AFTER UPDATE ON todos
+    REFERENCING OLD TABLE AS old_todos NEW TABLE AS new_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_counts_update()
+    """,
+    """
+    CREATE TRIGGER todo_counts_delete AFTER DELETE ON todos
+    REFERENCING OLD TABLE AS old_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_counts_delete()
+    """,
+]
+
+TODO_COUNTS_SQLITE_DDL = [
+    """
+    CREATE TRIGGER todo_counts_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todo_state_counts (user_id, state, count)
+        VALUES (new.user_id, new.state, 1)
+        ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1;
+        INSERT INTO todo_daily_counts (user_id, day, created, done)
+        VALUES (
+            new.user_id, date(new.created_at), 1, new.state = 'done'
+        )
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            created = created + 1, done = done + excluded.done;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_counts_update AFTER UPDATE OF state ON todos
+    WHEN old.state <> new.state BEGIN
+        UPDATE todo_state_counts SET count = count - 1
+        WHERE user_id = old.user_id AND state = old.state;
+        INSERT INTO todo_state_counts (user_id, state, count)
+        VALUES (new.user_id, new.state, 1)
+        ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1;
+        INSERT INTO todo_daily_counts (user_id, day, created, done)
+        SELECT new.user_id, date(new.updated_at), 0, 1
+        WHERE new.state = 'done'
+        ON CONFLICT (user_id, day) DO UPDATE SET done = done + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_counts_delete AFTER DELETE ON todos BEGIN
+        UPDATE todo_state_counts SET count = count - 1
+        WHERE user_id = old.user_id AND state = old.state;
+    END
+    """,
+]
+
+for statement in TODO_COUNTS_POSTGRESQL_DDL:
+    event.listen(
+        table_registry.metadata,
+        'after_create',
+        DDL(statement).execute_if(dialect='postgresql'),
+    )
+
+for statement in TODO_COUNTS_SQLITE_DDL:
+    event.listen(
+        table_registry.metadata,
+        'after_create',
+        DDL(statement).execute_if(dialect='sqlite'),
+    )
+
+
+# Versions bumped by every write to a user's todos, and to the users table
+# as a whole, so list ETags can be checked without reading the lists.
+@mapped_as_dataclass(table_registry)
+class TodoVersion:
+    __tablename__ = 'todo_versions'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    version: Mapped[int] = mapped_column(default=0)
+    # Tombstones stamped below this version have been pruned, so a sync
+    # from an older cursor could miss deletions and has to start over.
+    pruned_version: Mapped[int] = mapped_column(init=False, server_default='0')
+
+
+# Tombstones of deleted todos, stamped like the todos themselves. The
+# purge prunes them once they are older than the deletion log retention.
+@mapped_as_dataclass(table_registry)
+class TodoDeletion:
+    __tablename__ = 'todo_deletions'
+    __table_args__ = (Index('ix_todo_deletions_deleted_at', 'deleted_at'),)
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    version: Mapped[int] = mapped_column(primary_key=True)
+    todo_id: Mapped[int] = mapped_column(primary_key=True)
+    deleted_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
+
+
+# Every write stamps its rows with the user's current todo version and
+# then bumps it. PostgreSQL locks the version row before stamping, so a
+# user's writers queue up and stamps grow in commit order: once a reader
+# sees version N, nothing stamped below N can still be uncommitted.
+# Deletes only bump existing versions: a user with todos has one. Todos
+# that go because their user did leave no tombstones, as rows pointing
+# back at the deleted user would break its foreign keys.
+VERSIONS_POSTGRESQL_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION todo_versions_stamp() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        SELECT version INTO NEW.version FROM todo_versions
+        WHERE user_id = NEW.user_id FOR UPDATE;
+        IF NOT FOUND THEN
+            INSERT INTO todo_versions (user_id, version)
+            VALUES (NEW.user_id, 0) ON CONFLICT (user_id) DO NOTHING;
+            SELECT version INTO NEW.version FROM todo_versions
+            WHERE user_id = NEW.user_id FOR UPDATE;
+        END IF;
+        RETURN NEW;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER todo_versions_stamp BEFORE INSERT OR UPDATE ON todos
+    FOR EACH ROW EXECUTE FUNCTION todo_versions_stamp()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION todo_versions_bump() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            WITH bumped AS (
+                UPDATE todo_versions SET version = version + 1
+                WHERE user_id IN (SELECT user_id FROM old_todos)
+                AND user_id IN (SELECT id FROM users)
+                RETURNING user_id, version - 1 AS version
+            )
+            INSERT INTO todo_deletions (user_id, version, todo_id)
+            SELECT user_id, bumped.version, old_todos.id
+            FROM old_todos JOIN bumped USING (user_id);
+        ELSE
+            INSERT INTO todo_versions AS versions (user_id, version)
+            SELECT DISTINCT user_id, 1 FROM new_todos ORDER BY user_id
+            ON CONFLICT (user_id)
+            DO UPDATE SET version = versions.version + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER todo_versions_insert AFTER INSERT ON todos
+    REFERENCING NEW TABLE AS new_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_versions_bump()
+    """,
+    """
+    CREATE TRIGGER todo_versions_update AFTER UPDATE ON todos
+    REFERENCING NEW TABLE AS new_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_versions_bump()
+    """,
+    """
+    CREATE TRIGGER todo_versions_delete AFTER DELETE ON todos
+    REFERENCING OLD TABLE AS old_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_versions_bump()
+    """,
+]
+
+# SQLite cannot assign to new.* and has a single writer, so rows are
+# stamped after the fact. Listing the columns keeps the stamping UPDATE
+# from firing the update trigger again.
+VERSIONS_SQLITE_DDL = [
+    """
+    CREATE TRIGGER todo_versions_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todo_versions (user_id, version) VALUES (new.user_id, 0)
+        ON CONFLICT (user_id) DO NOTHING;
+        UPDATE todos SET version = (
+            SELECT version FROM todo_versions WHERE user_id = new.user_id
+        ) WHERE id = new.id;
+        UPDATE todo_versions SET version = version + 1
+        WHERE user_id = new.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_versions_update
+    AFTER UPDATE OF title, description, state, user_id, updated_at
+    ON todos BEGIN
+        INSERT INTO todo_versions (user_id, version) VALUES (new.user_id, 0)
+        ON CONFLICT (user_id) DO NOTHING;
+        UPDATE todos SET version = (
+            SELECT version FROM todo_versions WHERE user_id = new.user_id
+        ) WHERE id = new.id;
+        UPDATE todo_versions SET version = version + 1
+        WHERE user_id = new.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_versions_delete AFTER DELETE ON todos BEGIN
+        INSERT INTO todo_deletions (user_id, version, todo_id)
+        SELECT user_id, version, old.id FROM todo_versions
+        WHERE user_id = old.user_id
+        AND user_id IN (SELECT id FROM users);
+        UPDATE todo_versions SET version = version + 1
+        WHERE user_id = old.user_id;
+    END
+    """,
+]
+
+for statement in VERSIONS_POSTGRESQL_DDL:
+    event.listen(
+        table_registry.metadata,
+        'after_create',
+        DDL(statement).execute_if(dialect='postgresql'),
+    )
+
+for statement in VERSIONS_SQLITE_DDL:
+    event.listen(
+        table_registry.metadata,
+        'after_create',
+        DDL(statement).execute_if(dialect='sqlite'),
+    )
+
+
+# Tokens revoked before they expire, by their jti claim. Every process
+# loads them into memory, so checking a token never queries this table;
+# rows are deleted once the token would have expired anyway.
+@mapped_as_dataclass(table_registry)
+class RevokedToken:
+    __tablename__ = 'revoked_tokens'
+    __table_args__ = (
+        Index('ix_revoked_tokens_revoked_at', 'revoked_at'),
+        Index('ix_revoked_tokens_expires_at', 'expires_at'),
+    )
+
+    jti: Mapped[str] = mapped_column(primary_key=True)
+    expires_at: Mapped[datetime]
+    revoked_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
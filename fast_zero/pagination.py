@@ -0,0 +1,66 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+def _encode(values: list) -> str:
+    payload = json.dumps(values).encode()
+    return urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def _decode(cursor: str) -> list:
+    padded = cursor + '=' * (-len(cursor) % 4)
+    return json.loads(urlsafe_b64decode(padded))
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    return _encode([created_at.isoformat(), id])
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, id = _decode(cursor)
+        return datetime.fromisoformat(created_at), int(id)
+    except (TypeError, ValueError) as error:
+        raise ValueError('Invalid cursor') from error
+
+
+# Change cursors also carry the user's pruned_version from when the sync
+# started, so pruning that happened before then does not send it back to
+# the start. Cursors from before pruning existed count from zero.
+def encode_change_cursor(version: int, id: int, floor: int = 0) -> str:
+    return _encode([version, id, floor])
+
+
+def decode_change_cursor(cursor: str) -> tuple[int, int, int]:
+    try:
+        version, id, *floor = _decode(cursor)
+        (floor,) = floor or [0]
+        return int(version), int(id), int(floor)
+    except (TypeError, ValueError) as error:
+        raise ValueError('Invalid cursor') from error
+
+
+def paginate(query, page, created_at_column, id_column):
+    query = query.order_by(created_at_column, id_column).limit(page.limit)
+
+    if page.cursor:
+        created_at, id = decode_cursor(page.cursor)
+        return query.where(
+            tuple_(created_at_column, id_column)
+            > tuple_(
+                created_at, id, types=[created_at_column.type, id_column.type]
+            )
+        )
+
+    return query.offset(page.offset)
+
+
+def next_cursor(items, limit: int) -> str | None:
+    if len(items) < limit:
+        return None
+
+    last = items[-1]
+    return encode_cursor(last.created_at, last.id)
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import bindparam, case, delete, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.models import TRASHED_TODO, Todo, TodoDeletion, TodoVersion
+
+logger = logging.getLogger(__name__)
+
+
+async def purge_trash(
+    session: AsyncSession, retention: timedelta, batch_size: int
+) -> int:
+    """Deletes up to ``batch_size`` todos that have been in the trash for
+    at least ``retention``, oldest first, and commits.
+
+    Each batch is a short transaction of its own, so row locks are only
+    held for as long as one batch takes. Rows another purge has already
+    locked are skipped rather than waited for.
+    """
+    cutoff = datetime.now(UTC) - retention
+    batch = (
+        select(Todo.id)
+        .where(TRASHED_TODO, Todo.updated_at <= cutoff)
+        .order_by(Todo.updated_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.execute(delete(Todo).where(Todo.id.in_(batch)))
+    await session.commit()
+
+    return result.rowcount
+
+
+async def prune_deletions(
+    session: AsyncSession, retention: timedelta, batch_size: int
+) -> int:
+    """Deletes up to ``batch_size`` /todos/changes tombstones older than
+    ``retention``, oldest first, and commits.
+
+    Each owner's pruned_version moves past the tombstones removed, in the
+    same transaction, so no client can miss them unnoticed.
+    """
+    cutoff = datetime.now(UTC) - retention
+    key = (TodoDeletion.user_id, TodoDeletion.version, TodoDeletion.todo_id)
+    batch = (
+        select(*key)
+        .where(TodoDeletion.deleted_at <= cutoff)
+        .order_by(TodoDeletion.deleted_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    pruned = await session.execute(
+        delete(TodoDeletion)
+        .where(tuple_(*key).in_(batch))
+        .returning(TodoDeletion.user_id, TodoDeletion.version)
+    )
+
+    horizons, rows = {}, 0
+    for user_id, version in pruned:
+        horizons[user_id] = max(horizons.get(user_id, 0), version + 1)
+        rows += 1
+
+    if horizons:
+        # Version rows are locked in user order, as the todo triggers do.
+        versions = TodoVersion.__table__
+        horizon = bindparam('horizon')
+        await session.execute(
+            update(versions)
+            .where(versions.c.user_id == bindparam('owner'))
+            .values(
+                pruned_version=case(
+                    (versions.c.pruned_version < horizon, horizon),
+                    else_=versions.c.pruned_version,
+                )
+            ),
+            [
+                {'owner': user_id, 'horizon': horizons[user_id]}
+                for user_id in sorted(horizons)
+            ],
+        )
+    await session.commit()
+
+    return rows
+
+
+async def purge_trash_forever(
+    engine,
+    retention: timedelta,
+    deletion_retention: timedelta,
+    batch_size: int,
+    interval: float,
+):
+    # One batch of each per interval caps the purge at batch_size /
+    # interval rows a second, however much has piled up.
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with AsyncSession(engine) as session:
+                await purge_trash(session, retention, batch_size)
+                await prune_deletions(session, deletion_retention, batch_size)
+        except Exception:
+            logger.exception('Trash purge failed')
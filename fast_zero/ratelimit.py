@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from http import HTTPStatus
+from math import ceil
+from time import monotonic
+
+from fastapi import HTTPException
+
+from fast_zero.metrics import registry
+
+RATE_LIMITED = registry.counter(
+    'rate_limited_requests_total',
+    'Requests rejected by a rate limit.',
+    ('scope',),
+)
+
+
+class TokenBuckets:
+    """Token buckets held in this process, the least recently used
+    dropped beyond ``maxsize``.
+
+    A store shared by every process only has to provide the same
+    ``take`` coroutine; ``RateLimit`` knows nothing else about it.
+    """
+
+    def __init__(self, maxsize: int, clock=monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, rate: float, capacity: int) -> float:
+        """Takes a token from the bucket under ``key``, which holds up to
+        ``capacity`` and refills at ``rate`` a second. Returns 0 if there
+        was one, else how many seconds until there is."""
+        now = self._clock()
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        # Never below zero, should the clock step back.
+        tokens = min(capacity, tokens + max(now - updated, 0) * rate)
+
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+
+        self._buckets[key] = (tokens, now)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+
+        return wait
+
+    def clear(self):
+        self._buckets.clear()
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class RateLimit:
+    """Allows ``burst`` requests at once per key, then ``per_minute``
+    a minute. A rate of 0 turns the limit off."""
+
+    def __init__(self, scope: str, per_minute: float, burst: int, store):
+        self.scope = scope
+        self.per_minute = per_minute
+        self.burst = burst
+        self.store = store
+
+    async def check(self, key: str):
+        if not self.per_minute:
+            return
+
+        wait = await self.store.take(
+            f'{self.scope}:{key}', self.per_minute / 60, self.burst
+        )
+        if wait:
+            RATE_LIMITED.inc(self.scope)
+            raise HTTPException(
+                status_code=HTTPStatus.TOO_MANY_REQUESTS,
+                detail='Too many requests',
+                headers={'Retry-After': str(ceil(wait))},
+            )
@@ -0,0 +1,110 @@
+import csv
+import hashlib
+import io
+from functools import cache
+from http import HTTPStatus
+from typing import get_args, get_origin
+
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import TypedDict
+
+
+def _as_typed_dict(model: type[BaseModel]):
+    fields = {}
+
+    for name, field in model.model_fields.items():
+        annotation = field.annotation
+        if get_origin(annotation) is list:
+            (item,) = get_args(annotation)
+            if isinstance(item, type) and issubclass(item, BaseModel):
+                annotation = list[_as_typed_dict(item)]
+        fields[name] = annotation
+
+    return TypedDict(f'{model.__name__}Row', fields)
+
+
+@cache
+def row_serializer(model: type[BaseModel]) -> TypeAdapter:
+    # A TypedDict mirror of the model serializes plain dicts with the
+    # same encoders, without building model instances.
+    return TypeAdapter(_as_typed_dict(model))
+
+
+def columns(entity, model: type[BaseModel]) -> list:
+    # Rows serialize their keys in select order, so select the columns in
+    # the order the model declares its fields.
+    return [getattr(entity, name) for name in model.model_fields]
+
+
+def rows_response(
+    model: type[BaseModel], content: dict, headers: dict | None = None
+) -> Response:
+    """Serializes trusted database rows as ``model`` would.
+
+    Handlers return it so FastAPI's response validation and dict round
+    trip are skipped. The bytes match what the declared response_model
+    would have produced as long as the rows were selected with
+    ``columns``. Keys the model does not declare are dropped.
+    """
+    return Response(
+        row_serializer(model).dump_json(content),
+        media_type='application/json',
+        headers=headers,
+    )
+
+
+def etag(*parts) -> str:
+    """Builds an entity tag from the values a response is made of, such
+    as a version and the query string, without building the response."""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def not_modified(request: Request, tag: str) -> Response | None:
+    """Returns a bodiless 304 when ``If-None-Match`` lists ``tag``.
+
+    The comparison is the weak one RFC 9110 asks of GET, so ``W/``
+    prefixes added by proxies along the way still match.
+    """
+    header = request.headers.get('if-none-match')
+    if header is None:
+        return None
+
+    tags = {
+        candidate.strip().removeprefix('W/') for candidate in header.split(',')
+    }
+    if '*' not in tags and tag not in tags:
+        return None
+
+    return Response(status_code=HTTPStatus.NOT_MODIFIED, headers={'ETag': tag})
+
+
+async def ndjson_lines(model: type[BaseModel], partitions):
+    """Encodes each partition of rows as one chunk of NDJSON."""
+    serializer = row_serializer(model)
+    async for rows in partitions:
+        yield b''.join(
+            serializer.dump_json(row._asdict()) + b'\n' for row in rows
+        )
+
+
+async def csv_lines(model: type[BaseModel], partitions):
+    """Encodes a header naming the model's fields, then each partition
+    of rows as one chunk of CSV."""
+    serializer = row_serializer(model)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, list(model.model_fields))
+
+    writer.writeheader()
+    async for rows in partitions:
+        writer.writerows(
+            serializer.dump_python(row._asdict(), mode='json') for row in rows
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Keeps the header for exports without rows.
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from array import array
+from bisect import bisect_left
+from datetime import UTC, datetime, timedelta
+from hashlib import blake2b
+from time import time
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Rows are read again for this long after the newest one seen, so a
+# revocation whose transaction committed late is still picked up.
+RELOAD_OVERLAP = timedelta(minutes=1)
+
+
+def token_fingerprint(jti: str) -> int:
+    # Token ids are random hex, so their first 16 digits already make a
+    # uniform 64-bit fingerprint. Anything else is hashed down to one.
+    try:
+        return int(jti[:16], 16)
+    except ValueError:
+        return int.from_bytes(blake2b(jti.encode(), digest_size=8).digest())
+
+
+# Expiry times are stored as naive UTC, like every other column.
+def to_timestamp(moment: datetime) -> int:
+    return int(moment.replace(tzinfo=UTC).timestamp())
+
+
+def from_timestamp(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, UTC).replace(tzinfo=None)
+
+
+class RevocationList:
+    """Revoked token ids, held in memory so checking a token costs no
+    query.
+
+    Ids are kept as 64-bit fingerprints in a sorted array, 8 bytes each
+    plus 8 for the expiry, and found by bisection. New revocations wait
+    in a dict until ``compact`` merges them in and drops whatever has
+    expired, since an expired token is rejected anyway.
+    """
+
+    def __init__(self):
+        self._fingerprints = array('Q')
+        self._expires = array('q')
+        self._recent: dict[int, int] = {}
+
+    def __len__(self):
+        return len(self._fingerprints) + len(self._recent)
+
+    def __contains__(self, jti: str) -> bool:
+        fingerprint = token_fingerprint(jti)
+        if fingerprint in self._recent:
+            return True
+
+        index = bisect_left(self._fingerprints, fingerprint)
+        return (
+            index < len(self._fingerprints)
+            and self._fingerprints[index] == fingerprint
+        )
+
+    def add(self, jti: str, expires_at: float):
+        self._recent[token_fingerprint(jti)] = int(expires_at)
+
+    async def compact(self, now: float):
+        # The merge runs in a thread on a snapshot; lookups keep using the
+        # current arrays and the recent dict until the result is swapped in.
+        recent = dict(self._recent)
+        self._fingerprints, self._expires = await asyncio.to_thread(
+            _merge, self._fingerprints, self._expires, recent, now
+        )
+        # A new dict, as one emptied in place keeps its full size.
+        self._recent = {
+            fingerprint: expires_at
+            for fingerprint, expires_at in self._recent.items()
+            if fingerprint not in recent
+        }
+
+    def clear(self):
+        self._fingerprints = array('Q')
+        self._expires = array('q')
+        self._recent.clear()
+
+
+def _merge(fingerprints, expires, recent: dict[int, int], now: float):
+    live = dict(zip(fingerprints, expires))
+    live.update(recent)
+    merged = sorted(item for item in live.items() if item[1] > now)
+    return (
+        array('Q', [fingerprint for fingerprint, _ in merged]),
+        array('q', [expires_at for _, expires_at in merged]),
+    )
+
+
+async def load_revocations(
+    session: AsyncSession,
+    revocations: RevocationList,
+    since: datetime | None = None,
+) -> datetime | None:
+    """Adds the revocations recorded since ``since``, or all of them, and
+    returns where the next load should start."""
+    query = select(
+        RevokedToken.jti, RevokedToken.expires_at, RevokedToken.revoked_at
+    )
+    if since is not None:
+        query = query.where(RevokedToken.revoked_at >= since)
+
+    newest = None
+    for row in await session.execute(query):
+        revocations.add(row.jti, to_timestamp(row.expires_at))
+        newest = max(newest or row.revoked_at, row.revoked_at)
+
+    if newest is None:
+        return since
+    return newest - RELOAD_OVERLAP
+
+
+async def compact_revocations(
+    session: AsyncSession, revocations: RevocationList
+):
+    """Forgets expired revocations, in memory and in the table."""
+    now = time()
+    await revocations.compact(now)
+    await session.execute(
+        delete(RevokedToken).where(
+            RevokedToken.expires_at <= from_timestamp(now)
+        )
+    )
+    await session.commit()
+
+
+async def refresh_revocations_forever(
+    engine,
+    revocations: RevocationList,
+    interval: float,
+    compact_interval: float,
+):
+    since, compacted = None, time()
+    while True:
+        try:
+            async with AsyncSession(engine) as session:
+                since = await load_revocations(session, revocations, since)
+                if time() - compacted >= compact_interval:
+                    await compact_revocations(session, revocations)
+                    compacted = time()
+        except Exception:
+            logger.exception('Revocation refresh failed')
+        await asyncio.sleep(interval)
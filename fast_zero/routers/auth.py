@@ -8,20 +8,30 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from fast_zero.database import get_session
 from fast_zero.models import User
-from fast_zero.schemas import Token
+from fast_zero.schemas import Message, Token
 from fast_zero.security import (
-    create_access_token,
-    get_current_user,
-    verify_password,
+    Principal,
+    access_token_for,
+    get_current_principal,
+    limit_by_account,
+    limit_by_ip,
+    oauth2_schema,
+    revoke_token,
+    verify_password_async,
 )
 
-router = APIRouter(prefix='/auth', tags=['auth'])
+router = APIRouter(
+    prefix='/auth', tags=['auth'], dependencies=[Depends(limit_by_ip)]
+)
 Session = Annotated[AsyncSession, Depends(get_session)]
 OAuth2Form = Annotated[OAuth2PasswordRequestForm, Depends()]
-CurrentUser = Annotated[User, Depends(get_current_user)]
+CurrentUser = Annotated[Principal, Depends(get_current_principal)]
+BearerToken = Annotated[str, Depends(oauth2_schema)]
 
 
-@router.post('/token', response_model=Token)
+@router.post(
+    '/token', response_model=Token, dependencies=[Depends(limit_by_account)]
+)
 async def login_for_access_token(
     from_data: OAuth2Form,
     session: Session,
@@ -29,13 +39,15 @@ async def login_for_access_token(
     user = await session.scalar(
         select(User).where(User.email == from_data.username)
     )
-    if not user or not verify_password(from_data.password, user.password):
+    if not user or not await verify_password_async(
+        from_data.password, user.password
+    ):
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED,
             detail='Incorrect email or password',
         )
 
-    access_token = create_access_token(data={'sub': user.email})
+    access_token = access_token_for(user)
 
     return {'access_token': access_token, 'token_type': 'bearer'}
 
@@ -43,7 +55,20 @@ async def login_for_access_token(
 @router.post('/refresh_token', response_model=Token)
 async def refresh_access_token(
     current_user: CurrentUser,
+    token: BearerToken,
+    session: Session,
 ):
-    access_token = create_access_token(data={'sub': current_user.email})
+    # The refreshed token stops working once its replacement exists.
+    await revoke_token(session, token)
+    access_token = access_token_for(current_user)
 
     return {'access_token': access_token, 'token_type': 'bearer'}
+
+
+@router.post('/logout', response_model=Message)
+async def logout(
+    current_user: CurrentUser, token: BearerToken, session: Session
+):
+    await revoke_token(session, token)
+
+    return {'message': 'Logged out'}
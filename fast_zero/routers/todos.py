@@ -1,66 +1,532 @@
+import heapq
+from collections import defaultdict
+from datetime import UTC, datetime, timedelta
 from http import HTTPStatus
-from typing import Annotated
+from itertools import islice
+from typing import Annotated, Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from fast_zero.database import get_session
-from fast_zero.models import Todo, User
+from fast_zero.ingest import csv_items, insert_todos, iter_lines, ndjson_items
+from fast_zero.models import (
+    LIVE_TODO,
+    Todo,
+    TodoDailyCount,
+    TodoDeletion,
+    TodoState,
+    TodoStateCount,
+    TodoVersion,
+)
+from fast_zero.pagination import (
+    decode_change_cursor,
+    encode_change_cursor,
+    next_cursor,
+    paginate,
+)
+from fast_zero.responses import (
+    columns,
+    csv_lines,
+    etag,
+    ndjson_lines,
+    not_modified,
+    rows_response,
+)
 from fast_zero.schemas import (
+    ExportFormat,
+    FilterChanges,
     FilterTodo,
+    FilterTodoExport,
     Message,
+    TodoBatchDelete,
+    TodoBatchDeleteResult,
+    TodoBatchResult,
+    TodoBatchUpdate,
+    TodoChanges,
+    TodoFilters,
+    TodoImport,
+    TodoImportResult,
     TodoList,
     TodoPublic,
     TodoSchema,
+    TodoStats,
     TodoUpdate,
 )
-from fast_zero.security import get_current_user
+from fast_zero.search import apply_search
+from fast_zero.security import (
+    Principal,
+    get_current_principal,
+    get_read_session,
+)
+from fast_zero.settings import Settings
+
+settings = Settings()
 
 router = APIRouter(prefix='/todos', tags=['todos'])
 
 Session = Annotated[AsyncSession, Depends(get_session)]
-CurrentUser = Annotated[User, Depends(get_current_user)]
+ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
+CurrentUser = Annotated[Principal, Depends(get_current_principal)]
+NDJSON_MEDIA_TYPES = {'application/x-ndjson', 'application/jsonl'}
+BatchItems = Annotated[
+    list[dict[str, Any]],
+    Body(min_length=1, max_length=settings.MAX_BATCH_SIZE),
+]
+
+
+def validate_items(schema: type[BaseModel], items: list[dict[str, Any]]):
+    # Items are validated one by one so a bad item is reported in the
+    # response instead of rejecting the whole batch.
+    valid, errors = [], []
+
+    for index, item in enumerate(items):
+        try:
+            valid.append((index, schema.model_validate(item)))
+        except ValidationError as error:
+            errors.append({
+                'index': index,
+                'detail': error.errors(
+                    include_url=False, include_context=False
+                ),
+            })
+
+    return valid, errors
 
 
 @router.post('/', response_model=TodoPublic, status_code=HTTPStatus.CREATED)
 async def create_todo(
     todo: TodoSchema, session: Session, current_user: CurrentUser
 ):
-    db_todo = Todo(
-        title=todo.title,
-        description=todo.description,
-        state=todo.state,
-        user_id=current_user.id,
+    db_todo = await session.scalar(
+        insert(Todo)
+        .values(**todo.model_dump(), user_id=current_user.id)
+        .returning(Todo)
     )
-
-    session.add(db_todo)
     await session.commit()
-    await session.refresh(db_todo)
 
     return db_todo
 
 
-@router.get('/', response_model=TodoList)
-async def list_todos(
-    session: Session,
-    current_user: CurrentUser,
-    filters: Annotated[FilterTodo, Query()],
-):
-    query = select(Todo).where(Todo.user_id == current_user.id)
-
+def filter_todos(query, filters: TodoFilters, dialect_name: str):
     if filters.title:
         query = query.where(Todo.title.contains(filters.title))
     if filters.description:
         query = query.where(Todo.description.contains(filters.description))
     if filters.state:
         query = query.where(Todo.state == filters.state)
+    # The trash is only listed when asked for by state.
+    if filters.state != TodoState.trash:
+        query = query.where(LIVE_TODO)
+    if filters.search:
+        query = apply_search(query, filters.search, dialect_name)
+    return query
+
+
+@router.get('/', response_model=TodoList)
+async def list_todos(
+    request: Request,
+    session: ReadSession,
+    current_user: CurrentUser,
+    filters: Annotated[FilterTodo, Query()],
+):
+    # The version changes with every write to the user's todos, so an
+    # unchanged list is answered before any todo is read.
+    version = await session.scalar(
+        select(TodoVersion.version).where(
+            TodoVersion.user_id == current_user.id
+        )
+    )
+    tag = etag(current_user.id, version, request.url.query)
+    if unchanged := not_modified(request, tag):
+        return unchanged
+
+    query = filter_todos(
+        select(*columns(Todo, TodoPublic)).where(
+            Todo.user_id == current_user.id
+        ),
+        filters,
+        session.bind.dialect.name,
+    )
+
+    if filters.search:
+        rows = await session.execute(
+            query.offset(filters.offset).limit(filters.limit)
+        )
+        return rows_response(
+            TodoList,
+            {'todos': [row._asdict() for row in rows], 'next_cursor': None},
+            headers={'ETag': tag},
+        )
+
+    rows = (
+        await session.execute(
+            paginate(query, filters, Todo.created_at, Todo.id)
+        )
+    ).all()
+
+    return rows_response(
+        TodoList,
+        {
+            'todos': [row._asdict() for row in rows],
+            'next_cursor': next_cursor(rows, filters.limit),
+        },
+        headers={'ETag': tag},
+    )
+
+
+@router.get(
+    '/export',
+    response_class=StreamingResponse,
+    responses={
+        HTTPStatus.OK: {
+            'content': {'application/x-ndjson': {}, 'text/csv': {}}
+        }
+    },
+)
+async def export_todos(
+    session: ReadSession,
+    current_user: CurrentUser,
+    filters: Annotated[FilterTodoExport, Query()],
+):
+    query = filter_todos(
+        select(*columns(Todo, TodoPublic)).where(
+            Todo.user_id == current_user.id
+        ),
+        filters,
+        session.bind.dialect.name,
+    )
+    if not filters.search:
+        query = query.order_by(Todo.created_at, Todo.id)
+
+    # A server-side cursor fetches EXPORT_CHUNK_SIZE rows at a time, so
+    # memory stays flat however many todos the user has. The session is
+    # only closed once the response has been sent.
+    async def partitions():
+        result = await session.stream(
+            query.execution_options(yield_per=settings.EXPORT_CHUNK_SIZE)
+        )
+        try:
+            async for rows in result.partitions():
+                yield rows
+        finally:
+            await result.close()
+
+    if filters.format == ExportFormat.csv:
+        return StreamingResponse(
+            csv_lines(TodoPublic, partitions()),
+            media_type='text/csv',
+            headers={
+                'Content-Disposition': 'attachment; filename="todos.csv"'
+            },
+        )
+
+    return StreamingResponse(
+        ndjson_lines(TodoPublic, partitions()),
+        media_type='application/x-ndjson',
+    )
+
+
+@router.get('/stats', response_model=TodoStats)
+async def todo_stats(
+    session: ReadSession,
+    current_user: CurrentUser,
+    days: Annotated[int, Query(ge=0, le=settings.MAX_STATS_DAYS)] = 0,
+):
+    # Served from the counters the todos triggers maintain: at most one
+    # row per state and one per day, however many todos there are.
+    states = dict.fromkeys(TodoState, 0)
+    states.update(
+        (
+            await session.execute(
+                select(TodoStateCount.state, TodoStateCount.count).where(
+                    TodoStateCount.user_id == current_user.id
+                )
+            )
+        ).all()
+    )
+
+    daily = []
+    if days:
+        first_day = datetime.now(UTC).date() - timedelta(days=days - 1)
+        daily = await session.execute(
+            select(
+                TodoDailyCount.day,
+                TodoDailyCount.created,
+                TodoDailyCount.done,
+            )
+            .where(
+                TodoDailyCount.user_id == current_user.id,
+                TodoDailyCount.day >= first_day,
+            )
+            .order_by(TodoDailyCount.day)
+        )
+
+    return {
+        # Deleted todos wait in the trash, which listings leave out too.
+        'total': sum(states.values()) - states[TodoState.trash],
+        'states': states,
+        'days': [row._asdict() for row in daily],
+    }
+
+
+def check_pruning(after: tuple[int, int], floor: int, pruned_version: int):
+    # Tombstones pruned since the sync started, and not yet passed by the
+    # cursor, may be ones the client needs: it has to start over.
+    if pruned_version > max(floor, after[0]):
+        raise HTTPException(
+            status_code=HTTPStatus.GONE,
+            detail='Cursor is too old, sync again without it',
+        )
+
+
+@router.get('/changes', response_model=TodoChanges)
+async def list_changes(
+    session: ReadSession,
+    current_user: CurrentUser,
+    filters: Annotated[FilterChanges, Query()],
+):
+    # Writes are stamped with the user's todo version in commit order, so
+    # everything stamped below the current version is committed and both
+    # queries agree on what they see, whatever commits in between. Users
+    # who never wrote a todo have no version and nothing to sync.
+    versions = (
+        await session.execute(
+            select(TodoVersion.version, TodoVersion.pruned_version).where(
+                TodoVersion.user_id == current_user.id
+            )
+        )
+    ).first()
+    version, pruned_version = versions or (0, 0)
+    after, floor = None, pruned_version
+    if filters.since:
+        since = decode_change_cursor(filters.since)
+        after, floor = since[:2], since[2]
+        check_pruning(after, floor, pruned_version)
+
+    updated = select(*columns(Todo, TodoPublic), Todo.version).where(
+        Todo.user_id == current_user.id, Todo.version < version
+    )
+    deleted = select(
+        TodoDeletion.todo_id.label('id'), TodoDeletion.version
+    ).where(
+        TodoDeletion.user_id == current_user.id,
+        TodoDeletion.version < version,
+    )
+    if after is not None:
+        updated = updated.where(tuple_(Todo.version, Todo.id) > after)
+        deleted = deleted.where(
+            tuple_(TodoDeletion.version, TodoDeletion.todo_id) > after
+        )
+
+    # Each side fetches one row more than a page, which is enough to know
+    # whether the merged stream goes on.
+    updated_rows = await session.execute(
+        updated.order_by(Todo.version, Todo.id).limit(filters.limit + 1)
+    )
+    deleted_rows = await session.execute(
+        deleted.order_by(TodoDeletion.version, TodoDeletion.todo_id).limit(
+            filters.limit + 1
+        )
+    )
+    # The purge may have pruned tombstones this page needed after the
+    # versions were read; it moves pruned_version in the same commit.
+    if after is not None:
+        pruned_version = await session.scalar(
+            select(TodoVersion.pruned_version).where(
+                TodoVersion.user_id == current_user.id
+            )
+        )
+        check_pruning(after, floor, pruned_version or 0)
 
-    todos = await session.scalars(
-        query.offset(filters.offset).limit(filters.limit)
+    changes = list(
+        islice(
+            heapq.merge(
+                ((row, False) for row in updated_rows),
+                ((row, True) for row in deleted_rows),
+                key=lambda change: (change[0].version, change[0].id),
+            ),
+            filters.limit + 1,
+        )
+    )
+    page = changes[: filters.limit]
+
+    cursor = filters.since
+    if page:
+        last, _ = page[-1]
+        cursor = encode_change_cursor(last.version, last.id, floor)
+
+    return rows_response(
+        TodoChanges,
+        {
+            'todos': [row._asdict() for row, gone in page if not gone],
+            'deleted': [row.id for row, gone in page if gone],
+            'next_cursor': cursor,
+            'has_more': len(changes) > filters.limit,
+        },
     )
 
-    return {'todos': todos.all()}
+
+@router.post('/batch', response_model=TodoBatchResult)
+async def create_todos(
+    todos: BatchItems, session: Session, current_user: CurrentUser
+):
+    valid, errors = validate_items(TodoImport, todos)
+    created = []
+
+    if valid:
+        # Keeping RETURNING in parameter order makes SQLAlchemy send
+        # SQLite one INSERT per row. SQLite hands out rowids in the order
+        # of the VALUES, so there a single INSERT sorted by id does too.
+        sqlite = session.bind.dialect.name == 'sqlite'
+        created = (
+            await session.scalars(
+                insert(Todo).returning(
+                    Todo, sort_by_parameter_order=not sqlite
+                ),
+                [
+                    {**todo.model_dump(), 'user_id': current_user.id}
+                    for _, todo in valid
+                ],
+            )
+        ).all()
+        if sqlite:
+            created = sorted(created, key=lambda todo: todo.id)
+        await session.commit()
+
+    return {'todos': created, 'errors': errors}
+
+
+@router.patch('/batch', response_model=TodoBatchResult)
+async def patch_todos(todos: BatchItems, session: Session, user: CurrentUser):
+    valid, errors = validate_items(TodoBatchUpdate, todos)
+    targets = []
+    groups = defaultdict(list)
+    seen = set()
+
+    for index, todo in valid:
+        if todo.id in seen:
+            errors.append({'index': index, 'detail': 'Duplicate todo id'})
+            continue
+        seen.add(todo.id)
+        targets.append((index, todo.id))
+
+        # Items sharing the same changes are applied by a single UPDATE.
+        fields = todo.model_dump(exclude_unset=True, exclude={'id'})
+        groups[tuple(sorted(fields.items()))].append(todo.id)
+
+    found = {}
+    for fields, ids in groups.items():
+        query = (
+            update(Todo).values(dict(fields)).returning(Todo)
+            if fields
+            else select(Todo)
+        )
+        query = query.where(Todo.user_id == user.id, Todo.id.in_(ids))
+        found.update((todo.id, todo) for todo in await session.scalars(query))
+
+    await session.commit()
+
+    patched = []
+    for index, todo_id in targets:
+        if todo_id in found:
+            patched.append(found[todo_id])
+        else:
+            errors.append({'index': index, 'detail': 'Todo not found'})
+
+    errors.sort(key=lambda error: error['index'])
+    return {'todos': patched, 'errors': errors}
+
+
+@router.delete('/batch', response_model=TodoBatchDeleteResult)
+async def delete_todos(
+    todos: TodoBatchDelete, session: Session, user: CurrentUser
+):
+    found = set(
+        await session.scalars(
+            update(Todo)
+            .where(Todo.user_id == user.id, Todo.id.in_(todos.ids), LIVE_TODO)
+            .values(state=TodoState.trash)
+            .returning(Todo.id)
+        )
+    )
+    await session.commit()
+
+    deleted, errors = [], []
+    seen = set()
+    for index, todo_id in enumerate(todos.ids):
+        if todo_id in seen:
+            errors.append({'index': index, 'detail': 'Duplicate todo id'})
+            continue
+        seen.add(todo_id)
+
+        if todo_id in found:
+            deleted.append(todo_id)
+        else:
+            errors.append({'index': index, 'detail': 'Todo not found'})
+
+    return {'deleted': deleted, 'errors': errors}
+
+
+@router.post(
+    '/import',
+    response_model=TodoImportResult,
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'content': {
+                media_type: {'schema': {'type': 'string'}}
+                for media_type in (*sorted(NDJSON_MEDIA_TYPES), 'text/csv')
+            },
+        }
+    },
+)
+async def import_todos(
+    request: Request, session: Session, current_user: CurrentUser
+):
+    media_type = request.headers.get('content-type', '')
+    media_type = media_type.partition(';')[0].strip().lower()
+    lines = iter_lines(request.stream(), settings.IMPORT_MAX_LINE_BYTES)
+
+    if media_type == 'text/csv':
+        items = csv_items(lines, TodoImport, settings.IMPORT_MAX_LINE_BYTES)
+    elif media_type in NDJSON_MEDIA_TYPES:
+        items = ndjson_items(lines, TodoImport)
+    else:
+        raise HTTPException(
+            status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+            detail='Send todos as NDJSON or CSV',
+        )
+
+    accepted, rejected = 0, 0
+    errors, chunk = [], []
+
+    # The body is only read as fast as chunks are inserted, so a slow
+    # database pushes back on the client instead of filling memory. The
+    # chunks share one transaction: an interrupted import leaves nothing
+    # behind and can simply be retried.
+    async for line, todo, error in items:
+        if todo is None:
+            rejected += 1
+            if len(errors) < settings.IMPORT_MAX_ERRORS:
+                errors.append({'line': line, 'detail': error})
+            continue
+
+        chunk.append({**todo.model_dump(), 'user_id': current_user.id})
+        if len(chunk) == settings.IMPORT_CHUNK_SIZE:
+            await insert_todos(session, chunk)
+            accepted += len(chunk)
+            chunk = []
+
+    if chunk:
+        await insert_todos(session, chunk)
+        accepted += len(chunk)
+    await session.commit()
+
+    return {'accepted': accepted, 'rejected': rejected, 'errors': errors}
 
 
 @router.patch('/{todo_id}', response_model=TodoPublic)
@@ -70,8 +536,14 @@ async def patch_todo(
     user: CurrentUser,
     todo: TodoUpdate,
 ):
+    fields = todo.model_dump(exclude_unset=True)
+    query = (
+        update(Todo).values(**fields).returning(Todo)
+        if fields
+        else select(Todo)
+    )
     db_todo = await session.scalar(
-        select(Todo).where(Todo.user_id == user.id, Todo.id == todo_id)
+        query.where(Todo.user_id == user.id, Todo.id == todo_id)
     )
 
     if not db_todo:
@@ -79,12 +551,7 @@ async def patch_todo(
             status_code=HTTPStatus.NOT_FOUND, detail='Todo not found'
         )
 
-    for field, value in todo.model_dump(exclude_unset=True).items():
-        setattr(db_todo, field, value)
-
-    session.add(db_todo)
     await session.commit()
-    await session.refresh(db_todo)
 
     return db_todo
 
@@ -95,16 +562,19 @@ async def delete_todo(
     session: Session,
     user: CurrentUser,
 ):
-    db_todo = await session.scalar(
-        select(Todo).where(Todo.user_id == user.id, Todo.id == todo_id)
+    # Moving the todo to the trash touches a single row; the purge
+    # deletes it for good later on, in batches.
+    result = await session.execute(
+        update(Todo)
+        .where(Todo.user_id == user.id, Todo.id == todo_id, LIVE_TODO)
+        .values(state=TodoState.trash)
     )
 
-    if not db_todo:
+    if not result.rowcount:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Todo not found'
         )
 
-    await session.delete(db_todo)
     await session.commit()
 
     return {'message': 'Todo deleted successfully'}
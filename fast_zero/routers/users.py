@@ -1,13 +1,15 @@
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from fast_zero.database import get_session
 from fast_zero.models import User
+from fast_zero.pagination import next_cursor, paginate
+from fast_zero.responses import columns, etag, not_modified, rows_response
 from fast_zero.schemas import (
     FilterPage,
     Message,
@@ -15,62 +17,107 @@ from fast_zero.schemas import (
     UserPublic,
     UserSchema,
 )
-from fast_zero.security import get_current_user, get_password_hash
+from fast_zero.security import (
+    Principal,
+    get_current_principal,
+    get_password_hash_async,
+    get_read_session,
+    invalidate_principal,
+    verify_password_async,
+)
 
 router = APIRouter(prefix='/users', tags=['users'])
 Session = Annotated[AsyncSession, Depends(get_session)]
-CurrentUser = Annotated[User, Depends(get_current_user)]
+ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
+CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
 
 
 @router.post('/', status_code=HTTPStatus.CREATED, response_model=UserPublic)
 async def create_user(user: UserSchema, session: Session):
-    db_user = await session.scalar(
-        select(User).where(
-            (User.email == user.email) | (User.username == user.username)
-        )
-    )
+    hashed_password = await get_password_hash_async(user.password)
 
-    if db_user:
-        if db_user.email == user.email:
-            raise HTTPException(
-                status_code=HTTPStatus.CONFLICT,
-                detail='Email already registered',
-            )
-        elif db_user.username == user.username:
-            raise HTTPException(
-                status_code=HTTPStatus.CONFLICT,
-                detail='Username already registered',
+    try:
+        db_user = await session.scalar(
+            insert(User)
+            .values(
+                username=user.username,
+                email=user.email,
+                password=hashed_password,
             )
-
-    hashed_password = get_password_hash(user.password)
-
-    db_user = User(
-        username=user.username, email=user.email, password=hashed_password
-    )
-
-    session.add(db_user)
-    await session.commit()
-    await session.refresh(db_user)
+            .returning(User)
+        )
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        # Only the failing path pays for finding out which field clashed.
+        email_taken = await session.scalar(
+            select(User.id).where(User.email == user.email)
+        )
+        raise HTTPException(
+            status_code=HTTPStatus.CONFLICT,
+            detail='Email already registered'
+            if email_taken
+            else 'Username already registered',
+        )
 
     return db_user
 
 
 @router.get('/', status_code=HTTPStatus.OK, response_model=UserList)
-async def get_users(session: Session, filter: Annotated[FilterPage, Query()]):
-    query = await session.scalars(
-        select(User).offset(filter.offset).limit(filter.limit)
+async def get_users(
+    request: Request,
+    session: ReadSession,
+    filter: Annotated[FilterPage, Query()],
+):
+    rows = (
+        await session.execute(
+            paginate(
+                select(*columns(User, UserPublic), User.created_at),
+                filter,
+                User.created_at,
+                User.id,
+            )
+        )
+    ).all()
+
+    # A page comes off the (created_at, id) index for about what a count
+    # or a table-wide version would cost, so the tag is taken from its
+    # rows. Nothing has to be bumped, and locked, on every user write.
+    tag = etag(*map(tuple, rows), request.url.query)
+    if unchanged := not_modified(request, tag):
+        return unchanged
+
+    return rows_response(
+        UserList,
+        {
+            'users': [row._asdict() for row in rows],
+            'next_cursor': next_cursor(rows, filter.limit),
+        },
+        headers={'ETag': tag},
     )
-    users = query.all()
-    return {'users': users}
 
 
 @router.get('/{user_id}', response_model=UserPublic)
-async def get_user(user_id: int, session: Session):
-    user = await session.get(User, user_id)
+async def get_user(
+    user_id: int, request: Request, response: Response, session: ReadSession
+):
+    user = (
+        await session.execute(
+            select(*columns(User, UserPublic)).where(User.id == user_id)
+        )
+    ).one_or_none()
     if not user:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User not found'
         )
+
+    # Reading one user costs the same as reading its version, so the tag
+    # is taken from the row itself.
+    tag = etag(*user)
+    if unchanged := not_modified(request, tag):
+        return unchanged
+
+    response.headers['ETag'] = tag
     return user
 
 
@@ -79,7 +126,7 @@ async def update_user(
     user_id: int,
     user: UserSchema,
     session: Session,
-    current_user: CurrentUser,
+    current_user: CurrentPrincipal,
 ):
     if current_user.id != user_id:
         raise HTTPException(
@@ -87,14 +134,33 @@ async def update_user(
             detail='Not enough permissions',
         )
 
+    changes = {'username': user.username, 'email': user.email}
+    stored_password = await session.scalar(
+        select(User.password).where(User.id == user_id)
+    )
+    # Only a new password ends the tokens issued so far; a profile edit
+    # keeps the caller, and the user's other sessions, signed in.
+    password_changed = not await verify_password_async(
+        user.password, stored_password
+    )
+    if password_changed:
+        changes |= {
+            'password': await get_password_hash_async(user.password),
+            'token_version': User.token_version + 1,
+        }
+
     try:
-        current_user.username = user.username
-        current_user.password = get_password_hash(user.password)
-        current_user.email = user.email
+        db_user = await session.scalar(
+            update(User)
+            .where(User.id == user_id)
+            .values(**changes)
+            .returning(User)
+        )
         await session.commit()
-        await session.refresh(current_user)
+        if password_changed:
+            invalidate_principal(user_id)
 
-        return current_user
+        return db_user
     except IntegrityError:
         raise HTTPException(
             status_code=HTTPStatus.CONFLICT,
@@ -106,7 +172,7 @@ async def update_user(
 async def delete_user(
     user_id: int,
     session: Session,
-    current_user: CurrentUser,
+    current_user: CurrentPrincipal,
 ):
     if current_user.id != user_id:
         raise HTTPException(
@@ -114,7 +180,10 @@ async def delete_user(
             detail='Not enough permissions',
         )
 
-    await session.delete(current_user)
+    # Todos and per-user summaries go through ON DELETE CASCADE, so the
+    # statement count does not depend on how many todos the user has.
+    await session.execute(delete(User).where(User.id == user_id))
     await session.commit()
+    invalidate_principal(user_id)
 
     return {'message': 'User deleted successfully'}
@@ -1,8 +1,22 @@
-from datetime import datetime
-
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from datetime import date, datetime
+from enum import Enum
+from typing import Any
+
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    EmailStr,
+    Field,
+    field_validator,
+    model_validator,
+)
 
 from fast_zero.models import TodoState
+from fast_zero.pagination import decode_change_cursor, decode_cursor
+from fast_zero.search import search_terms
+from fast_zero.settings import Settings
+
+settings = Settings()
 
 
 class Message(BaseModel):
@@ -24,6 +38,7 @@ class UserPublic(BaseModel):
 
 class UserList(BaseModel):
     users: list[UserPublic]
+    next_cursor: str | None = None
 
 
 class Token(BaseModel):
@@ -33,7 +48,21 @@ class Token(BaseModel):
 
 class FilterPage(BaseModel):
     offset: int = Field(default=0, ge=0)
-    limit: int = Field(default=100, ge=1)
+    limit: int = Field(default=100, ge=1, le=settings.MAX_PAGE_SIZE)
+    cursor: str | None = None
+
+    @field_validator('cursor')
+    @classmethod
+    def validate_cursor(cls, cursor: str | None) -> str | None:
+        if cursor is not None:
+            decode_cursor(cursor)
+        return cursor
+
+    @model_validator(mode='after')
+    def validate_offset_or_cursor(self):
+        if self.cursor and self.offset:
+            raise ValueError('offset and cursor cannot be combined')
+        return self
 
 
 class TodoSchema(BaseModel):
@@ -50,6 +79,40 @@ class TodoPublic(TodoSchema):
 
 class TodoList(BaseModel):
     todos: list[TodoPublic]
+    next_cursor: str | None = None
+
+
+class FilterChanges(BaseModel):
+    since: str | None = None
+    limit: int = Field(default=100, ge=1, le=settings.MAX_PAGE_SIZE)
+
+    @field_validator('since')
+    @classmethod
+    def validate_since(cls, since: str | None) -> str | None:
+        if since is not None:
+            decode_change_cursor(since)
+        return since
+
+
+class TodoChanges(BaseModel):
+    # Deletions apply before updates: an id in both was deleted and then
+    # reused by a new todo.
+    todos: list[TodoPublic]
+    deleted: list[int]
+    next_cursor: str | None = None
+    has_more: bool
+
+
+class TodoDayStats(BaseModel):
+    day: date
+    created: int
+    done: int
+
+
+class TodoStats(BaseModel):
+    total: int
+    states: dict[TodoState, int]
+    days: list[TodoDayStats]
 
 
 class TodoUpdate(BaseModel):
@@ -58,7 +121,79 @@ class TodoUpdate(BaseModel):
     state: TodoState | None = None
 
 
-class FilterTodo(FilterPage):
+class TodoBatchUpdate(TodoUpdate):
+    id: int
+
+    @field_validator('title', 'description', 'state')
+    @classmethod
+    def validate_not_null(cls, value):
+        # The columns are NOT NULL: leave a field out to keep it as is.
+        if value is None:
+            raise ValueError('may not be null')
+        return value
+
+
+class TodoBatchDelete(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=settings.MAX_BATCH_SIZE)
+
+
+class BatchError(BaseModel):
+    index: int
+    detail: str | list[dict[str, Any]]
+
+
+class TodoBatchResult(BaseModel):
+    todos: list[TodoPublic]
+    errors: list[BatchError]
+
+
+class TodoBatchDeleteResult(BaseModel):
+    deleted: list[int]
+    errors: list[BatchError]
+
+
+class TodoImport(TodoSchema):
+    # The column is NOT NULL, so imports and batches cannot leave it out.
+    description: str
+
+
+class LineError(BaseModel):
+    line: int
+    detail: str | list[dict[str, Any]]
+
+
+class TodoImportResult(BaseModel):
+    accepted: int
+    rejected: int
+    errors: list[LineError]
+
+
+class TodoFilters(BaseModel):
     title: str | None = Field(None, min_length=3, max_length=20)
     description: str | None = Field(None, min_length=3, max_length=20)
     state: TodoState | None = None
+    search: str | None = Field(None, min_length=3, max_length=100)
+
+    @field_validator('search')
+    @classmethod
+    def validate_search(cls, search: str | None) -> str | None:
+        if search is not None and not search_terms(search):
+            raise ValueError('Search must contain at least one word')
+        return search
+
+
+class FilterTodo(FilterPage, TodoFilters):
+    @model_validator(mode='after')
+    def validate_search_or_cursor(self):
+        if self.search and self.cursor:
+            raise ValueError('search results cannot be paginated by cursor')
+        return self
+
+
+class ExportFormat(str, Enum):
+    ndjson = 'ndjson'
+    csv = 'csv'
+
+
+class FilterTodoExport(TodoFilters):
+    format: ExportFormat = ExportFormat.ndjson
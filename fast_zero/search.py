@@ -0,0 +1,45 @@
+import re
+
+from sqlalchemy import column, func, table, text
+from sqlalchemy.dialects.postgresql import to_tsquery
+
+from fast_zero.models import SEARCH_CONFIG, Todo, todo_search_vector
+
+MAX_SEARCH_TERMS = 8
+
+todos_fts = table('todos_fts', column('rowid'), column('rank'))
+
+
+def search_terms(search: str) -> list[str]:
+    return re.findall(r'[^\W_]+', search.lower())[:MAX_SEARCH_TERMS]
+
+
+def apply_search(query, search: str, dialect_name: str):
+    terms = search_terms(search)
+
+    if dialect_name == 'postgresql':
+        tsquery = to_tsquery(
+            SEARCH_CONFIG,
+            ' & '.join(f'{term}:*' for term in terms),
+        )
+        return query.where(todo_search_vector.bool_op('@@')(tsquery)).order_by(
+            func.ts_rank(todo_search_vector, tsquery).desc(), Todo.id
+        )
+
+    if dialect_name == 'sqlite':
+        return (
+            query
+            .join(todos_fts, todos_fts.c.rowid == Todo.id)
+            .where(
+                text('todos_fts MATCH :search').bindparams(
+                    search=' '.join(f'"{term}"*' for term in terms)
+                )
+            )
+            .order_by(todos_fts.c.rank, Todo.id)
+        )
+
+    for term in terms:
+        query = query.where(
+            Todo.title.icontains(term) | Todo.description.icontains(term)
+        )
+    return query.order_by(Todo.id)
@@ -1,26 +1,66 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from http import HTTPStatus
+from time import perf_counter, time
+from uuid import uuid4
 from zoneinfo import ZoneInfo
 
-from fastapi import Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jwt import DecodeError, ExpiredSignatureError, decode, encode
 from pwdlib import PasswordHash
-from sqlalchemy import select
+from sqlalchemy import event, insert, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
-from fast_zero.database import get_session
-from fast_zero.models import User
+from fast_zero.cache import TTLCache
+from fast_zero.database import get_replica_session, get_session
+from fast_zero.executor import BoundedExecutor
+from fast_zero.metrics import registry
+from fast_zero.models import RevokedToken, User
+from fast_zero.ratelimit import RateLimit, TokenBuckets
+from fast_zero.revocation import RevocationList, from_timestamp
 from fast_zero.settings import Settings
 
 settings = Settings()
 
 pwd_context = PasswordHash.recommended()
 
+# Argon2 releases the GIL, so hashing in threads keeps the event loop free
+# while the worker count caps CPU and memory spent on it.
+password_hash_executor = BoundedExecutor(
+    settings.PASSWORD_HASH_WORKERS, name='argon2'
+)
+
 oauth2_schema = OAuth2PasswordBearer(
     tokenUrl='auth/token', refreshUrl='auth/refresh-token'
 )
 
+PASSWORD_HASH_SECONDS = registry.histogram(
+    'password_hash_duration_seconds',
+    'Argon2 time per call, excluding the wait for a worker.',
+    ('operation',),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+JWT_DECODE_FAILURES = registry.counter(
+    'jwt_decode_failures_total', 'Rejected bearer tokens.', ('reason',)
+)
+PASSWORD_HASH_CALLS = registry.gauge(
+    'password_hash_calls',
+    'Argon2 calls running or waiting for a worker, and the most that ever '
+    'waited at once.',
+    ('state',),
+)
+AUTH_CACHE_ENTRIES = registry.gauge(
+    'auth_cache_entries', 'Entries held by an auth cache.', ('cache',)
+)
+AUTH_CACHE_LOOKUPS = registry.counter(
+    'auth_cache_lookups_total',
+    'Auth cache lookups by result.',
+    ('cache', 'result'),
+)
+
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
@@ -30,12 +70,35 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def _timed(func, *args):
+    start = perf_counter()
+    return func(*args), perf_counter() - start
+
+
+async def get_password_hash_async(password: str) -> str:
+    hashed, seconds = await password_hash_executor.run(
+        _timed, get_password_hash, password
+    )
+    PASSWORD_HASH_SECONDS.observe(seconds, 'hash')
+    return hashed
+
+
+async def verify_password_async(
+    plain_password: str, hashed_password: str
+) -> bool:
+    verified, seconds = await password_hash_executor.run(
+        _timed, verify_password, plain_password, hashed_password
+    )
+    PASSWORD_HASH_SECONDS.observe(seconds, 'verify')
+    return verified
+
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now(tz=ZoneInfo('UTC')) + timedelta(
         minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
     )
-    to_encode.update({'exp': expire})
+    to_encode.update({'exp': expire, 'jti': uuid4().hex})
     encoded_jwt = encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
@@ -43,36 +106,227 @@ def create_access_token(data: dict):
 
 
 oauth2_schema = OAuth2PasswordBearer(tokenUrl='auth/token')
+optional_oauth2_schema = OAuth2PasswordBearer(
+    tokenUrl='auth/token', auto_error=False
+)
 
+# Tokens map to their claims and user ids to their principal, so
+# repeated requests skip both the JWT decode and the database lookup.
+token_cache = TTLCache(
+    settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+principal_cache = TTLCache(
+    settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
 
-async def get_current_user(
-    token: str = Depends(oauth2_schema),
-    session: AsyncSession = Depends(get_session),
-) -> User:
-    credential_exception = HTTPException(
+
+@registry.add_collector
+def collect_auth_metrics():
+    for name, cache in (
+        ('token', token_cache),
+        ('principal', principal_cache),
+    ):
+        stats = cache.stats()
+        AUTH_CACHE_ENTRIES.set(stats['size'], name)
+        AUTH_CACHE_LOOKUPS.set(stats['hits'], name, 'hit')
+        AUTH_CACHE_LOOKUPS.set(stats['misses'], name, 'miss')
+
+    stats = password_hash_executor.stats()
+    for state in ('running', 'queued', 'peak_queued'):
+        PASSWORD_HASH_CALLS.set(stats[state], state)
+
+
+# Users who committed a write recently read from the primary until
+# the replica has had time to catch up. Per process: other workers do
+# not see these writes (see Settings.READ_YOUR_WRITES_SECONDS).
+recent_writers = TTLCache(
+    settings.PRINCIPAL_CACHE_SIZE, settings.READ_YOUR_WRITES_SECONDS
+)
+
+# Checked on every request, cached token or not, without a query.
+revoked_tokens = RevocationList()
+
+# Run as dependencies, so a rejected login never reaches the database or
+# Argon2. Swapping the store for a shared one makes the limits global.
+rate_limit_buckets = TokenBuckets(settings.RATE_LIMIT_MAX_KEYS)
+ip_rate_limit = RateLimit(
+    'ip',
+    settings.AUTH_IP_RATE_PER_MINUTE,
+    settings.AUTH_IP_BURST,
+    rate_limit_buckets,
+)
+account_rate_limit = RateLimit(
+    'account',
+    settings.LOGIN_ACCOUNT_RATE_PER_MINUTE,
+    settings.LOGIN_ACCOUNT_BURST,
+    rate_limit_buckets,
+)
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    id: int
+    token_version: int
+
+
+@dataclass(frozen=True, slots=True)
+class TokenClaims:
+    user_id: int
+    version: int
+    jti: str | None
+    expires_at: float | None
+
+
+def credential_exception() -> HTTPException:
+    return HTTPException(
         status_code=HTTPStatus.UNAUTHORIZED,
         detail='Could not validate credentials',
         headers={'WWW-Authenticate': 'Bearer'},
     )
 
+
+def _decode(token: str) -> TokenClaims:
     try:
         payload = decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        subject_email: str = payload.get('sub')
+        subject: str = payload.get('sub')
+        version = payload.get('ver')
 
-        if not subject_email:
-            raise credential_exception
+        # The subject is the user id. Tokens from before it was, which
+        # named the user by email and had no version, are turned away.
+        if not subject or not subject.isdigit():
+            JWT_DECODE_FAILURES.inc('missing_subject')
+            raise credential_exception()
+        if not isinstance(version, int):
+            JWT_DECODE_FAILURES.inc('missing_version')
+            raise credential_exception()
     except DecodeError:
-        raise credential_exception
+        JWT_DECODE_FAILURES.inc('invalid')
+        raise credential_exception()
     except ExpiredSignatureError:
-        raise credential_exception
+        JWT_DECODE_FAILURES.inc('expired')
+        raise credential_exception()
 
-    user = await session.scalar(
-        select(User).where(User.email == subject_email)
+    return TokenClaims(
+        user_id=int(subject),
+        version=version,
+        jti=payload.get('jti'),
+        expires_at=payload.get('exp'),
     )
 
-    if not user:
-        raise credential_exception
 
-    return user
+def decode_token_claims(token: str) -> TokenClaims:
+    claims = token_cache.get(token)
+    if claims is None:
+        claims = _decode(token)
+        token_cache.set(
+            token,
+            claims,
+            ttl=claims.expires_at - time() if claims.expires_at else None,
+        )
+
+    if claims.jti is not None and claims.jti in revoked_tokens:
+        JWT_DECODE_FAILURES.inc('revoked')
+        raise credential_exception()
+
+    return claims
+
+
+async def revoke_token(session: AsyncSession, token: str):
+    """Records the token as revoked and commits. Tokens without a jti
+    predate revocation and simply run out."""
+    claims = decode_token_claims(token)
+    if claims.jti is None:
+        return
+
+    try:
+        await session.execute(
+            insert(RevokedToken).values(
+                jti=claims.jti, expires_at=from_timestamp(claims.expires_at)
+            )
+        )
+        await session.commit()
+    except IntegrityError:
+        # Another request revoked it first, so this one came too late.
+        await session.rollback()
+        raise credential_exception()
+
+    # Other processes see it once they next load the table.
+    revoked_tokens.add(claims.jti, claims.expires_at)
+
+
+async def limit_by_ip(request: Request):
+    await ip_rate_limit.check(request.client.host if request.client else '')
+
+
+async def limit_by_account(form: OAuth2PasswordRequestForm = Depends()):
+    await account_rate_limit.check(form.username.strip().lower())
+
+
+def access_token_for(user: User | Principal) -> str:
+    return create_access_token(
+        data={'sub': str(user.id), 'ver': user.token_version}
+    )
+
+
+async def get_current_principal(
+    token: str = Depends(oauth2_schema),
+    session: AsyncSession = Depends(get_session),
+) -> Principal:
+    """The caller, as far as its token says, checked against the user's
+    current token version. Only a cache miss, or a token newer than the
+    cached version, queries, and only for that version, by primary
+    key."""
+    claims = decode_token_claims(token)
+    session.info['subject'] = claims.user_id
+
+    principal = principal_cache.get(claims.user_id)
+    # A token newer than the cached version was issued after a bump this
+    # process has not seen, on another worker: read the version again
+    # rather than reject it until the entry expires.
+    if principal is None or principal.token_version < claims.version:
+        token_version = await session.scalar(
+            select(User.token_version).where(User.id == claims.user_id)
+        )
+        if token_version is None:
+            raise credential_exception()
+
+        principal = Principal(id=claims.user_id, token_version=token_version)
+        principal_cache.set(claims.user_id, principal)
+
+    # Tokens issued before the version was last bumped stop working.
+    if principal.token_version != claims.version:
+        JWT_DECODE_FAILURES.inc('stale')
+        raise credential_exception()
+
+    return principal
+
+
+def invalidate_principal(*user_ids: int):
+    for user_id in user_ids:
+        principal_cache.pop(user_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def remember_writer(session: Session):
+    user_id = session.info.get('subject')
+    if user_id is not None:
+        recent_writers.set(user_id, True)
+
+
+async def get_read_session(
+    token: str | None = Depends(optional_oauth2_schema),
+    primary: AsyncSession = Depends(get_session),
+    replica: AsyncSession = Depends(get_replica_session),
+) -> AsyncSession:
+    if token is None:
+        return replica
+
+    # A recent write decoded and cached this token, so there is no need to
+    # decode it again (and count a failure twice) for invalid ones.
+    claims = token_cache.get(token)
+    if claims is None:
+        return replica
+
+    return primary if recent_writers.get(claims.user_id) else replica
@@ -12,3 +12,63 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT_SECONDS: float = 30.0
+    DATABASE_POOL_RECYCLE_SECONDS: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_STATEMENT_TIMEOUT_MS: int | None = None
+    DATABASE_PREPARE_THRESHOLD: int | None = 5
+
+    # Reads go to the replica, except for users who wrote within the last
+    # READ_YOUR_WRITES_SECONDS. Only the process that committed the write
+    # knows about it, so with several workers a user's next read can land
+    # on another one and see the replica's lag. The guarantee holds for a
+    # single worker, or behind a proxy that keeps each user on one.
+    DATABASE_REPLICA_URL: str | None = None
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+
+    SLOW_QUERY_MS: float = 200.0
+
+    # Shared by every worker process so /metrics can add them all up. The
+    # files of exited workers are folded into retired.json as they go.
+    METRICS_DIR: str | None = None
+    METRICS_FLUSH_SECONDS: float = 5.0
+
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0
+
+    PASSWORD_HASH_WORKERS: int = 2
+
+    MAX_PAGE_SIZE: int = 1000
+    MAX_BATCH_SIZE: int = 10_000
+    EXPORT_CHUNK_SIZE: int = 1000
+    MAX_STATS_DAYS: int = 366
+    IMPORT_CHUNK_SIZE: int = 1000
+    IMPORT_MAX_LINE_BYTES: int = 64 * 1024
+    IMPORT_MAX_ERRORS: int = 100
+
+    # Deleted todos stay in the trash this long before the purge removes
+    # them, one batch per interval. A batch size of 0 turns it off.
+    TRASH_RETENTION_DAYS: float = 30.0
+    TRASH_PURGE_BATCH_SIZE: int = 1000
+    TRASH_PURGE_INTERVAL_SECONDS: float = 10.0
+    # The same purge prunes /todos/changes tombstones this old. Clients
+    # whose cursor predates them get a 410 and sync from scratch.
+    DELETION_LOG_RETENTION_DAYS: float = 90.0
+
+    # How often each process loads new token revocations, and drops the
+    # expired ones. 0 stops the loading; revocations still apply in the
+    # process that made them.
+    REVOCATION_REFRESH_SECONDS: float = 5.0
+    REVOCATION_COMPACT_SECONDS: float = 300.0
+
+    # Token buckets on the /auth routes, one per client address and, for
+    # logins, one per account: BURST requests at once, then RATE_PER_MINUTE.
+    # A rate of 0 turns a limit off. Each process keeps its own buckets.
+    AUTH_IP_RATE_PER_MINUTE: float = 60.0
+    AUTH_IP_BURST: int = 20
+    LOGIN_ACCOUNT_RATE_PER_MINUTE: float = 6.0
+    LOGIN_ACCOUNT_BURST: int = 5
+    RATE_LIMIT_MAX_KEYS: int = 100_000
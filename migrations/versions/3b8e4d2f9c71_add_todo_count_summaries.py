@@ -0,0 +1,210 @@
+"""add todo count summaries
+
+Revision ID: 3b8e4d2f9c71
+Revises: 6209b21082db
+Create Date: 2026-10-17 18:02:41.532190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b8e4d2f9c71'
+down_revision: Union[str, Sequence[str], None] = '6209b21082db'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TODO_COUNTS_POSTGRESQL_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION todo_counts_insert() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO todo_state_counts AS counts (user_id, state, count)
+        SELECT user_id, state, count(*) FROM new_todos
+        GROUP BY user_id, state ORDER BY user_id, state
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = counts.count + excluded.count;
+
+        INSERT INTO todo_daily_counts AS daily (user_id, day, created, done)
+        SELECT user_id, created_at::date, count(*),
+               count(*) FILTER (WHERE state = 'done')
+        FROM new_todos
+        GROUP BY user_id, created_at::date ORDER BY user_id, created_at::date
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            created = daily.created + excluded.created,
+            done = daily.done + excluded.done;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION todo_counts_update() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO todo_state_counts AS counts (user_id, state, count)
+        SELECT user_id, state, sum(delta) FROM (
+            SELECT user_id, state, 1 AS delta FROM new_todos
+            UNION ALL
+            SELECT user_id, state, -1 FROM old_todos
+        ) AS changes
+        GROUP BY user_id, state HAVING sum(delta) <> 0
+        ORDER BY user_id, state
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = counts.count + excluded.count;
+
+        INSERT INTO todo_daily_counts AS daily (user_id, day, created, done)
+        SELECT new_todos.user_id, new_todos.updated_at::date, 0, count(*)
+        FROM new_todos JOIN old_todos USING (id)
+        WHERE new_todos.state = 'done' AND old_todos.state <> 'done'
+        GROUP BY new_todos.user_id, new_todos.updated_at::date
+        ORDER BY new_todos.user_id, new_todos.updated_at::date
+        ON CONFLICT (user_id, day)
+        DO UPDATE SET done = daily.done + excluded.done;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION todo_counts_delete() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE todo_state_counts AS counts
+        SET count = counts.count - removed.count
+        FROM (
+            SELECT user_id, state, count(*) AS count FROM old_todos
+            GROUP BY user_id, state ORDER BY user_id, state
+        ) AS removed
+        WHERE counts.user_id = removed.user_id
+        AND counts.state = removed.state;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER todo_counts_insert AFTER INSERT ON todos
+    REFERENCING NEW TABLE AS new_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_counts_insert()
+    """,
+    """
+    CREATE TRIGGER todo_counts_update AFTER UPDATE ON todos
+    REFERENCING OLD TABLE AS old_todos NEW TABLE AS new_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_counts_update()
+    """,
+    """
+    CREATE TRIGGER todo_counts_delete AFTER DELETE ON todos
+    REFERENCING OLD TABLE AS old_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_counts_delete()
+    """,
+]
+
+TODO_COUNTS_SQLITE_DDL = [
+    """
+    CREATE TRIGGER todo_counts_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todo_state_counts (user_id, state, count)
+        VALUES (new.user_id, new.state, 1)
+        ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1;
+        INSERT INTO todo_daily_counts (user_id, day, created, done)
+        VALUES (
+            new.user_id, date(new.created_at), 1, new.state = 'done'
+        )
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            created = created + 1, done = done + excluded.done;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_counts_update AFTER UPDATE OF state ON todos
+    WHEN old.state <> new.state BEGIN
+        UPDATE todo_state_counts SET count = count - 1
+        WHERE user_id = old.user_id AND state = old.state;
+        INSERT INTO todo_state_counts (user_id, state, count)
+        VALUES (new.user_id, new.state, 1)
+        ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1;
+        INSERT INTO todo_daily_counts (user_id, day, created, done)
+        SELECT new.user_id, date(new.updated_at), 0, 1
+        WHERE new.state = 'done'
+        ON CONFLICT (user_id, day) DO UPDATE SET done = done + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_counts_delete AFTER DELETE ON todos BEGIN
+        UPDATE todo_state_counts SET count = count - 1
+        WHERE user_id = old.user_id AND state = old.state;
+    END
+    """,
+]
+
+BACKFILL = [
+    """
+    INSERT INTO todo_state_counts (user_id, state, count)
+    SELECT user_id, state, count(*) FROM todos GROUP BY user_id, state
+    """,
+    # Todos do not record when they were done, so existing ones count as
+    # done on the day they were last updated.
+    """
+    INSERT INTO todo_daily_counts (user_id, day, created, done)
+    SELECT user_id, day, sum(created), sum(done) FROM (
+        SELECT user_id, date(created_at) AS day, 1 AS created, 0 AS done
+        FROM todos
+        UNION ALL
+        SELECT user_id, date(updated_at), 0, 1 FROM todos
+        WHERE state = 'done'
+    ) AS events
+    GROUP BY user_id, day
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_context().dialect.name
+
+    if dialect == 'postgresql':
+        # Writes wait until the triggers exist and the backfill is done.
+        op.execute('LOCK TABLE todos IN SHARE MODE')
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('todo_daily_counts',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('created', sa.Integer(), nullable=False),
+    sa.Column('done', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+    op.create_table('todo_state_counts',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('state', postgresql.ENUM('draft', 'todo', 'doing', 'done', 'trash', name='todostate', create_type=False), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'state')
+    )
+    # ### end Alembic commands ###
+
+    ddl = {
+        'postgresql': TODO_COUNTS_POSTGRESQL_DDL,
+        'sqlite': TODO_COUNTS_SQLITE_DDL,
+    }.get(dialect, [])
+    for statement in ddl + BACKFILL:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_context().dialect.name
+
+    for name in ('delete', 'update', 'insert'):
+        if dialect == 'postgresql':
+            op.execute(f'DROP TRIGGER IF EXISTS todo_counts_{name} ON todos')
+            op.execute(f'DROP FUNCTION IF EXISTS todo_counts_{name}()')
+        elif dialect == 'sqlite':
+            op.execute(f'DROP TRIGGER IF EXISTS todo_counts_{name}')
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('todo_state_counts')
+    op.drop_table('todo_daily_counts')
+    # ### end Alembic commands ###
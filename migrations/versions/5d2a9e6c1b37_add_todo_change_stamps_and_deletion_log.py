@@ -0,0 +1,207 @@
+"""add todo change stamps and deletion log
+
+Revision ID: 5d2a9e6c1b37
+Revises: 8c1f5a7e2d40
+Create Date: 2026-10-17 23:41:27.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2a9e6c1b37'
+down_revision: Union[str, Sequence[str], None] = '8c1f5a7e2d40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Existing todos keep version 0, below every version the previous
+# revision handed out, so a first sync still returns all of them.
+VERSIONS_POSTGRESQL_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION todo_versions_stamp() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        SELECT version INTO NEW.version FROM todo_versions
+        WHERE user_id = NEW.user_id FOR UPDATE;
+        IF NOT FOUND THEN
+            INSERT INTO todo_versions (user_id, version)
+            VALUES (NEW.user_id, 0) ON CONFLICT (user_id) DO NOTHING;
+            SELECT version INTO NEW.version FROM todo_versions
+            WHERE user_id = NEW.user_id FOR UPDATE;
+        END IF;
+        RETURN NEW;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER todo_versions_stamp BEFORE INSERT OR UPDATE ON todos
+    FOR EACH ROW EXECUTE FUNCTION todo_versions_stamp()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION todo_versions_bump() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            WITH bumped AS (
+                UPDATE todo_versions SET version = version + 1
+                WHERE user_id IN (SELECT user_id FROM old_todos)
+                RETURNING user_id, version - 1 AS version
+            )
+            INSERT INTO todo_deletions (user_id, version, todo_id)
+            SELECT user_id, bumped.version, old_todos.id
+            FROM old_todos JOIN bumped USING (user_id);
+        ELSE
+            INSERT INTO todo_versions AS versions (user_id, version)
+            SELECT DISTINCT user_id, 1 FROM new_todos ORDER BY user_id
+            ON CONFLICT (user_id)
+            DO UPDATE SET version = versions.version + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+]
+
+VERSIONS_SQLITE_DDL = [
+    """
+    CREATE TRIGGER todo_versions_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todo_versions (user_id, version) VALUES (new.user_id, 0)
+        ON CONFLICT (user_id) DO NOTHING;
+        UPDATE todos SET version = (
+            SELECT version FROM todo_versions WHERE user_id = new.user_id
+        ) WHERE id = new.id;
+        UPDATE todo_versions SET version = version + 1
+        WHERE user_id = new.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_versions_update
+    AFTER UPDATE OF title, description, state, user_id, updated_at
+    ON todos BEGIN
+        INSERT INTO todo_versions (user_id, version) VALUES (new.user_id, 0)
+        ON CONFLICT (user_id) DO NOTHING;
+        UPDATE todos SET version = (
+            SELECT version FROM todo_versions WHERE user_id = new.user_id
+        ) WHERE id = new.id;
+        UPDATE todo_versions SET version = version + 1
+        WHERE user_id = new.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_versions_delete AFTER DELETE ON todos BEGIN
+        INSERT INTO todo_deletions (user_id, version, todo_id)
+        SELECT user_id, version, old.id FROM todo_versions
+        WHERE user_id = old.user_id;
+        UPDATE todo_versions SET version = version + 1
+        WHERE user_id = old.user_id;
+    END
+    """,
+]
+
+PREVIOUS_POSTGRESQL_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION todo_versions_bump() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            UPDATE todo_versions SET version = version + 1
+            WHERE user_id IN (SELECT user_id FROM old_todos);
+        ELSE
+            INSERT INTO todo_versions AS versions (user_id, version)
+            SELECT DISTINCT user_id, 1 FROM new_todos ORDER BY user_id
+            ON CONFLICT (user_id)
+            DO UPDATE SET version = versions.version + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+]
+
+PREVIOUS_SQLITE_DDL = [
+    """
+    CREATE TRIGGER todo_versions_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todo_versions (user_id, version) VALUES (new.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_versions_update AFTER UPDATE ON todos BEGIN
+        INSERT INTO todo_versions (user_id, version) VALUES (new.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_versions_delete AFTER DELETE ON todos BEGIN
+        UPDATE todo_versions SET version = version + 1
+        WHERE user_id = old.user_id;
+    END
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_context().dialect.name
+
+    if dialect == 'postgresql':
+        # Writes wait until every one of them stamps and logs.
+        op.execute('LOCK TABLE todos IN SHARE MODE')
+    elif dialect == 'sqlite':
+        for name in ('insert', 'update', 'delete'):
+            op.execute(f'DROP TRIGGER IF EXISTS todo_versions_{name}')
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('todo_deletions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('todo_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'version', 'todo_id')
+    )
+    op.add_column('todos', sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+    # ### end Alembic commands ###
+
+    ddl = {
+        'postgresql': VERSIONS_POSTGRESQL_DDL,
+        'sqlite': VERSIONS_SQLITE_DDL,
+    }.get(dialect, [])
+    for statement in ddl:
+        op.execute(statement)
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.get_context().autocommit_block():
+        op.create_index('ix_todos_user_id_version_id', 'todos', ['user_id', 'version', 'id'], unique=False, postgresql_concurrently=True)
+    # ### end Alembic commands ###
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_context().dialect.name
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_todos_user_id_version_id', table_name='todos', postgresql_concurrently=True)
+    # ### end Alembic commands ###
+
+    ddl = {
+        'postgresql': PREVIOUS_POSTGRESQL_DDL,
+        'sqlite': PREVIOUS_SQLITE_DDL,
+    }.get(dialect, [])
+    if dialect == 'postgresql':
+        op.execute('DROP TRIGGER IF EXISTS todo_versions_stamp ON todos')
+        op.execute('DROP FUNCTION IF EXISTS todo_versions_stamp()')
+    elif dialect == 'sqlite':
+        for name in ('insert', 'update', 'delete'):
+            op.execute(f'DROP TRIGGER IF EXISTS todo_versions_{name}')
+    for statement in ddl:
+        op.execute(statement)
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_column('todos', 'version')
+    op.drop_table('todo_deletions')
+    # ### end Alembic commands ###
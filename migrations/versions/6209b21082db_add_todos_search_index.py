@@ -0,0 +1,76 @@
+"""add todos search index
+
+Revision ID: 6209b21082db
+Revises: a590747d035a
+Create Date: 2026-10-17 16:11:11.167153
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6209b21082db'
+down_revision: Union[str, Sequence[str], None] = 'a590747d035a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TODOS_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE todos_fts USING fts5(
+        title, description, content='todos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 0'
+    )
+    """,
+    """
+    CREATE TRIGGER todos_fts_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_fts_delete AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_fts_update AFTER UPDATE OF title, description
+    ON todos BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_context().dialect.name
+
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index('ix_todos_search', 'todos', [sa.literal_column("to_tsvector('simple'::regconfig, title || ' ' || description)")], unique=False, postgresql_using='gin', postgresql_concurrently=True)
+    elif dialect == 'sqlite':
+        for statement in TODOS_FTS_DDL:
+            op.execute(statement)
+        op.execute("INSERT INTO todos_fts (todos_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_context().dialect.name
+
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_todos_search', table_name='todos', postgresql_using='gin', postgresql_concurrently=True)
+    elif dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_update')
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_delete')
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_insert')
+        op.execute('DROP TABLE IF EXISTS todos_fts')
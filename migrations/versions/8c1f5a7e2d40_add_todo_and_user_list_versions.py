@@ -0,0 +1,168 @@
+"""add todo and user list versions
+
+Revision ID: 8c1f5a7e2d40
+Revises: 3b8e4d2f9c71
+Create Date: 2026-10-17 21:14:09.817302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1f5a7e2d40'
+down_revision: Union[str, Sequence[str], None] = '3b8e4d2f9c71'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+VERSIONS_POSTGRESQL_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION todo_versions_bump() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            UPDATE todo_versions SET version = version + 1
+            WHERE user_id IN (SELECT user_id FROM old_todos);
+        ELSE
+            INSERT INTO todo_versions AS versions (user_id, version)
+            SELECT DISTINCT user_id, 1 FROM new_todos ORDER BY user_id
+            ON CONFLICT (user_id)
+            DO UPDATE SET version = versions.version + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER todo_versions_insert AFTER INSERT ON todos
+    REFERENCING NEW TABLE AS new_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_versions_bump()
+    """,
+    """
+    CREATE TRIGGER todo_versions_update AFTER UPDATE ON todos
+    REFERENCING NEW TABLE AS new_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_versions_bump()
+    """,
+    """
+    CREATE TRIGGER todo_versions_delete AFTER DELETE ON todos
+    REFERENCING OLD TABLE AS old_todos
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_versions_bump()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION users_version_bump() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO users_version AS versions (id, version) VALUES (1, 1)
+        ON CONFLICT (id) DO UPDATE SET version = versions.version + 1;
+        RETURN NULL;
+    END
+    $$
+    """,
+    """
+    CREATE TRIGGER users_version_bump AFTER INSERT OR UPDATE OR DELETE
+    ON users FOR EACH STATEMENT EXECUTE FUNCTION users_version_bump()
+    """,
+]
+
+VERSIONS_SQLITE_DDL = [
+    """
+    CREATE TRIGGER todo_versions_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todo_versions (user_id, version) VALUES (new.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_versions_update AFTER UPDATE ON todos BEGIN
+        INSERT INTO todo_versions (user_id, version) VALUES (new.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_versions_delete AFTER DELETE ON todos BEGIN
+        UPDATE todo_versions SET version = version + 1
+        WHERE user_id = old.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER users_version_insert AFTER INSERT ON users BEGIN
+        INSERT INTO users_version (id, version) VALUES (1, 1)
+        ON CONFLICT (id) DO UPDATE SET version = version + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER users_version_update AFTER UPDATE ON users BEGIN
+        INSERT INTO users_version (id, version) VALUES (1, 1)
+        ON CONFLICT (id) DO UPDATE SET version = version + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER users_version_delete AFTER DELETE ON users BEGIN
+        INSERT INTO users_version (id, version) VALUES (1, 1)
+        ON CONFLICT (id) DO UPDATE SET version = version + 1;
+    END
+    """,
+]
+
+# Todo deletes only bump versions that exist, so every user who already
+# has todos needs one.
+BACKFILL = [
+    """
+    INSERT INTO todo_versions (user_id, version)
+    SELECT DISTINCT user_id, 1 FROM todos
+    """,
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_context().dialect.name
+
+    if dialect == 'postgresql':
+        # Writes wait until the triggers exist and the backfill is done.
+        op.execute('LOCK TABLE todos IN SHARE MODE')
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('todo_versions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('users_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # ### end Alembic commands ###
+
+    ddl = {
+        'postgresql': VERSIONS_POSTGRESQL_DDL,
+        'sqlite': VERSIONS_SQLITE_DDL,
+    }.get(dialect, [])
+    for statement in ddl + BACKFILL:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_context().dialect.name
+
+    for name in ('delete', 'update', 'insert'):
+        if dialect == 'postgresql':
+            op.execute(f'DROP TRIGGER IF EXISTS todo_versions_{name} ON todos')
+        elif dialect == 'sqlite':
+            op.execute(f'DROP TRIGGER IF EXISTS todo_versions_{name}')
+            op.execute(f'DROP TRIGGER IF EXISTS users_version_{name}')
+
+    if dialect == 'postgresql':
+        op.execute('DROP TRIGGER IF EXISTS users_version_bump ON users')
+        op.execute('DROP FUNCTION IF EXISTS users_version_bump()')
+        op.execute('DROP FUNCTION IF EXISTS todo_versions_bump()')
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.drop_table('users_version')
+    op.drop_table('todo_versions')
+    # ### end Alembic commands ###
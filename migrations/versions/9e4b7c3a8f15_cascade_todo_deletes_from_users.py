@@ -0,0 +1,249 @@
+"""cascade todo deletes from users
+
+Revision ID: 9e4b7c3a8f15
+Revises: 5d2a9e6c1b37
+Create Date: 2026-10-18 09:12:53.270846
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b7c3a8f15'
+down_revision: Union[str, Sequence[str], None] = '5d2a9e6c1b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# SQLite can only change a foreign key by rebuilding the table, which
+# drops every trigger on it, so they are all created again afterwards.
+TODOS_SQLITE_TRIGGERS_DDL = [
+    """
+    CREATE TRIGGER todos_fts_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_fts_delete AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_fts_update AFTER UPDATE OF title, description
+    ON todos BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todos_fts (rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER todo_counts_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todo_state_counts (user_id, state, count)
+        VALUES (new.user_id, new.state, 1)
+        ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1;
+        INSERT INTO todo_daily_counts (user_id, day, created, done)
+        VALUES (
+            new.user_id, date(new.created_at), 1, new.state = 'done'
+        )
+        ON CONFLICT (user_id, day) DO UPDATE SET
+            created = created + 1, done = done + excluded.done;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_counts_update AFTER UPDATE OF state ON todos
+    WHEN old.state <> new.state BEGIN
+        UPDATE todo_state_counts SET count = count - 1
+        WHERE user_id = old.user_id AND state = old.state;
+        INSERT INTO todo_state_counts (user_id, state, count)
+        VALUES (new.user_id, new.state, 1)
+        ON CONFLICT (user_id, state) DO UPDATE SET count = count + 1;
+        INSERT INTO todo_daily_counts (user_id, day, created, done)
+        SELECT new.user_id, date(new.updated_at), 0, 1
+        WHERE new.state = 'done'
+        ON CONFLICT (user_id, day) DO UPDATE SET done = done + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_counts_delete AFTER DELETE ON todos BEGIN
+        UPDATE todo_state_counts SET count = count - 1
+        WHERE user_id = old.user_id AND state = old.state;
+    END
+    """,
+]
+
+VERSIONS_POSTGRESQL_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION todo_versions_bump() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            WITH bumped AS (
+                UPDATE todo_versions SET version = version + 1
+                WHERE user_id IN (SELECT user_id FROM old_todos)
+                AND user_id IN (SELECT id FROM users)
+                RETURNING user_id, version - 1 AS version
+            )
+            INSERT INTO todo_deletions (user_id, version, todo_id)
+            SELECT user_id, bumped.version, old_todos.id
+            FROM old_todos JOIN bumped USING (user_id);
+        ELSE
+            INSERT INTO todo_versions AS versions (user_id, version)
+            SELECT DISTINCT user_id, 1 FROM new_todos ORDER BY user_id
+            ON CONFLICT (user_id)
+            DO UPDATE SET version = versions.version + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+]
+
+VERSIONS_SQLITE_DDL = [
+    """
+    CREATE TRIGGER todo_versions_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todo_versions (user_id, version) VALUES (new.user_id, 0)
+        ON CONFLICT (user_id) DO NOTHING;
+        UPDATE todos SET version = (
+            SELECT version FROM todo_versions WHERE user_id = new.user_id
+        ) WHERE id = new.id;
+        UPDATE todo_versions SET version = version + 1
+        WHERE user_id = new.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_versions_update
+    AFTER UPDATE OF title, description, state, user_id, updated_at
+    ON todos BEGIN
+        INSERT INTO todo_versions (user_id, version) VALUES (new.user_id, 0)
+        ON CONFLICT (user_id) DO NOTHING;
+        UPDATE todos SET version = (
+            SELECT version FROM todo_versions WHERE user_id = new.user_id
+        ) WHERE id = new.id;
+        UPDATE todo_versions SET version = version + 1
+        WHERE user_id = new.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_versions_delete AFTER DELETE ON todos BEGIN
+        INSERT INTO todo_deletions (user_id, version, todo_id)
+        SELECT user_id, version, old.id FROM todo_versions
+        WHERE user_id = old.user_id
+        AND user_id IN (SELECT id FROM users);
+        UPDATE todo_versions SET version = version + 1
+        WHERE user_id = old.user_id;
+    END
+    """,
+]
+
+PREVIOUS_POSTGRESQL_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION todo_versions_bump() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            WITH bumped AS (
+                UPDATE todo_versions SET version = version + 1
+                WHERE user_id IN (SELECT user_id FROM old_todos)
+                RETURNING user_id, version - 1 AS version
+            )
+            INSERT INTO todo_deletions (user_id, version, todo_id)
+            SELECT user_id, bumped.version, old_todos.id
+            FROM old_todos JOIN bumped USING (user_id);
+        ELSE
+            INSERT INTO todo_versions AS versions (user_id, version)
+            SELECT DISTINCT user_id, 1 FROM new_todos ORDER BY user_id
+            ON CONFLICT (user_id)
+            DO UPDATE SET version = versions.version + 1;
+        END IF;
+        RETURN NULL;
+    END
+    $$
+    """,
+]
+
+PREVIOUS_SQLITE_DDL = [
+    """
+    CREATE TRIGGER todo_versions_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todo_versions (user_id, version) VALUES (new.user_id, 0)
+        ON CONFLICT (user_id) DO NOTHING;
+        UPDATE todos SET version = (
+            SELECT version FROM todo_versions WHERE user_id = new.user_id
+        ) WHERE id = new.id;
+        UPDATE todo_versions SET version = version + 1
+        WHERE user_id = new.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_versions_update
+    AFTER UPDATE OF title, description, state, user_id, updated_at
+    ON todos BEGIN
+        INSERT INTO todo_versions (user_id, version) VALUES (new.user_id, 0)
+        ON CONFLICT (user_id) DO NOTHING;
+        UPDATE todos SET version = (
+            SELECT version FROM todo_versions WHERE user_id = new.user_id
+        ) WHERE id = new.id;
+        UPDATE todo_versions SET version = version + 1
+        WHERE user_id = new.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER todo_versions_delete AFTER DELETE ON todos BEGIN
+        INSERT INTO todo_deletions (user_id, version, todo_id)
+        SELECT user_id, version, old.id FROM todo_versions
+        WHERE user_id = old.user_id;
+        UPDATE todo_versions SET version = version + 1
+        WHERE user_id = old.user_id;
+    END
+    """,
+]
+
+# Gives the unnamed SQLite foreign key a name batch mode can drop.
+NAMING_CONVENTION = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+}
+
+
+def replace_foreign_key(dialect: str, ondelete: str | None) -> None:
+    if dialect == 'postgresql':
+        op.drop_constraint('todos_user_id_fkey', 'todos', type_='foreignkey')
+        # Checking existing rows later, with VALIDATE, lets writes go on.
+        op.create_foreign_key('todos_user_id_fkey', 'todos', 'users', ['user_id'], ['id'], ondelete=ondelete, postgresql_not_valid=True)
+        op.execute('ALTER TABLE todos VALIDATE CONSTRAINT todos_user_id_fkey')
+    else:
+        with op.batch_alter_table('todos', recreate='always', naming_convention=NAMING_CONVENTION) as batch_op:
+            batch_op.drop_constraint('fk_todos_user_id_users', type_='foreignkey')
+            batch_op.create_foreign_key('fk_todos_user_id_users', 'users', ['user_id'], ['id'], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_context().dialect.name
+
+    replace_foreign_key(dialect, 'CASCADE')
+
+    ddl = {
+        'postgresql': VERSIONS_POSTGRESQL_DDL,
+        'sqlite': TODOS_SQLITE_TRIGGERS_DDL + VERSIONS_SQLITE_DDL,
+    }.get(dialect, [])
+    for statement in ddl:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_context().dialect.name
+
+    replace_foreign_key(dialect, None)
+
+    ddl = {
+        'postgresql': PREVIOUS_POSTGRESQL_DDL,
+        'sqlite': TODOS_SQLITE_TRIGGERS_DDL + PREVIOUS_SQLITE_DDL,
+    }.get(dialect, [])
+    for statement in ddl:
+        op.execute(statement)
@@ -0,0 +1,51 @@
+"""prune todo deletion log
+
+Revision ID: d8e1a5b3f724
+Revises: f2b6d8a4c517
+Create Date: 2026-10-19 10:04:38.512907
+
+"""
+from contextlib import contextmanager
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8e1a5b3f724'
+down_revision: Union[str, Sequence[str], None] = 'f2b6d8a4c517'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+@contextmanager
+def rebuild_todo_deletions():
+    # SQLite cannot add a column with a CURRENT_TIMESTAMP default in
+    # place, so the table is rebuilt there. The legacy rename leaves the
+    # todos trigger that writes to it alone instead of failing on it.
+    sqlite = op.get_bind().dialect.name == 'sqlite'
+    if sqlite:
+        op.execute('PRAGMA legacy_alter_table = ON')
+    with op.batch_alter_table('todo_deletions', recreate='always') as batch_op:
+        yield batch_op
+    if sqlite:
+        op.execute('PRAGMA legacy_alter_table = OFF')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing tombstones count as deleted now and are pruned once the
+    # retention has passed.
+    with rebuild_todo_deletions() as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False))
+    op.create_index('ix_todo_deletions_deleted_at', 'todo_deletions', ['deleted_at'], unique=False)
+    op.add_column('todo_versions', sa.Column('pruned_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('todo_versions', 'pruned_version')
+    op.drop_index('ix_todo_deletions_deleted_at', table_name='todo_deletions')
+    with rebuild_todo_deletions() as batch_op:
+        batch_op.drop_column('deleted_at')
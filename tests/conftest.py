@@ -10,18 +10,43 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from testcontainers.postgres import PostgresContainer
 
 from fast_zero.app import app
-from fast_zero.database import get_session
+from fast_zero.app import settings as app_settings
+from fast_zero.database import get_replica_session, get_session
+from fast_zero.instrumentation import instrument_engine, route_stats
 from fast_zero.models import User, table_registry
-from fast_zero.security import get_password_hash
+from fast_zero.security import (
+    get_password_hash,
+    principal_cache,
+    rate_limit_buckets,
+    recent_writers,
+    revoked_tokens,
+    token_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clear_auth_caches():
+    yield
+    token_cache.clear()
+    principal_cache.clear()
+    recent_writers.clear()
+    revoked_tokens.clear()
+    rate_limit_buckets.clear()
 
 
 @pytest.fixture
-def client(session):
+def client(session, monkeypatch):
+    # The background tasks would run against the app's database, not
+    # the test one.
+    monkeypatch.setattr(app_settings, 'TRASH_PURGE_BATCH_SIZE', 0)
+    monkeypatch.setattr(app_settings, 'REVOCATION_REFRESH_SECONDS', 0)
+
     def get_session_override():
         return session
 
     with TestClient(app) as client:
         app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_replica_session] = get_session_override
         yield client
 
     app.dependency_overrides.clear()
@@ -61,6 +86,24 @@ def mock_db_time():
     return _mock_db_time
 
 
+@pytest.fixture
+def statements(engine):
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        captured.append((statement, parameters))
+
+    event.listen(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+
+    yield captured
+
+    event.remove(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+
+
 @pytest_asyncio.fixture
 async def user(session):
     password = 'testpassword'
@@ -112,4 +155,23 @@ class UserFactory(factory.Factory):
 def engine():
     with PostgresContainer('postgres:16', driver='psycopg') as postgres:
         _engine = create_async_engine(postgres.get_connection_url())
+        instrument_engine(_engine)
         yield _engine
+
+
+@pytest.fixture
+def query_budget():
+    @contextmanager
+    def budget(route: str, max_statements: int):
+        route_stats.clear()
+
+        yield
+
+        stats = route_stats[route]
+        assert stats['requests'], f'{route} was not requested'
+        assert stats['max_statements'] <= max_statements, (
+            f'{route} ran {stats["max_statements"]} statements, '
+            f'budget is {max_statements}'
+        )
+
+    return budget
@@ -70,6 +70,41 @@ def test_refresh_token(client, user, token):
     assert response.json()['token_type'] == 'bearer'
 
 
+def test_refresh_token_revokes_the_old_token(client, user, token):
+    new_token = client.post(
+        '/auth/refresh_token', headers={'Authorization': f'Bearer {token}'}
+    ).json()['access_token']
+
+    old_headers = {'Authorization': f'Bearer {token}'}
+    assert (
+        client.get('/todos/', headers=old_headers).status_code
+        == HTTPStatus.UNAUTHORIZED
+    )
+    assert (
+        client.post('/auth/refresh_token', headers=old_headers).status_code
+        == HTTPStatus.UNAUTHORIZED
+    )
+
+    response = client.post(
+        '/auth/refresh_token',
+        headers={'Authorization': f'Bearer {new_token}'},
+    )
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_logout_revokes_the_token(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.post('/auth/logout', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'message': 'Logged out'}
+    assert (
+        client.get('/todos/', headers=headers).status_code
+        == HTTPStatus.UNAUTHORIZED
+    )
+
+
 def test_token_expired_dont_refresh(client, user):
     with freeze_time('2024-01-01 12:00:00'):
         response = client.post(
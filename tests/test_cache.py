@@ -0,0 +1,47 @@
+from freezegun import freeze_time
+
+from fast_zero.cache import TTLCache
+
+
+def test_cache_hit_and_miss_counters():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set('key', 'value')
+
+    assert cache.get('key') == 'value'
+    assert cache.get('other') is None
+    assert cache.stats() == {'size': 1, 'maxsize': 10, 'hits': 1, 'misses': 1}
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 'first')
+    cache.set('b', 'second')
+    cache.get('a')
+    cache.set('c', 'third')
+
+    assert cache.get('a') == 'first'
+    assert cache.get('b') is None
+    assert cache.get('c') == 'third'
+
+
+def test_cache_entries_expire():
+    cache = TTLCache(maxsize=10, ttl=60)
+
+    with freeze_time('2024-01-01 12:00:00') as frozen:
+        cache.set('default', 'value')
+        cache.set('short', 'value', ttl=10)
+
+        frozen.tick(11)
+        assert cache.get('short') is None
+        assert cache.get('default') == 'value'
+
+        frozen.tick(50)
+        assert cache.get('default') is None
+        assert len(cache) == 0
+
+
+def test_cache_disabled_with_zero_size():
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set('key', 'value')
+
+    assert cache.get('key') is None
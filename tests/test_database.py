@@ -0,0 +1,131 @@
+import asyncio
+from http import HTTPStatus
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from fast_zero.app import app
+from fast_zero.database import (
+    MeteredPool,
+    build_engine,
+    engine_options,
+    get_replica_session,
+)
+from fast_zero.database import get_session as get_app_session
+from fast_zero.models import table_registry
+from fast_zero.settings import Settings
+
+
+def test_engine_options_for_postgres():
+    settings = Settings(
+        DATABASE_POOL_SIZE=3,
+        DATABASE_MAX_OVERFLOW=1,
+        DATABASE_STATEMENT_TIMEOUT_MS=500,
+        DATABASE_PREPARE_THRESHOLD=None,
+    )
+
+    options = engine_options('postgresql+psycopg://u:p@db/app', settings)
+
+    assert options['poolclass'] is MeteredPool
+    assert options['pool_size'] == 3  # noqa: PLR2004
+    assert options['max_overflow'] == 1
+    assert options['pool_pre_ping'] is True
+    assert options['connect_args'] == {
+        'prepare_threshold': None,
+        'options': '-c statement_timeout=500',
+    }
+
+
+def test_engine_options_for_in_memory_sqlite():
+    options = engine_options('sqlite+aiosqlite:///:memory:', Settings())
+
+    assert 'pool_size' not in options
+    assert 'connect_args' not in options
+
+
+@pytest.mark.asyncio
+async def test_sqlite_engines_enforce_foreign_keys():
+    engine = build_engine('sqlite+aiosqlite:///:memory:', Settings())
+    try:
+        async with engine.connect() as conn:
+            enabled = await conn.scalar(text('PRAGMA foreign_keys'))
+    finally:
+        await engine.dispose()
+
+    assert enabled == 1
+
+
+@pytest.mark.asyncio
+async def test_small_pool_queues_concurrent_requests(session, user):
+    small_engine = build_engine(
+        session.bind.url.render_as_string(hide_password=False),
+        Settings(
+            DATABASE_POOL_SIZE=2,
+            DATABASE_MAX_OVERFLOW=0,
+            DATABASE_POOL_TIMEOUT_SECONDS=10,
+        ),
+    )
+
+    async def get_session():
+        async with AsyncSession(small_engine) as small_session:
+            yield small_session
+
+    app.dependency_overrides[get_app_session] = get_session
+    app.dependency_overrides[get_replica_session] = get_session
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url='http://test'
+        ) as client:
+            responses = await asyncio.gather(*[
+                client.get(f'/users/{user.id}') for _ in range(50)
+            ])
+        metrics = small_engine.sync_engine.pool.metrics
+    finally:
+        app.dependency_overrides.clear()
+        await small_engine.dispose()
+
+    assert {response.status_code for response in responses} == {HTTPStatus.OK}
+    assert metrics.timeouts == 0
+    assert metrics.peak_checked_out <= 2  # noqa: PLR2004
+    assert metrics.queued > 0
+
+
+@pytest_asyncio.fixture
+async def replica(client, tmp_path):
+    # An empty SQLite replica makes it visible which database served a read.
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path}/replica.db')
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        app.dependency_overrides[get_replica_session] = lambda: session
+        yield session
+
+    await engine.dispose()
+
+
+def test_reads_go_to_the_replica(client, user, replica):
+    response = client.get('/users/')
+
+    assert response.json() == {'users': [], 'next_cursor': None}
+    assert client.get(f'/users/{user.id}').status_code == HTTPStatus.NOT_FOUND
+
+
+def test_reads_after_own_write_go_to_the_primary(client, user, token, replica):
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.get('/todos/', headers=headers).json()['todos'] == []
+
+    client.post(
+        '/todos/',
+        headers=headers,
+        json={'title': 'Test', 'description': 'Test', 'state': 'todo'},
+    )
+
+    response = client.get('/todos/', headers=headers)
+    assert [todo['title'] for todo in response.json()['todos']] == ['Test']
+
+    response = client.get('/users/')
+    assert response.json() == {'users': [], 'next_cursor': None}
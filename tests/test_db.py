@@ -2,6 +2,8 @@ from dataclasses import asdict
 
 import pytest
 from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import selectinload
 
 from fast_zero.models import Todo, User
 
@@ -17,7 +19,11 @@ async def test_create_user(session, mock_db_time):
         session.add(new_user)
         await session.commit()
 
-    user = await session.scalar(select(User).where(User.username == 'test'))
+    user = await session.scalar(
+        select(User)
+        .where(User.username == 'test')
+        .options(selectinload(User.todos))
+    )
 
     assert asdict(user) == {
         'id': 1,
@@ -27,6 +33,7 @@ async def test_create_user(session, mock_db_time):
         'todos': [],
         'created_at': time,
         'updated_at': time,
+        'token_version': 0,
     }
 
 
@@ -52,6 +59,7 @@ async def test_create_todo(session, user):
         'user_id': user.id,
         'created_at': todo.created_at,
         'updated_at': todo.updated_at,
+        'version': 0,
     }
 
 
@@ -68,6 +76,20 @@ async def test_user_todo_relationship(session, user: User):
     await session.commit()
     await session.refresh(user)
 
-    user = await session.scalar(select(User).where(User.id == user.id))
+    user = await session.scalar(
+        select(User)
+        .where(User.id == user.id)
+        .options(selectinload(User.todos))
+    )
 
     assert user.todos == [todo]
+
+
+@pytest.mark.asyncio
+async def test_user_todos_are_not_loaded_by_default(session, user: User):
+    session.expunge_all()
+
+    user = await session.scalar(select(User).where(User.id == user.id))
+
+    with pytest.raises(InvalidRequestError):
+        user.todos
@@ -0,0 +1,56 @@
+import asyncio
+from threading import Event
+
+import pytest
+
+from fast_zero.executor import BoundedExecutor
+
+
+@pytest.mark.asyncio
+async def test_executor_runs_function_in_worker_thread():
+    executor = BoundedExecutor(max_workers=1, name='test')
+
+    result = await executor.run(pow, 2, 10)
+
+    assert result == 2**10
+    assert executor.stats() == {
+        'max_workers': 1,
+        'running': 0,
+        'queued': 0,
+        'peak_queued': 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_executor_queues_beyond_max_workers():
+    executor = BoundedExecutor(max_workers=1, name='test')
+    release = Event()
+
+    tasks = [asyncio.create_task(executor.run(release.wait)) for _ in range(3)]
+    await asyncio.sleep(0.05)
+
+    assert executor.running == 1
+    assert executor.queued == 2  # noqa: PLR2004
+
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert executor.running == 0
+    assert executor.queued == 0
+    assert executor.peak_queued == 2  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_executor_forgets_cancelled_queued_calls():
+    executor = BoundedExecutor(max_workers=1, name='test')
+    release = Event()
+
+    running = asyncio.create_task(executor.run(release.wait))
+    queued = asyncio.create_task(executor.run(release.wait))
+    await asyncio.sleep(0.05)
+
+    queued.cancel()
+    release.set()
+    await running
+
+    assert executor.queued == 0
@@ -0,0 +1,60 @@
+import logging
+from http import HTTPStatus
+
+import pytest
+
+from fast_zero import instrumentation
+from fast_zero.instrumentation import route_stats
+
+
+def test_response_reports_server_timing(client, user):
+    response = client.get('/users/')
+
+    assert response.status_code == HTTPStatus.OK
+    assert 'desc="1 queries"' in response.headers['server-timing']
+
+
+def test_queries_are_aggregated_per_route(client, user):
+    route_stats.clear()
+
+    client.get('/users/?limit=1')
+    client.get('/users/?limit=2')
+
+    stats = route_stats['GET /users/']
+    assert stats['requests'] == 2  # noqa: PLR2004
+    assert stats['statements'] == 2  # noqa: PLR2004
+    assert stats['max_statements'] == 1
+    assert stats['slowest_statement'].startswith('SELECT')
+
+
+def test_slow_queries_are_logged(client, user, caplog, monkeypatch):
+    monkeypatch.setattr(instrumentation.settings, 'SLOW_QUERY_MS', 0)
+
+    with caplog.at_level(logging.WARNING, logger=instrumentation.__name__):
+        client.get('/users/')
+
+    assert 'Slow query' in caplog.text
+
+
+@pytest.mark.parametrize(
+    ('method', 'url', 'route', 'budget'),
+    [
+        ('GET', '/todos/', 'GET /todos/', 3),
+        ('GET', '/todos/stats?days=7', 'GET /todos/stats', 3),
+        ('GET', '/todos/changes', 'GET /todos/changes', 4),
+        ('POST', '/auth/refresh_token', 'POST /auth/refresh_token', 2),
+        ('GET', '/users/', 'GET /users/', 1),
+        ('GET', '/users/{user_id}', 'GET /users/{user_id}', 1),
+    ],
+)
+def test_query_budgets(  # noqa: PLR0913, PLR0917
+    client, user, token, query_budget, method, url, route, budget
+):
+    with query_budget(route, budget):
+        response = client.request(
+            method,
+            url.format(user_id=user.id),
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    assert response.status_code == HTTPStatus.OK
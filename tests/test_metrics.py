@@ -0,0 +1,160 @@
+import asyncio
+import json
+import logging
+import os
+from http import HTTPStatus
+
+import pytest
+
+from fast_zero.app import flush_metrics
+from fast_zero.metrics import Registry, merge, retire_dead_workers
+from fast_zero.security import JWT_DECODE_FAILURES, PASSWORD_HASH_SECONDS
+
+DEAD_PID = 2**22 + 1  # above Linux's pid_max, so never a live process
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram(
+        'latency_seconds', 'Latency.', ('route',), buckets=(0.1, 1.0)
+    )
+
+    latency.observe(0.05, '/a')
+    latency.observe(0.5, '/a')
+    latency.observe(5, '/a')
+
+    assert registry.render().splitlines() == [
+        '# HELP latency_seconds Latency.',
+        '# TYPE latency_seconds histogram',
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 2',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 3',
+        'latency_seconds_sum{route="/a"} 5.55',
+        'latency_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_merge_sums_workers_and_drops_gauges_of_dead_ones():
+    registry = Registry()
+    requests = registry.counter('requests_total', 'Requests.')
+    in_flight = registry.gauge('in_flight', 'In flight.')
+    requests.inc(amount=2)
+    in_flight.set(3)
+    snapshot = registry.snapshot()
+
+    merged = merge([(snapshot, True), (snapshot, False)])
+
+    assert merged['requests_total']['series'] == [[[], 4]]
+    assert merged['in_flight']['series'] == [[[], 3]]
+
+
+def test_render_adds_up_every_worker_file(tmp_path):
+    registry = Registry()
+    registry.counter('requests_total', 'Requests.').inc()
+    (tmp_path / f'{DEAD_PID}.json').write_text(
+        json.dumps(registry.snapshot()), encoding='utf-8'
+    )
+
+    assert 'requests_total 2' in registry.render(str(tmp_path))
+
+
+def test_dead_workers_are_folded_into_the_retired_totals(tmp_path):
+    registry = Registry()
+    requests = registry.counter('requests_total', 'Requests.')
+    registry.gauge('in_flight', 'In flight.').set(3)
+    requests.inc()
+
+    for pid in (DEAD_PID, DEAD_PID + 1):
+        (tmp_path / f'{pid}.json').write_text(
+            json.dumps(registry.snapshot()), encoding='utf-8'
+        )
+        retire_dead_workers(str(tmp_path))
+
+    rendered = registry.render(str(tmp_path))
+
+    assert sorted(path.name for path in tmp_path.glob('*.json')) == sorted([
+        'retired.json',
+        f'{os.getpid()}.json',
+    ])
+    assert 'requests_total 3' in rendered
+    assert 'in_flight 3' in rendered
+
+
+def test_render_falls_back_to_this_worker_without_a_directory(tmp_path):
+    registry = Registry()
+    registry.counter('requests_total', 'Requests.').inc()
+
+    rendered = registry.render(str(tmp_path / 'missing'))
+
+    assert 'requests_total 1' in rendered
+
+
+@pytest.mark.asyncio
+async def test_flush_metrics_logs_failures_and_keeps_going(tmp_path, caplog):
+    caplog.set_level(logging.ERROR)
+    task = asyncio.create_task(flush_metrics(str(tmp_path / 'missing'), 0))
+
+    for _ in range(3):
+        await asyncio.sleep(0)
+    running = not task.done()
+    task.cancel()
+
+    assert running
+    assert [record.message for record in caplog.records].count(
+        'Metrics flush failed'
+    ) >= 2  # noqa: PLR2004
+
+
+def test_metrics_endpoint_reports_route_latency(client, user):
+    client.get('/users/')
+
+    response = client.get('/metrics')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    assert (
+        'http_request_duration_seconds_count'
+        '{method="GET",route="/users/",status="200"}'
+    ) in response.text
+    assert 'http_requests_in_flight 1' in response.text
+
+
+def test_jwt_decode_failures_are_counted(client):
+    JWT_DECODE_FAILURES.clear()
+
+    client.get('/todos/', headers={'Authorization': 'Bearer invalid'})
+
+    assert JWT_DECODE_FAILURES.snapshot()['series'] == [[['invalid'], 1]]
+
+
+def test_password_hashing_is_timed(client):
+    PASSWORD_HASH_SECONDS.clear()
+
+    client.post(
+        '/users/',
+        json={
+            'username': 'alice',
+            'email': 'alice@example.com',
+            'password': 'secret',
+        },
+    )
+
+    [(labels, (buckets, _))] = PASSWORD_HASH_SECONDS.snapshot()['series']
+    assert labels == ['hash']
+    assert sum(buckets) == 1
+
+
+def test_auth_caches_and_hashing_queue_are_exported(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/', headers=headers)
+    client.get('/todos/', headers=headers)
+
+    text = client.get('/metrics').text
+
+    assert 'auth_cache_entries{cache="principal"} 1' in text
+    assert 'auth_cache_lookups_total{cache="principal",result="hit"} 1' in (
+        text
+    )
+    assert 'auth_cache_lookups_total{cache="token",result="hit"}' in text
+    assert 'password_hash_calls{state="queued"} 0' in text
+    assert 'password_hash_calls{state="peak_queued"}' in text
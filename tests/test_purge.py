@@ -0,0 +1,105 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from fast_zero.models import Todo, TodoDeletion, TodoState, TodoVersion
+from fast_zero.purge import prune_deletions, purge_trash, purge_trash_forever
+from tests.test_todos import TodoFactory
+
+
+@pytest.mark.asyncio
+async def test_purge_trash_deletes_old_trash_in_batches(
+    session, user, mock_db_time
+):
+    with mock_db_time(model=Todo):
+        old_trash = TodoFactory.create_batch(
+            3, user_id=user.id, state=TodoState.trash
+        )
+        old_live = TodoFactory(user_id=user.id, state=TodoState.done)
+        session.add_all([*old_trash, old_live])
+        await session.commit()
+    new_trash = TodoFactory(user_id=user.id, state=TodoState.trash)
+    session.add(new_trash)
+    await session.commit()
+
+    purged = [
+        await purge_trash(session, timedelta(days=1), 2) for _ in range(3)
+    ]
+
+    assert purged == [2, 1, 0]
+    assert set(await session.scalars(select(Todo.id))) == {
+        old_live.id,
+        new_trash.id,
+    }
+
+
+@pytest.mark.asyncio
+async def test_prune_deletions_moves_the_pruned_version(
+    session, user, other_user
+):
+    session.add_all([
+        *TodoFactory.create_batch(3, user_id=user.id, state=TodoState.trash),
+        TodoFactory(user_id=other_user.id, state=TodoState.trash),
+    ])
+    await session.commit()
+    await purge_trash(session, timedelta(0), 100)
+    versions = dict(
+        (
+            await session.execute(
+                select(
+                    TodoDeletion.user_id, func.max(TodoDeletion.version)
+                ).group_by(TodoDeletion.user_id)
+            )
+        ).all()
+    )
+
+    kept = await prune_deletions(session, timedelta(days=1), 100)
+    pruned = await prune_deletions(session, timedelta(0), 100)
+
+    assert (kept, pruned) == (0, 4)
+    assert await session.scalar(select(TodoDeletion.todo_id)) is None
+    assert dict(
+        (
+            await session.execute(
+                select(TodoVersion.user_id, TodoVersion.pruned_version)
+            )
+        ).all()
+    ) == {owner: version + 1 for owner, version in versions.items()}
+
+
+@pytest.mark.asyncio
+async def test_purge_trash_does_not_seq_scan(session, user, statements):
+    statements.clear()
+    await purge_trash(session, timedelta(days=1), 100)
+    (statement, parameters), *_ = statements
+
+    conn = await session.connection()
+    await conn.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    result = await conn.exec_driver_sql(f'EXPLAIN {statement}', parameters)
+    plan = '\n'.join(row[0] for row in result)
+
+    assert 'ix_todos_trash_updated_at' in plan, plan
+    await session.rollback()
+
+
+@pytest.mark.asyncio
+async def test_purge_trash_forever_empties_the_trash(session, user, engine):
+    todo = TodoFactory(user_id=user.id, state=TodoState.trash)
+    session.add(todo)
+    await session.commit()
+
+    worker = asyncio.create_task(
+        purge_trash_forever(engine, timedelta(0), timedelta(0), 10, 0.01)
+    )
+    try:
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if not await session.scalar(select(Todo.id)):
+                break
+            await session.rollback()
+    finally:
+        worker.cancel()
+
+    assert await session.scalar(select(Todo.id)) is None
@@ -0,0 +1,120 @@
+from http import HTTPStatus
+
+import pytest
+
+from fast_zero.ratelimit import TokenBuckets
+from fast_zero.routers import auth
+from fast_zero.security import account_rate_limit, ip_rate_limit
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_token_buckets_refill_over_time():
+    clock = FakeClock()
+    buckets = TokenBuckets(maxsize=10, clock=clock)
+
+    taken = [await buckets.take('key', rate=0.5, capacity=2) for _ in range(3)]
+    clock.now = 1.0
+    still_waiting = await buckets.take('key', rate=0.5, capacity=2)
+    clock.now = 2.0
+    refilled = await buckets.take('key', rate=0.5, capacity=2)
+
+    assert taken == [0, 0, 2.0]
+    assert still_waiting == 1.0
+    assert refilled == 0
+
+
+@pytest.mark.asyncio
+async def test_token_buckets_forget_the_least_recently_used():
+    buckets = TokenBuckets(maxsize=2)
+
+    for key in ('first', 'second', 'third'):
+        await buckets.take(key, rate=1, capacity=1)
+
+    assert len(buckets) == 2  # noqa: PLR2004
+    assert await buckets.take('first', rate=1, capacity=1) == 0
+    assert await buckets.take('third', rate=1, capacity=1) > 0
+
+
+def test_login_is_throttled_per_account_before_verifying(
+    client, user, monkeypatch
+):
+    verified = []
+
+    async def verify_password_async(plain_password, hashed_password):
+        verified.append(plain_password)
+        return False
+
+    monkeypatch.setattr(auth, 'verify_password_async', verify_password_async)
+    monkeypatch.setattr(account_rate_limit, 'burst', 2)
+
+    responses = [
+        client.post(
+            '/auth/token',
+            data={'username': username, 'password': 'wrongpassword'},
+        )
+        for username in (user.email, user.email, user.email.upper())
+    ]
+    other_account = client.post(
+        '/auth/token',
+        data={'username': 'other@example.com', 'password': 'wrongpassword'},
+    )
+
+    assert [response.status_code for response in responses] == [
+        HTTPStatus.UNAUTHORIZED,
+        HTTPStatus.UNAUTHORIZED,
+        HTTPStatus.TOO_MANY_REQUESTS,
+    ]
+    assert responses[-1].json() == {'detail': 'Too many requests'}
+    assert int(responses[-1].headers['Retry-After']) > 0
+    assert len(verified) == 2  # noqa: PLR2004
+    assert other_account.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_auth_routes_are_throttled_per_address(client, token, monkeypatch):
+    monkeypatch.setattr(ip_rate_limit, 'burst', 1)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    allowed = client.post('/auth/logout', headers=headers)
+    rejected = client.post(
+        '/auth/token',
+        data={'username': 'someone@example.com', 'password': 'secret'},
+    )
+
+    assert allowed.status_code == HTTPStatus.OK
+    assert rejected.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert client.get('/todos/', headers=headers).status_code != (
+        HTTPStatus.TOO_MANY_REQUESTS
+    )
+
+
+def test_rate_limits_use_the_store_they_are_given(client, user, monkeypatch):
+    # Stands in for a store shared between processes, where the buckets
+    # of this account are already empty.
+    class EmptyStore:
+        def __init__(self):
+            self.keys = []
+
+        async def take(self, key, rate, capacity):
+            self.keys.append(key)
+            return 30.0 if key.startswith('account:') else 0.0
+
+    store = EmptyStore()
+    monkeypatch.setattr(ip_rate_limit, 'store', store)
+    monkeypatch.setattr(account_rate_limit, 'store', store)
+
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert response.headers['Retry-After'] == '30'
+    assert store.keys == ['ip:testclient', f'account:{user.email.lower()}']
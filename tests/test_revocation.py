@@ -0,0 +1,97 @@
+from http import HTTPStatus
+from time import time
+
+import pytest
+from sqlalchemy import insert, select
+
+from fast_zero.models import RevokedToken
+from fast_zero.revocation import (
+    RevocationList,
+    compact_revocations,
+    from_timestamp,
+    load_revocations,
+)
+from fast_zero.security import decode_token_claims, revoked_tokens
+
+
+@pytest.mark.asyncio
+async def test_revocation_list_compacts_expired_ids():
+    revocations = RevocationList()
+    now = time()
+    revocations.add('expired', now - 1)
+    revocations.add('live', now + 60)
+
+    await revocations.compact(now)
+    revocations.add('recent', now + 60)
+
+    assert 'live' in revocations
+    assert 'recent' in revocations
+    assert 'expired' not in revocations
+    assert 'never-revoked' not in revocations
+    assert len(revocations) == 2  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_load_revocations_picks_up_where_it_left_off(session):
+    now = time()
+    await session.execute(
+        insert(RevokedToken),
+        [
+            {
+                'jti': 'old',
+                'expires_at': from_timestamp(now + 60),
+                'revoked_at': from_timestamp(now - 3600),
+            },
+            {'jti': 'new', 'expires_at': from_timestamp(now + 60)},
+        ],
+    )
+    await session.commit()
+
+    everything = RevocationList()
+    since = await load_revocations(session, everything)
+    incremental = RevocationList()
+    await load_revocations(session, incremental, since)
+
+    assert len(everything) == 2  # noqa: PLR2004
+    assert 'new' in incremental
+    assert 'old' not in incremental
+    assert await load_revocations(session, RevocationList(), since) == since
+
+
+@pytest.mark.asyncio
+async def test_revocations_by_other_processes_apply_once_loaded(
+    session, client, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    claims = decode_token_claims(token)
+    session.add(
+        RevokedToken(
+            jti=claims.jti, expires_at=from_timestamp(claims.expires_at)
+        )
+    )
+    await session.commit()
+
+    before = client.get('/todos/', headers=headers)
+    await load_revocations(session, revoked_tokens)
+    after = client.get('/todos/', headers=headers)
+
+    assert before.status_code == HTTPStatus.OK
+    assert after.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_compact_revocations_forgets_expired_tokens(session):
+    now = time()
+    session.add_all([
+        RevokedToken(jti='expired', expires_at=from_timestamp(now - 60)),
+        RevokedToken(jti='live', expires_at=from_timestamp(now + 60)),
+    ])
+    await session.commit()
+    revocations = RevocationList()
+    await load_revocations(session, revocations)
+
+    await compact_revocations(session, revocations)
+
+    assert list(await session.scalars(select(RevokedToken.jti))) == ['live']
+    assert 'live' in revocations
+    assert 'expired' not in revocations
@@ -1,8 +1,17 @@
 from http import HTTPStatus
 
+import pytest
 from jwt import decode
 
-from fast_zero.security import create_access_token, settings
+from fast_zero.security import (
+    Principal,
+    access_token_for,
+    create_access_token,
+    get_password_hash_async,
+    principal_cache,
+    settings,
+    verify_password_async,
+)
 
 
 def test_jwt():
@@ -49,3 +58,86 @@ def test_get_current_user_does_not_exists(client):
 
     assert response.status_code == HTTPStatus.UNAUTHORIZED
     assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_get_current_principal_does_not_exists(client):
+    data = {'sub': 'nonexistentuser'}
+    token = create_access_token(data)
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_get_current_principal_unknown_user_id(client):
+    token = create_access_token({'sub': '999', 'ver': 0})
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_get_current_principal_rejects_stale_token_version(client, user):
+    token = create_access_token({
+        'sub': str(user.id),
+        'ver': user.token_version + 1,
+    })
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_get_current_principal_rereads_an_older_cached_version(
+    session, client, user
+):
+    # This worker cached the version before another one bumped it.
+    principal_cache.set(
+        user.id, Principal(id=user.id, token_version=user.token_version)
+    )
+    user.token_version += 1
+    await session.commit()
+
+    response = client.get(
+        '/todos/',
+        headers={'Authorization': f'Bearer {access_token_for(user)}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert principal_cache.get(user.id).token_version == user.token_version
+
+
+def test_get_current_principal_reads_only_the_token_version(
+    client, user, statements
+):
+    headers = {'Authorization': f'Bearer {access_token_for(user)}'}
+
+    client.get('/todos/?limit=1', headers=headers)
+    lookups = [
+        statement for statement, _ in statements if 'users' in statement
+    ]
+    statements.clear()
+    client.get('/todos/?limit=1', headers=headers)
+
+    assert len(lookups) == 1, lookups
+    assert 'token_version' in lookups[0]
+    assert 'email' not in lookups[0]
+    assert not [
+        statement for statement, _ in statements if 'users' in statement
+    ]
+
+
+@pytest.mark.asyncio
+async def test_password_hash_async_roundtrip():
+    hashed = await get_password_hash_async('secret')
+
+    assert await verify_password_async('secret', hashed)
+    assert not await verify_password_async('wrong', hashed)
@@ -1,6 +1,17 @@
 from http import HTTPStatus
 
-from fast_zero.schemas import UserPublic
+import pytest
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, func, insert, select
+
+from fast_zero.models import (
+    Todo,
+    TodoDeletion,
+    TodoState,
+    TodoStateCount,
+    TodoVersion,
+)
+from fast_zero.schemas import UserList, UserPublic
 
 
 def test_create_user(client):
@@ -50,13 +61,37 @@ def test_get_users(client):
     response = client.get('/users/')
 
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': []}
+    assert response.json() == {'users': [], 'next_cursor': None}
 
 
 def test_get_users_with_existing_user(client, user):
     user_schema = UserPublic.model_validate(user).model_dump()
     response = client.get('/users/')
-    assert response.json() == {'users': [user_schema]}
+    assert response.json() == {'users': [user_schema], 'next_cursor': None}
+
+
+def test_get_users_matches_default_serialization(client, user, other_user):
+    response = client.get('/users/?limit=2')
+
+    expected = UserList(
+        users=[UserPublic.model_validate(u) for u in (user, other_user)],
+        next_cursor=response.json()['next_cursor'],
+    )
+    default = JSONResponse(expected.model_dump(mode='json'))
+    assert response.content == default.body
+
+
+def test_get_users_cursor_pagination(client, user, other_user):
+    response = client.get('/users/?limit=1')
+    first_page = response.json()
+
+    response = client.get(
+        f'/users/?limit=1&cursor={first_page["next_cursor"]}'
+    )
+    second_page = response.json()
+
+    assert [u['id'] for u in first_page['users']] == [user.id]
+    assert [u['id'] for u in second_page['users']] == [other_user.id]
 
 
 def test_get_user(client, user):
@@ -70,6 +105,83 @@ def test_get_user(client, user):
     }
 
 
+@pytest.mark.asyncio
+async def test_get_user_does_not_load_the_entity(client, session, user):
+    session.expunge_all()
+
+    response = client.get(f'/users/{user.id}')
+
+    assert response.status_code == HTTPStatus.OK
+    assert not session.identity_map
+
+
+def test_get_user_not_modified_until_the_user_changes(client, user, token):
+    tag = client.get(f'/users/{user.id}').headers['ETag']
+
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': tag})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.content == b''
+
+    client.put(
+        f'/users/{user.id}',
+        json={
+            'username': 'renamed',
+            'email': user.email,
+            'password': 'testpassword',
+        },
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': tag})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['username'] == 'renamed'
+    assert response.headers['ETag'] != tag
+
+
+def test_get_users_not_modified_until_users_change(client, user, statements):
+    tag = client.get('/users/').headers['ETag']
+
+    statements.clear()
+    response = client.get('/users/', headers={'If-None-Match': tag})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert len(statements) == 1
+    assert 'users_version' not in statements[0][0]
+
+    client.post(
+        '/users/',
+        json={
+            'username': 'newcomer',
+            'email': 'newcomer@example.com',
+            'password': 'newpassword',
+        },
+    )
+    response = client.get('/users/', headers={'If-None-Match': tag})
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()['users']) == 2  # noqa: PLR2004
+    assert response.headers['ETag'] != tag
+
+
+def test_get_users_tag_changes_when_a_listed_user_does(client, user, token):
+    tag = client.get('/users/').headers['ETag']
+
+    client.put(
+        f'/users/{user.id}',
+        json={
+            'username': 'renamed',
+            'email': user.email,
+            'password': user.clean_password,
+        },
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    response = client.get('/users/', headers={'If-None-Match': tag})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['users'][0]['username'] == 'renamed'
+
+
 def test_get_user_not_found(client):
     response = client.get('/users/999')
 
@@ -115,6 +227,40 @@ def test_update_user_conflict(client, user, other_user, token):
     }
 
 
+def test_create_user_takes_one_statement(client, statements):
+    response = client.post(
+        '/users/',
+        json={
+            'username': 'testuser',
+            'email': 'testuser@example.com',
+            'password': 'testpassword',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert len(statements) == 1, statements
+
+
+def test_update_user_takes_two_statements(client, user, token, statements):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/?limit=1', headers=headers)  # caches the principal
+
+    statements.clear()
+    response = client.put(
+        f'/users/{user.id}',
+        json={
+            'username': 'updateduser',
+            'email': 'updateduser@example.com',
+            'password': 'updatedpassword',
+        },
+        headers=headers,
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    # The stored password hash, to tell whether the password changed.
+    assert len(statements) == 2, statements  # noqa: PLR2004
+
+
 def test_update_user_not_authorized(client, other_user, token):
     updated_user_data = {
         'username': 'updateduser',
@@ -141,6 +287,42 @@ def test_delete_user(client, user, token):
     assert response.json() == {'message': 'User deleted successfully'}
 
 
+@pytest.mark.asyncio
+async def test_delete_user_cascades_in_one_statement(  # noqa: PLR0913, PLR0917
+    session, client, user, other_user, token, statements
+):
+    await session.execute(
+        insert(Todo).values([
+            {
+                'title': f'todo {number}',
+                'description': 'd',
+                'state': TodoState.todo,
+                'user_id': owner.id,
+            }
+            for owner in (user, other_user)
+            for number in range(50)
+        ])
+    )
+    await session.execute(delete(Todo).where(Todo.title == 'todo 0'))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/', headers=headers)
+
+    statements.clear()
+    response = client.delete(f'/users/{user.id}', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert [statement.split()[0] for statement, _ in statements] == ['DELETE']
+    for model in (Todo, TodoStateCount, TodoVersion, TodoDeletion):
+        owners = await session.scalars(
+            select(model.user_id).group_by(model.user_id)
+        )
+        assert owners.all() == [other_user.id], model
+    assert (
+        await session.scalar(select(func.count()).select_from(Todo)) == 49  # noqa: PLR2004
+    )
+
+
 def test_delete_user_not_authorized(client, other_user, token):
     response = client.delete(
         f'/users/{other_user.id}',
@@ -149,3 +331,62 @@ def test_delete_user_not_authorized(client, other_user, token):
 
     assert response.status_code == HTTPStatus.FORBIDDEN
     assert response.json() == {'detail': 'Not enough permissions'}
+
+
+def test_update_user_invalidates_cached_principal(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.get('/todos/', headers=headers).status_code == HTTPStatus.OK
+
+    client.put(
+        f'/users/{user.id}',
+        json={
+            'username': 'updateduser',
+            'email': 'updateduser@example.com',
+            'password': 'updatedpassword',
+        },
+        headers=headers,
+    )
+
+    response = client.get('/todos/', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_update_user_keeps_the_token_when_the_password_stays(
+    client, user, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.get('/todos/', headers=headers).status_code == HTTPStatus.OK
+
+    response = client.put(
+        f'/users/{user.id}',
+        json={
+            'username': 'updateduser',
+            'email': 'updateduser@example.com',
+            'password': user.clean_password,
+        },
+        headers=headers,
+    )
+
+    login = client.post(
+        '/auth/token',
+        data={
+            'username': 'updateduser@example.com',
+            'password': user.clean_password,
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert client.get('/todos/', headers=headers).status_code == HTTPStatus.OK
+    assert login.status_code == HTTPStatus.OK
+
+
+def test_delete_user_invalidates_cached_principal(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.get('/todos/', headers=headers).status_code == HTTPStatus.OK
+
+    client.delete(f'/users/{user.id}', headers=headers)
+
+    response = client.get('/todos/', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED